@@ -0,0 +1,88 @@
+# alembic/env.py
+"""
+Окружение Alembic.
+
+URL берётся из настроек бота (DATABASE_URL), а не из alembic.ini.
+Если миграции запускает сам бот (src.database.migrations.run_migrations),
+он передаёт готовое соединение через config.attributes["connection"] —
+тогда движок здесь не создаётся и логирование приложения не трогаем.
+"""
+import asyncio
+from logging.config import fileConfig
+
+from sqlalchemy import pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from alembic import context
+
+from src.config.settings import settings
+from src.database import Base
+from src.database.session import build_url
+from src.models.user import User  # noqa: F401
+from src.models.transaction import Transaction  # noqa: F401
+from src.models.admin_action import AdminAction  # noqa: F401
+from src.models.holiday_bonus import HolidayBonus, UserHolidayBonus  # noqa: F401
+
+config = context.config
+
+if config.config_file_name is not None and "connection" not in config.attributes:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def _configure(**kwargs) -> None:
+    context.configure(
+        target_metadata=target_metadata,
+        compare_type=True,
+        # каждая ревизия — своя транзакция: длинный backfill не держит
+        # блокировки, взятые предыдущими миграциями
+        transaction_per_migration=True,
+        **kwargs,
+    )
+
+
+def run_migrations_offline() -> None:
+    _configure(
+        url=build_url(settings).render_as_string(hide_password=False),
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection: Connection) -> None:
+    _configure(
+        connection=connection,
+        # SQLite не умеет большинство ALTER TABLE — batch-режим пересоздаёт таблицу
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    connectable = create_async_engine(build_url(settings), poolclass=pool.NullPool)
+
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+
+    await connectable.dispose()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is None:
+        asyncio.run(run_async_migrations())
+    else:
+        do_run_migrations(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,113 @@
+"""baseline: таблицы бота
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+Базы, созданные до Alembic (через metadata.create_all), уже содержат эти
+таблицы — их не трогаем, недостающие колонки добавляет 0002.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.migrations import has_table
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if not has_table('users'):
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('telegram_id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=100), nullable=True),
+            sa.Column('first_name', sa.String(length=100), nullable=True),
+            sa.Column('last_name', sa.String(length=100), nullable=True),
+            sa.Column('phone', sa.String(length=20), nullable=True),
+            sa.Column('birth_date', sa.Date(), nullable=True),
+            sa.Column('role', sa.String(length=20), nullable=True),
+            sa.Column('is_active', sa.Boolean(), nullable=True),
+            sa.Column('balance', sa.Integer(), nullable=True),
+            sa.Column('holiday_balance', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+            sa.Column('last_activity', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_users_id', 'users', ['id'])
+        op.create_index('ix_users_phone', 'users', ['phone'])
+        op.create_index('ix_users_telegram_id', 'users', ['telegram_id'], unique=True)
+
+    if not has_table('holidays'):
+        op.create_table(
+            'holidays',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=255), nullable=False),
+            sa.Column('date', sa.Date(), nullable=True),
+            sa.Column('amount', sa.Integer(), nullable=False),
+            sa.Column('days_before', sa.Integer(), nullable=True),
+            sa.Column('days_valid', sa.Integer(), nullable=True),
+            sa.Column('is_active', sa.Boolean(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_holidays_id', 'holidays', ['id'])
+
+    if not has_table('admin_actions'):
+        op.create_table(
+            'admin_actions',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('admin_id', sa.Integer(), nullable=False),
+            sa.Column('target_user_id', sa.Integer(), nullable=False),
+            sa.Column('action_type', sa.String(length=50), nullable=False),
+            sa.Column('details', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+            sa.ForeignKeyConstraint(['admin_id'], ['users.id']),
+            sa.ForeignKeyConstraint(['target_user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_admin_actions_id', 'admin_actions', ['id'])
+
+    if not has_table('transactions'):
+        op.create_table(
+            'transactions',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('amount', sa.Integer(), nullable=False),
+            sa.Column('operation_type', sa.String(length=30), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('category', sa.String(length=50), nullable=True),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+    if not has_table('user_holiday_bonuses'):
+        op.create_table(
+            'user_holiday_bonuses',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('holiday_id', sa.Integer(), nullable=True),
+            sa.Column('amount', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+            sa.Column('expires_at', sa.DateTime(), nullable=True),
+            sa.Column('is_active', sa.Boolean(), nullable=False),
+            sa.ForeignKeyConstraint(['holiday_id'], ['holidays.id'], ondelete='SET NULL'),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_user_holiday_bonuses_id', 'user_holiday_bonuses', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_table('user_holiday_bonuses')
+    op.drop_table('transactions')
+    op.drop_table('admin_actions')
+    op.drop_table('holidays')
+    op.drop_table('users')
@@ -0,0 +1,55 @@
+"""legacy columns: holiday_balance, жизненный цикл бонусов, окна праздников
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:01
+
+Колонки, которые раньше добавлялись ALTER TABLE'ом на старте бота.
+В новой БД они уже есть (0001) — тогда ревизия ничего не делает.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.migrations import has_column
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LEGACY_COLUMNS = {
+    'users': [
+        sa.Column('holiday_balance', sa.Integer(), server_default='0', nullable=True),
+    ],
+    'user_holiday_bonuses': [
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), server_default=sa.true(), nullable=True),
+    ],
+    'holidays': [
+        sa.Column('days_before', sa.Integer(), server_default='0', nullable=True),
+        sa.Column('days_valid', sa.Integer(), server_default='14', nullable=True),
+        sa.Column('is_active', sa.Boolean(), server_default=sa.true(), nullable=True),
+    ],
+}
+
+
+def upgrade() -> None:
+    # SQLite не добавляет через ALTER TABLE колонку с неконстантным DEFAULT
+    # (created_at ... DEFAULT CURRENT_TIMESTAMP) — там таблицу пересобираем
+    recreate = 'always' if op.get_bind().dialect.name == 'sqlite' else 'auto'
+    for table, columns in LEGACY_COLUMNS.items():
+        missing = [column for column in columns if not has_column(table, column.name)]
+        if not missing:
+            continue
+        with op.batch_alter_table(table, recreate=recreate) as batch_op:
+            for column in missing:
+                batch_op.add_column(column)
+
+
+def downgrade() -> None:
+    # колонки нужны текущим моделям — откат до 0001 их не удаляет
+    pass
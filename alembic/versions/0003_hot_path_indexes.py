@@ -0,0 +1,37 @@
+"""indexes: transactions(user_id, id), user_holiday_bonuses(...)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:02
+
+Составные индексы горячих запросов (см. tests/test_query_plans.py).
+На PostgreSQL создаются CONCURRENTLY и не блокируют запись.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from src.database.migrations import create_index_online, has_index
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_transactions_user_id_id', 'transactions', ['user_id', 'id']),
+    ('ix_uhb_user_active_expires', 'user_holiday_bonuses', ['user_id', 'is_active', 'expires_at']),
+    ('ix_uhb_user_holiday_created', 'user_holiday_bonuses', ['user_id', 'holiday_id', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        create_index_online(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in INDEXES:
+        if has_index(table, name):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,25 @@
+"""users.holiday_balance: NULL -> 0 пачками
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:03
+
+Раньше это был один UPDATE на всю таблицу users на старте бота.
+"""
+from typing import Sequence, Union
+
+from src.database.migrations import batched_backfill
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    batched_backfill('users', 'holiday_balance = 0', 'holiday_balance IS NULL')
+
+
+def downgrade() -> None:
+    pass
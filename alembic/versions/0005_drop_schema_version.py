@@ -0,0 +1,27 @@
+"""drop schema_version: версию схемы теперь ведёт alembic_version
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:04
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from src.database.migrations import has_table
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if has_table('schema_version'):
+        op.drop_table('schema_version')
+
+
+def downgrade() -> None:
+    pass
@@ -0,0 +1,32 @@
+"""index: user_holiday_bonuses(is_active, expires_at)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:05
+
+Выборка просроченных бонусов всех пользователей для фонового сжигания
+(src.jobs.expiry). На PostgreSQL создаётся CONCURRENTLY.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from src.database.migrations import create_index_online, has_index
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = ('ix_uhb_active_expires', 'user_holiday_bonuses', ['is_active', 'expires_at'])
+
+
+def upgrade() -> None:
+    create_index_online(*INDEX)
+
+
+def downgrade() -> None:
+    name, table, _ = INDEX
+    if has_index(table, name):
+        op.drop_index(name, table_name=table)
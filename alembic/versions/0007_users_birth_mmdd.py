@@ -0,0 +1,46 @@
+"""users.birth_mmdd: месяц*100+день даты рождения, с индексом
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 00:00:06
+
+Дни рождения сегодня / в ближайшие N дней ищутся диапазоном по индексу
+(src.services.birthdays). Колонку заполняет модель; здесь — backfill
+существующих строк пачками и индекс (на PostgreSQL — CONCURRENTLY).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.migrations import batched_backfill, create_index_online, has_column, has_index
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = ('ix_users_birth_mmdd', 'users', ['birth_mmdd'])
+
+MMDD_SQL = {
+    'postgresql': "CAST(EXTRACT(MONTH FROM birth_date) * 100 + EXTRACT(DAY FROM birth_date) AS SMALLINT)",
+    'sqlite': "CAST(strftime('%m', birth_date) AS INTEGER) * 100 + CAST(strftime('%d', birth_date) AS INTEGER)",
+}
+
+
+def upgrade() -> None:
+    if not has_column('users', 'birth_mmdd'):
+        op.add_column('users', sa.Column('birth_mmdd', sa.SmallInteger(), nullable=True))
+
+    mmdd = MMDD_SQL[op.get_bind().dialect.name]
+    batched_backfill('users', f'birth_mmdd = {mmdd}', 'birth_date IS NOT NULL AND birth_mmdd IS NULL')
+    create_index_online(*INDEX)
+
+
+def downgrade() -> None:
+    name, table, _ = INDEX
+    if has_index(table, name):
+        op.drop_index(name, table_name=table)
+    if has_column(table, 'birth_mmdd'):
+        op.drop_column(table, 'birth_mmdd')
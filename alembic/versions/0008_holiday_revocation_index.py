@@ -0,0 +1,32 @@
+"""index: user_holiday_bonuses(holiday_id, is_active)
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 00:00:07
+
+Действующие бонусы одного праздника — для списания при его удалении
+(src.jobs.revocation). На PostgreSQL создаётся CONCURRENTLY.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from src.database.migrations import create_index_online, has_index
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = ('ix_uhb_holiday_active', 'user_holiday_bonuses', ['holiday_id', 'is_active'])
+
+
+def upgrade() -> None:
+    create_index_online(*INDEX)
+
+
+def downgrade() -> None:
+    name, table, _ = INDEX
+    if has_index(table, name):
+        op.drop_index(name, table_name=table)
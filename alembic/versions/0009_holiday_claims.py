@@ -0,0 +1,31 @@
+"""holidays.claimed_until: захват праздника длинной операцией
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 00:00:08
+
+«🎁 Начислить всем» и списание при удалении захватывают праздник строкой
+в БД, а не множеством в памяти процесса (src.jobs.claims).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.migrations import has_column
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if not has_column('holidays', 'claimed_until'):
+        op.add_column('holidays', sa.Column('claimed_until', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    if has_column('holidays', 'claimed_until'):
+        op.drop_column('holidays', 'claimed_until')
@@ -0,0 +1,156 @@
+# benchmarks/dispatch_bench.py
+"""
+Стоимость маршрутизации одного апдейта: обход роутеров с magic-фильтрами
+(F.text == …, F.data.startswith(…)) против индекса из
+src.utils.dispatch_index.
+
+Роутеры бота копируются с теми же фильтрами, флагами и порядком, но с
+пустыми хендлерами и без middleware БД — замеряется только путь от
+dp.feed_update до найденного хендлера. Вариант «magic» восстанавливает
+прежние фильтры из TextIs/DataIs/DataStartsWith.
+
+    python -m benchmarks.dispatch_bench --updates 5000
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.client.session.base import BaseSession
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+
+from src.handlers.admin.bonuses import router as admin_bonuses_router
+from src.handlers.admin.commands import router as admin_commands_router
+from src.handlers.admin.holidays import router as admin_holidays_router
+from src.handlers.admin.panel import router as admin_panel_router
+from src.handlers.admin.posts import router as admin_posts_router
+from src.handlers.admin.qr_scan import router as admin_qr_router
+from src.handlers.admin.stats import router as admin_stats_router
+from src.handlers.admin.users import router as admin_users_router
+from src.handlers.user.balance import router as user_balance_router
+from src.handlers.user.profile import router as user_profile_router
+from src.handlers.user.start import router as user_start_router
+from src.middlewares.dispatch_index import DispatchIndexMiddleware
+from src.utils.dispatch_index import DataIs, DataStartsWith, DispatchIndex, TextIs
+
+# порядок как в src/main.py
+ROUTERS = (
+    user_start_router,
+    user_balance_router,
+    user_profile_router,
+    admin_commands_router,
+    admin_panel_router,
+    admin_users_router,
+    admin_bonuses_router,
+    admin_holidays_router,
+    admin_qr_router,
+    admin_stats_router,
+    admin_posts_router,
+)
+
+MESSAGES = ("💰 Мой баланс", "⬅️ Назад в меню", "/admin", "/stats", "привет")
+CALLBACKS = ("admin_menu", "open_user:15", "bonus_percent_user:3", "holiday_give:2", "admin_stats", "admin_post_cancel")
+
+
+class _NoNetwork(BaseSession):
+    async def make_request(self, bot, method, timeout=None):
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+async def _noop(*args, **kwargs):
+    return None
+
+
+def _as_magic(filter_callback):
+    if isinstance(filter_callback, TextIs):
+        return F.text.in_(filter_callback.texts) if len(filter_callback.texts) > 1 else F.text == filter_callback.texts[0]
+    if isinstance(filter_callback, DataIs):
+        return F.data.in_(filter_callback.values) if len(filter_callback.values) > 1 else F.data == filter_callback.values[0]
+    if isinstance(filter_callback, DataStartsWith):
+        prefixes = filter_callback.prefixes
+        return F.data.startswith(prefixes if len(prefixes) > 1 else prefixes[0])
+    return filter_callback
+
+
+def _build(indexed: bool) -> Dispatcher:
+    dp = Dispatcher(storage=MemoryStorage())
+    for source in ROUTERS:
+        router = Router(name=source.name)
+        for event_type in ("message", "callback_query"):
+            for handler in source.observers[event_type].handlers:
+                filters = [f.magic or f.callback for f in handler.filters or ()]
+                if not indexed:
+                    filters = [_as_magic(f) for f in filters]
+                router.observers[event_type].register(_noop, *filters, flags=handler.flags)
+        dp.include_router(router)
+
+    if indexed:
+        middleware = DispatchIndexMiddleware(DispatchIndex().install(dp))
+        dp.message.outer_middleware(middleware)
+        dp.callback_query.outer_middleware(middleware)
+    return dp
+
+
+def _updates() -> list[tuple[str, Update]]:
+    now = int(datetime.now().timestamp())
+    user = {"id": 42, "is_bot": False, "first_name": "bench"}
+    chat = {"id": 42, "type": "private"}
+    updates = [
+        (text, Update.model_validate({
+            "update_id": 1,
+            "message": {"message_id": 1, "date": now, "chat": chat, "from": user, "text": text},
+        }))
+        for text in MESSAGES
+    ]
+    updates += [
+        (data, Update.model_validate({
+            "update_id": 1,
+            "callback_query": {
+                "id": "1", "chat_instance": "1", "data": data, "from": user,
+                "message": {"message_id": 1, "date": now, "chat": chat, "text": "t"},
+            },
+        }))
+        for data in CALLBACKS
+    ]
+    return updates
+
+
+async def _per_update_us(dp: Dispatcher, bot: Bot, update: Update, count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        await dp.feed_update(bot, update)
+    return (time.perf_counter() - started) / count * 1_000_000
+
+
+async def run(count: int):
+    bot = Bot("123:bench", session=_NoNetwork())
+    variants = {"magic": _build(indexed=False), "indexed": _build(indexed=True)}
+
+    print(f"{'update':>22} | {'magic us':>9} | {'indexed us':>10}")
+    totals = dict.fromkeys(variants, 0.0)
+    for label, update in _updates():
+        row = {}
+        for variant, dp in variants.items():
+            row[variant] = await _per_update_us(dp, bot, update, count)
+            totals[variant] += row[variant]
+        print(f"{label:>22} | {row['magic']:>9.1f} | {row['indexed']:>10.1f}")
+    print(f"{'total':>22} | {totals['magic']:>9.1f} | {totals['indexed']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.updates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/hot_query_bench.py
+"""
+Стоимость подготовки горячих запросов: select(...) на каждый вызов
+против lambda-statement'ов из src.database.queries.
+
+Замеряется два уровня:
+  - prepare: только сборка statement'а и вычисление cache key
+    (то, что SQLAlchemy делает перед поиском в кэше компиляции);
+  - execute: полный session.execute(...).scalar_one_or_none() на
+    SQLite в памяти — чтобы видеть долю подготовки в общем времени.
+
+    python -m benchmarks.hot_query_bench --calls 20000
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from src.database import Base, queries
+from src.models.user import User
+from src.models.transaction import Transaction  # noqa: F401
+from src.models.holiday_bonus import HolidayBonus, UserHolidayBonus
+from src.models.admin_action import AdminAction  # noqa: F401
+
+USERS = 2000
+
+
+def _plain_user(tg_id):
+    return select(User).where(User.telegram_id == tg_id)
+
+
+def _plain_active_bonuses(user_id):
+    now = datetime.now()
+    return select(UserHolidayBonus).where(
+        UserHolidayBonus.user_id == user_id,
+        UserHolidayBonus.is_active == True,
+        UserHolidayBonus.expires_at != None,
+        UserHolidayBonus.expires_at > now,
+    )
+
+
+def _lambda_active_bonuses(user_id):
+    return queries.spendable_user_holiday_bonuses(user_id, datetime.now())
+
+
+CASES = {
+    "user by telegram_id": (_plain_user, queries.user_by_telegram_id, lambda: 10_000 + random.randrange(USERS)),
+    "active user bonuses": (_plain_active_bonuses, _lambda_active_bonuses, lambda: 1 + random.randrange(USERS)),
+}
+
+
+def _seed(engine):
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            User.__table__.insert(),
+            [
+                {"telegram_id": 10_000 + i, "first_name": f"u{i}", "balance": 200, "holiday_balance": 0}
+                for i in range(USERS)
+            ],
+        )
+        conn.execute(HolidayBonus.__table__.insert(), [{"name": "bench", "amount": 100}])
+
+
+def _per_call_us(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=20_000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    _seed(engine)
+
+    print(f"{'query':>22} | {'variant':>7} | {'prepare us':>10} | {'execute us':>10}")
+    with Session(engine) as session:
+        for name, (plain, cached, arg) in CASES.items():
+            for variant, build in (("select", plain), ("lambda", cached)):
+                prepare = _per_call_us(lambda: build(arg())._generate_cache_key(), args.calls)
+                execute = _per_call_us(
+                    lambda: session.execute(build(arg())).scalars().first(), args.calls
+                )
+                print(f"{name:>22} | {variant:>7} | {prepare:>10.1f} | {execute:>10.1f}")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
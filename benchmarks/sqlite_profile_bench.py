@@ -0,0 +1,137 @@
+# benchmarks/sqlite_profile_bench.py
+"""
+Конкурентность чтения/записи SQLite до и после профиля PRAGMA.
+
+Читатели повторяют запрос экрана «💰 Мой баланс», писатели — кассовое
+начисление (UPDATE users + INSERT transactions). Для каждого профиля
+создаётся свежий файл БД.
+
+    python -m benchmarks.sqlite_profile_bench --seconds 5 --readers 20 --writers 4
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.config.settings import settings
+from src.database import Base
+from src.database.session import create_engine_from_settings
+from src.models.user import User
+from src.models.transaction import Transaction
+from src.models.holiday_bonus import HolidayBonus, UserHolidayBonus  # noqa: F401
+from src.models.admin_action import AdminAction  # noqa: F401
+
+USERS = 2000
+
+
+async def _seed(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            User.__table__.insert(),
+            [
+                {"telegram_id": 10_000 + i, "first_name": f"u{i}", "balance": 200, "holiday_balance": 0}
+                for i in range(USERS)
+            ],
+        )
+
+
+async def _reader(sessions, deadline, stats):
+    while time.perf_counter() < deadline:
+        tg_id = 10_000 + random.randrange(USERS)
+        started = time.perf_counter()
+        try:
+            async with sessions() as session:
+                await session.scalar(
+                    select(User.balance + User.holiday_balance).where(User.telegram_id == tg_id)
+                )
+        except OperationalError:
+            stats["read_errors"] += 1
+            continue
+        stats["read_latency"].append(time.perf_counter() - started)
+
+
+async def _writer(sessions, deadline, stats):
+    while time.perf_counter() < deadline:
+        user_id = 1 + random.randrange(USERS)
+        started = time.perf_counter()
+        try:
+            async with sessions() as session:
+                await session.execute(
+                    update(User).where(User.id == user_id).values(balance=User.balance + 5)
+                )
+                session.add(
+                    Transaction(user_id=user_id, amount=5, operation_type="add", description="bench")
+                )
+                await session.commit()
+        except OperationalError:
+            stats["write_errors"] += 1
+            continue
+        stats["write_latency"].append(time.perf_counter() - started)
+
+
+def _p95(values):
+    if len(values) < 2:
+        return 0.0
+    return statistics.quantiles(values, n=20)[-1] * 1000
+
+
+async def run_profile(profile: str, args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="bonus_bench_")
+    cfg = settings.model_copy(
+        update={
+            "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}",
+            "SQLITE_PRAGMA_PROFILE": profile,
+            "DB_POOL_SIZE": args.readers + args.writers,
+            "SQLALCHEMY_ECHO": False,
+        }
+    )
+    engine = create_engine_from_settings(cfg)
+    await _seed(engine)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    stats = {"read_latency": [], "write_latency": [], "read_errors": 0, "write_errors": 0}
+    deadline = time.perf_counter() + args.seconds
+    await asyncio.gather(
+        *(_reader(sessions, deadline, stats) for _ in range(args.readers)),
+        *(_writer(sessions, deadline, stats) for _ in range(args.writers)),
+    )
+    await engine.dispose()
+
+    return {
+        "profile": profile,
+        "reads/s": len(stats["read_latency"]) / args.seconds,
+        "writes/s": len(stats["write_latency"]) / args.seconds,
+        "read p95 ms": _p95(stats["read_latency"]),
+        "write p95 ms": _p95(stats["write_latency"]),
+        "locked errors": stats["read_errors"] + stats["write_errors"],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=20)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--profiles", default="default,performance")
+    args = parser.parse_args()
+
+    rows = [await run_profile(p.strip(), args) for p in args.profiles.split(",")]
+
+    columns = list(rows[0])
+    print(" | ".join(f"{c:>14}" for c in columns))
+    for row in rows:
+        print(" | ".join(
+            f"{v:>14.1f}" if isinstance(v, float) else f"{v:>14}" for v in row.values()
+        ))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -42,9 +42,10 @@ async def init_database():
 
         # Создаем таблицы
         await create_tables()
+        await engine.dispose()
 
         print("\n🎉 База данных успешно инициализирована!")
-        print("📁 Файл базы: bonus_bot.db")
+        print(f"📁 База: {engine.url.render_as_string(hide_password=True)}")
 
     except Exception as e:
         print(f"❌ Ошибка при инициализации: {e}")
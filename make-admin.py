@@ -1,20 +1,24 @@
 import asyncio
-from sqlalchemy import text
-from src.database import engine
+from src.database import AsyncSessionLocal, engine, queries
 
 TG_ID = 303315496  # ← поставь свой Telegram ID
 
 
 async def make_admin():
-    sql = text("""
-        UPDATE users
-        SET role = 'admin'
-        WHERE telegram_id = :tg_id
-    """)
-
-    async with engine.begin() as conn:
-        await conn.execute(sql, {"tg_id": TG_ID})
+    # через ORM: коммит сам сбрасывает запись identity_cache в этом процессе
+    async with AsyncSessionLocal() as session:
+        user = (await session.execute(queries.user_by_telegram_id(TG_ID))).scalar_one_or_none()
+        if user is None:
+            print(f"❌ Пользователь {TG_ID} не найден")
+            await engine.dispose()
+            return
+        user.role = "admin"
+        await session.commit()
+    await engine.dispose()
 
+    # у запущенного бота свой кэш в памяти, но на входе в админку (/admin,
+    # админские колбэки) «не админ» из кэша перепроверяется по БД — доступ
+    # появится сразу, перезапуск не нужен
     print(f"✅ Пользователь {TG_ID} назначен администратором!")
 
 
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -8,6 +8,74 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     LOG_LEVEL: str = "INFO"
 
+    # --- Логи (пишет фоновый поток, см. src.monitoring.logs) ---
+    LOG_PATH: Optional[str] = "bot.log"  # пусто — только консоль
+    LOG_FORMAT: str = "text"  # text / json
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024  # старые файлы сжимаются в .gz
+    LOG_BACKUPS: int = 5
+    LOG_QUEUE_SIZE: int = 10000  # сверх этого записи отбрасываются, а не блокируют бота
+
+    # --- Пул соединений с БД ---
+    SQLALCHEMY_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800  # секунд, -1 — не пересоздавать
+    DB_POOL_PRE_PING: bool = True
+    # Кэш prepared statements asyncpg (0 — выключить, нужно за pgbouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Профиль PRAGMA для SQLite: default / performance / durable
+    SQLITE_PRAGMA_PROFILE: str = "performance"
+
+    # --- Реплика для чтения ---
+    # Пусто — все запросы идут в DATABASE_URL
+    DATABASE_REPLICA_URL: Optional[str] = None
+    # Сколько секунд после записи читать данные пользователя только с основной БД
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    # --- Повтор транзакций при блокировках / serialization failure ---
+    DB_RETRY_ATTEMPTS: int = 5
+    DB_RETRY_BASE_DELAY: float = 0.05  # секунд, удваивается с каждой попыткой
+    DB_RETRY_MAX_DELAY: float = 1.0
+
+    # --- Кэш telegram_id -> (id, роль) ---
+    IDENTITY_CACHE_SIZE: int = 10000
+    IDENTITY_CACHE_TTL: float = 300.0  # секунд; столько живёт роль, изменённая в обход бота
+
+    # --- Ограничение частоты дорогих экранов (token bucket на пользователя) ---
+    THROTTLE_RATE: float = 1.0  # токенов в секунду
+    THROTTLE_BURST: float = 10.0  # ёмкость корзины
+    THROTTLE_NOTICE_SECONDS: float = 5.0  # как часто напоминать «подождите»
+
+    # --- Начисление праздничных бонусов ---
+    # scheduled — раз в сутки задачей src.jobs.accrual; lazy — при открытии баланса/профиля
+    ACCRUAL_MODE: str = "scheduled"
+    ACCRUAL_TIME: str = "00:05"  # ЧЧ:ММ, локальное время; плюс прогон при старте бота
+    ACCRUAL_CHUNK_SIZE: int = 5000  # пользователей на транзакцию
+    # Календарь праздников в памяти; правки в обход бота видны не позже чем через TTL
+    HOLIDAY_CALENDAR_TTL: float = 3600.0
+    # Сжигание просроченных бонусов фоновой задачей src.jobs.expiry
+    EXPIRY_SWEEP_INTERVAL: float = 300.0  # секунд между проходами, 0 — выключить
+    EXPIRY_SWEEP_BATCH_SIZE: int = 1000  # бонусов на транзакцию
+    # Списание бонусов удалённого праздника (src.jobs.revocation)
+    REVOCATION_BATCH_SIZE: int = 1000  # бонусов на транзакцию
+    # Сверка holiday_balance с таблицей бонусов (python -m src.jobs.reconcile)
+    RECONCILE_CHUNK_SIZE: int = 2000  # пользователей на запрос
+    RECONCILE_ROWS_PER_SECOND: int = 20000  # бюджет чтения (пользователи + бонусы), 0 — без ограничения
+
+    # --- Метрики (формат Prometheus) ---
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: int = 9108  # 0 — не поднимать HTTP-эндпоинт
+    METRICS_DUMP_PATH: Optional[str] = None  # файл для textfile collector'а
+    METRICS_DUMP_INTERVAL: float = 60.0
+
+    # --- Журнал медленных запросов (JSONL) ---
+    SLOW_QUERY_LOG_PATH: Optional[str] = "slow_queries.jsonl"  # пусто — выключен
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0
+    SLOW_QUERY_SAMPLE_RATE: float = 1.0  # доля медленных запросов, попадающих в файл
+    SLOW_QUERY_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUPS: int = 5
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -29,4 +97,4 @@ class Settings(BaseSettings):
         return ids
 
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
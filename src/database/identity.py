@@ -0,0 +1,144 @@
+# src/database/identity.py
+"""
+Кэш «кто это»: telegram_id -> Identity(user_id, role, registered).
+
+Почти каждый апдейт начинается с одного и того же вопроса —
+зарегистрирован ли пользователь и админ ли он. Ответ меняется редко,
+поэтому держим его в процессе: LRU на IDENTITY_CACHE_SIZE записей, каждая
+живёт не дольше IDENTITY_CACHE_TTL секунд. Незарегистрированные тоже
+кэшируются (registered=False), чтобы /start и меню не ходили в БД.
+
+Инвалидация — после коммита сессии, в которой пользователь создан,
+удалён или у него изменилась роль (см. слушатели ниже), а также явно
+через identity_cache.invalidate(). Изменения в обход ORM (ручной SQL,
+другой процесс, make-admin.py) подхватываются по истечении TTL — кроме
+повышения до админа: на входе в админку (require_admin=True) закэшированный
+«не админ» перепроверяется запросом, так что назначенный админ получает
+доступ сразу.
+"""
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.settings import settings
+from src.database import queries
+from src.database.routing import RoutingSession
+from src.monitoring.metrics import REGISTRY
+
+LOOKUPS = REGISTRY.counter(
+    "bonus_bot_identity_cache_total",
+    "Обращения к кэшу идентичности пользователей",
+    labelnames=("result",),
+)
+
+
+class Identity(NamedTuple):
+    user_id: Optional[int]
+    role: Optional[str]
+
+    @property
+    def registered(self) -> bool:
+        return self.user_id is not None
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == "admin"
+
+
+ANONYMOUS = Identity(None, None)
+
+
+class IdentityCache:
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[float, Identity]] = OrderedDict()
+        # растёт на каждой инвалидации: ответ запроса, начатого до неё, не кэшируем
+        self._generation = 0
+
+    def get(self, telegram_id: int) -> Optional[Identity]:
+        entry = self._entries.get(telegram_id)
+        if entry is None:
+            return None
+        expires_at, identity = entry
+        if expires_at < time.monotonic():
+            del self._entries[telegram_id]
+            return None
+        self._entries.move_to_end(telegram_id)
+        return identity
+
+    def put(self, telegram_id: int, identity: Identity):
+        self._entries[telegram_id] = (time.monotonic() + self.ttl, identity)
+        self._entries.move_to_end(telegram_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, telegram_id: int):
+        self._generation += 1
+        self._entries.pop(telegram_id, None)
+
+    def clear(self):
+        self._generation += 1
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def resolve(self, session: AsyncSession, telegram_id: int, require_admin: bool = False) -> Identity:
+        """
+        Identity из кэша, при промахе — один лёгкий запрос (id, role).
+
+        require_admin=True — вызов из админской точки входа: отказ по кэшу
+        не окончательный, роль перечитывается из БД.
+        """
+        identity = self.get(telegram_id)
+        if identity is not None and not (require_admin and not identity.is_admin):
+            LOOKUPS.inc(result="hit")
+            return identity
+
+        LOOKUPS.inc(result="miss" if identity is None else "recheck")
+        generation = self._generation
+        row = (await session.execute(queries.identity_by_telegram_id(telegram_id))).first()
+        identity = Identity(row.id, row.role) if row else ANONYMOUS
+        if generation == self._generation:
+            self.put(telegram_id, identity)
+        return identity
+
+
+identity_cache = IdentityCache(
+    maxsize=settings.IDENTITY_CACHE_SIZE,
+    ttl=settings.IDENTITY_CACHE_TTL,
+)
+
+
+# ------------------------------------------------------------------
+# Инвалидация по изменениям в ORM
+# ------------------------------------------------------------------
+@event.listens_for(RoutingSession, "before_flush")
+def _collect_changed_identities(session, flush_context, instances):
+    from src.models.user import User
+
+    changed = session.info.setdefault("identity_changes", set())
+    for obj in session.new:
+        if isinstance(obj, User):
+            changed.add(obj.telegram_id)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changed.add(obj.telegram_id)
+    for obj in session.dirty:
+        if isinstance(obj, User) and inspect(obj).attrs.role.history.has_changes():
+            changed.add(obj.telegram_id)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _invalidate_changed_identities(session):
+    for telegram_id in session.info.pop("identity_changes", ()):
+        identity_cache.invalidate(telegram_id)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_changed_identities(session):
+    session.info.pop("identity_changes", None)
@@ -0,0 +1,34 @@
+# src/database/locks.py
+"""
+Транзакционные advisory-блокировки PostgreSQL.
+
+award_locks() сериализует начисление одного и того же бонуса между
+процессами: ночной прогон (src.jobs.accrual), «🎁 Начислить всем» из
+админки и ленивое начисление проверяют «ещё не начисляли» (NOT EXISTS
+по окну created_at), и без блокировки два конкурента на READ COMMITTED
+оба видят «не начисляли». Под блокировкой второй ждёт commit первого и
+уже видит его бонусы. Уникальный индекс здесь не подходит: период
+«уже начисляли» у ручной выдачи — скользящее окно days_valid.
+
+Блокировка снимается в конце транзакции. Ключи берутся по возрастанию —
+без взаимоблокировок. На SQLite писатель и так один — ничего не делаем.
+"""
+from typing import Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# первая половина ключа pg_advisory_xact_lock(int, int): "HB"
+AWARD_LOCK_NAMESPACE = 0x4842
+
+
+async def award_locks(session: AsyncSession, holiday_ids: Iterable[Optional[int]]) -> bool:
+    """
+    Взять блокировки начисления праздников holiday_ids (None — день рождения)
+    до конца транзакции. False — на этой БД блокировки не нужны.
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return False
+    for key in sorted({holiday_id or 0 for holiday_id in holiday_ids}):
+        await session.execute(select(func.pg_advisory_xact_lock(AWARD_LOCK_NAMESPACE, key)))
+    return True
@@ -0,0 +1,138 @@
+# src/database/migrations.py
+"""
+Миграции схемы через Alembic (каталог alembic/ в корне проекта).
+
+run_migrations() вызывается на старте до начала polling'а. Проверка
+дешёвая: head-ревизия читается из файлов alembic/versions, текущая —
+одним запросом к alembic_version. Если они совпадают, к схеме больше
+не обращаемся (никакой рефлексии таблиц на каждом старте).
+
+Хелперы ниже используются в самих ревизиях: идемпотентные проверки
+«есть ли таблица/колонка/индекс» и пакетный backfill, который не держит
+блокировку на всю таблицу.
+"""
+import logging
+from pathlib import Path
+from typing import Optional, Sequence
+
+from alembic import command, op
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+# ------------------------------------------------------------------
+# Запуск
+# ------------------------------------------------------------------
+def alembic_config() -> Config:
+    cfg = Config(str(PROJECT_ROOT / "alembic.ini"))
+    cfg.set_main_option("script_location", str(PROJECT_ROOT / "alembic"))
+    return cfg
+
+
+def head_revision(cfg: Config) -> Optional[str]:
+    return ScriptDirectory.from_config(cfg).get_current_head()
+
+
+def current_revision(sync_conn: Connection) -> Optional[str]:
+    return MigrationContext.configure(sync_conn).get_current_revision()
+
+
+def _upgrade(sync_conn: Connection, cfg: Config, revision: str):
+    cfg.attributes["connection"] = sync_conn
+    command.upgrade(cfg, revision)
+
+
+async def run_migrations(target: AsyncEngine, revision: str = "head") -> Optional[str]:
+    """
+    Довести схему до revision. Возвращает новую ревизию или None,
+    если схема уже актуальна.
+    """
+    cfg = alembic_config()
+    head = head_revision(cfg) if revision == "head" else revision
+
+    async with target.connect() as conn:
+        current = await conn.run_sync(current_revision)
+    if current == head:
+        return None
+
+    logger.info("🛠 Миграция схемы: %s -> %s", current or "<пусто>", head)
+    async with target.connect() as conn:
+        await conn.run_sync(_upgrade, cfg, revision)
+        await conn.commit()
+    return head
+
+
+# ------------------------------------------------------------------
+# Хелперы для ревизий
+# ------------------------------------------------------------------
+def has_table(table: str) -> bool:
+    return inspect(op.get_bind()).has_table(table)
+
+
+def has_column(table: str, column: str) -> bool:
+    return any(col["name"] == column for col in inspect(op.get_bind()).get_columns(table))
+
+
+def has_index(table: str, index: str) -> bool:
+    return any(ix["name"] == index for ix in inspect(op.get_bind()).get_indexes(table))
+
+
+def create_index_online(index: str, table: str, columns: Sequence[str]):
+    """
+    CREATE INDEX, не блокирующий запись: на PostgreSQL — CONCURRENTLY
+    (вне транзакции), на SQLite — обычный (там блокировка всё равно на БД).
+    """
+    if has_index(table, index):
+        return
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(index, table, list(columns), postgresql_concurrently=True)
+    else:
+        op.create_index(index, table, list(columns))
+
+
+def batched_backfill(
+    table: str,
+    assignments: str,
+    where: str,
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    key: str = "id",
+) -> int:
+    """
+    UPDATE table SET assignments WHERE where — пачками по диапазонам key.
+
+    Каждая пачка коммитится отдельно (autocommit), поэтому блокировки
+    держатся только на время одной пачки, а бот продолжает писать в
+    таблицу. Повторный запуск безопасен, если where отбирает только
+    ещё не обработанные строки.
+    """
+    bind = op.get_bind()
+    updated = 0
+
+    with op.get_context().autocommit_block():
+        bounds = bind.execute(text(f"SELECT min({key}), max({key}) FROM {table}")).one()
+        if bounds[0] is None:
+            return 0
+
+        stmt = text(
+            f"UPDATE {table} SET {assignments} "
+            f"WHERE {key} >= :lo AND {key} < :hi AND ({where})"
+        )
+        lo, last = bounds
+        while lo <= last:
+            hi = lo + batch_size
+            updated += bind.execute(stmt, {"lo": lo, "hi": hi}).rowcount
+            lo = hi
+
+    logger.info("🛠 backfill %s: обновлено строк %s", table, updated)
+    return updated
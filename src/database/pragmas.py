@@ -0,0 +1,67 @@
+# src/database/pragmas.py
+"""
+Профили PRAGMA для SQLite.
+
+Применяются на каждое новое соединение пула через событие "connect",
+поэтому действуют и для соединений, пересозданных после pool_recycle.
+"""
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Порядок важен: journal_mode должен переключиться до остальных настроек.
+SQLITE_PRAGMA_PROFILES: dict[str, dict[str, str | int]] = {
+    # поведение SQLite по умолчанию (rollback journal, synchronous=FULL)
+    "default": {},
+    # WAL: читатели не блокируются писателем; NORMAL безопасен в режиме WAL
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,        # ~64 МБ (отрицательное значение — в КиБ)
+        "mmap_size": 268435456,      # 256 МБ
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,        # мс ждать блокировку вместо "database is locked"
+    },
+    # WAL, но с полным fsync на каждый коммит
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+    },
+}
+
+
+def get_pragma_profile(name: str) -> dict[str, str | int]:
+    try:
+        return SQLITE_PRAGMA_PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Неизвестный профиль SQLite: {name!r}. "
+            f"Доступные: {', '.join(SQLITE_PRAGMA_PROFILES)}"
+        ) from None
+
+
+def install_sqlite_pragmas(target: AsyncEngine, profile: str) -> dict[str, str | int]:
+    """Повесить применение профиля на событие connect движка."""
+    pragmas = get_pragma_profile(profile)
+    if not pragmas:
+        return pragmas
+
+    @event.listens_for(target.sync_engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for key, value in pragmas.items():
+                cursor.execute(f"PRAGMA {key}={value}")
+        finally:
+            cursor.close()
+
+    return pragmas
+
+
+async def read_pragmas(target: AsyncEngine, names) -> dict[str, object]:
+    """Фактические значения PRAGMA на соединении из пула (для самопроверки)."""
+    values = {}
+    async with target.connect() as conn:
+        for name in names:
+            values[name] = (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+    return values
@@ -0,0 +1,169 @@
+# src/database/queries.py
+"""
+Горячие запросы бота в виде lambda-statement'ов.
+
+Обычный select(...) на каждом вызове заново собирается и заново считает
+cache key для кэша компиляции. lambda_stmt кэширует построенный
+statement по месту определения лямбды, а значения из замыкания
+(telegram_id, user_id, now, ...) подставляет как bound-параметры —
+на горячем пути остаётся только выполнение.
+
+Правило: структура запроса не должна зависеть от значений аргументов
+(например, сравнение с None даёт IS NULL), для таких случаев — отдельная
+функция.
+"""
+from datetime import datetime
+
+from sqlalchemy import func, lambda_stmt, select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+
+from src.models.holiday_bonus import HolidayBonus, UserHolidayBonus
+from src.models.transaction import Transaction
+from src.models.user import User
+
+
+# ------------------------------------------------------------------
+# Пользователи
+# ------------------------------------------------------------------
+def user_by_telegram_id(telegram_id: int) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(User).where(User.telegram_id == telegram_id))
+
+
+def user_by_id(user_id: int) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(User).where(User.id == user_id))
+
+
+def user_by_phone(phone: str) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(User).where(User.phone == phone))
+
+
+def identity_by_telegram_id(telegram_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(User.id, User.role).where(User.telegram_id == telegram_id)
+    )
+
+
+# ------------------------------------------------------------------
+# Read-модели (Core, без ORM-сущностей) — см. src.models.read_models
+# ------------------------------------------------------------------
+USER_CARD_COLUMNS = (
+    User.id,
+    User.telegram_id,
+    User.first_name,
+    User.last_name,
+    User.phone,
+    User.balance,
+    User.holiday_balance,
+    User.role,
+)
+
+USER_LIST_COLUMNS = (User.id, User.telegram_id, User.first_name, User.last_name)
+
+
+def user_card_by_id(user_id: int) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(*USER_CARD_COLUMNS).where(User.id == user_id))
+
+
+def user_card_by_telegram_id(telegram_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(*USER_CARD_COLUMNS).where(User.telegram_id == telegram_id)
+    )
+
+
+def user_list_page(offset: int, limit: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(*USER_LIST_COLUMNS).order_by(User.id.desc()).offset(offset).limit(limit)
+    )
+
+
+# ------------------------------------------------------------------
+# Статистика
+# ------------------------------------------------------------------
+def users_count() -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(func.count(User.id)))
+
+
+def users_total_balance() -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(func.sum(User.balance + User.holiday_balance)))
+
+
+def transactions_count() -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(func.count(Transaction.id)))
+
+
+# ------------------------------------------------------------------
+# Операции
+# ------------------------------------------------------------------
+def recent_transactions(user_id: int, limit: int = 10) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(Transaction)
+        .where(Transaction.user_id == user_id)
+        .order_by(Transaction.id.desc())
+        .limit(limit)
+    )
+
+
+# ------------------------------------------------------------------
+# Праздничные бонусы
+# ------------------------------------------------------------------
+def active_holidays() -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(HolidayBonus).where(HolidayBonus.is_active == True))
+
+
+def holiday_by_id(holiday_id: int) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(HolidayBonus).where(HolidayBonus.id == holiday_id))
+
+
+def active_user_holiday_bonuses(user_id: int, now: datetime) -> StatementLambdaElement:
+    """Действующие (не сгоревшие) бонусы пользователя вместе с праздником."""
+    return lambda_stmt(
+        lambda: select(UserHolidayBonus)
+        .options(selectinload(UserHolidayBonus.holiday))
+        .where(
+            UserHolidayBonus.user_id == user_id,
+            UserHolidayBonus.is_active == True,
+            UserHolidayBonus.expires_at != None,
+            UserHolidayBonus.expires_at > now,
+        )
+    )
+
+
+def spendable_user_holiday_bonuses(user_id: int, now: datetime) -> StatementLambdaElement:
+    """Действующие бонусы в порядке списания: сначала те, что сгорят раньше."""
+    return lambda_stmt(
+        lambda: select(UserHolidayBonus)
+        .where(
+            UserHolidayBonus.user_id == user_id,
+            UserHolidayBonus.is_active == True,
+            UserHolidayBonus.expires_at != None,
+            UserHolidayBonus.expires_at > now,
+        )
+        .order_by(UserHolidayBonus.expires_at)
+    )
+
+
+def expired_user_holiday_bonuses(user_id: int, now: datetime) -> StatementLambdaElement:
+    """Активные, но уже просроченные бонусы пользователя (к сжиганию)."""
+    return lambda_stmt(
+        lambda: select(UserHolidayBonus)
+        .options(selectinload(UserHolidayBonus.holiday))
+        .where(
+            UserHolidayBonus.user_id == user_id,
+            UserHolidayBonus.is_active == True,
+            UserHolidayBonus.expires_at != None,
+            UserHolidayBonus.expires_at <= now,
+        )
+    )
+
+
+def user_awards_between(user_id: int, since: datetime, until: datetime) -> StatementLambdaElement:
+    """(holiday_id, created_at) всех праздничных бонусов пользователя за период; ДР — holiday_id NULL."""
+    return lambda_stmt(
+        lambda: select(UserHolidayBonus.holiday_id, UserHolidayBonus.created_at)
+        .where(
+            UserHolidayBonus.user_id == user_id,
+            UserHolidayBonus.created_at >= since,
+            UserHolidayBonus.created_at <= until,
+        )
+    )
@@ -0,0 +1,108 @@
+# src/database/retry.py
+"""
+Повтор транзакций при временных ошибках БД.
+
+SQLite под конкурентной записью отвечает "database is locked",
+PostgreSQL — serialization failure (40001) или deadlock (40P01). Такие
+транзакции откатываются целиком, и их безопасно выполнить заново.
+
+run_in_transaction(session, work) выполняет work() и commit; при
+временной ошибке делает rollback, ждёт (экспоненциально, с full jitter)
+и повторяет. work должен целиком перечитывать то, что меняет: после
+rollback все ORM-объекты сессии просрочены.
+"""
+import asyncio
+import logging
+import random
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.settings import settings
+from src.monitoring.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRIES = REGISTRY.counter(
+    "bonus_bot_db_retries_total",
+    "Повторы транзакций после временной ошибки БД",
+    labelnames=("operation", "reason"),
+)
+RETRIES_EXHAUSTED = REGISTRY.counter(
+    "bonus_bot_db_retries_exhausted_total",
+    "Транзакции, не прошедшие за все попытки",
+    labelnames=("operation",),
+)
+
+SQLITE_TRANSIENT_MESSAGES = ("database is locked", "database table is locked", "database is busy")
+# serialization_failure, deadlock_detected
+POSTGRES_TRANSIENT_SQLSTATES = {"40001", "40P01"}
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int
+    base_delay: float
+    max_delay: float
+
+    def backoff(self, attempt: int) -> float:
+        """Пауза перед попыткой attempt + 1 (full jitter)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+DEFAULT_POLICY = RetryPolicy(
+    attempts=settings.DB_RETRY_ATTEMPTS,
+    base_delay=settings.DB_RETRY_BASE_DELAY,
+    max_delay=settings.DB_RETRY_MAX_DELAY,
+)
+
+
+def transient_reason(exc: BaseException) -> Optional[str]:
+    """Код/текст временной ошибки или None, если повторять бессмысленно."""
+    if not isinstance(exc, DBAPIError):
+        return None
+
+    orig = exc.orig
+    sqlstate = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    if sqlstate in POSTGRES_TRANSIENT_SQLSTATES:
+        return sqlstate
+
+    message = str(orig).lower()
+    for text in SQLITE_TRANSIENT_MESSAGES:
+        if text in message:
+            return text
+    return None
+
+
+async def run_in_transaction(
+    session: AsyncSession,
+    work: Callable[[], Awaitable[T]],
+    *,
+    operation: str,
+    policy: RetryPolicy = DEFAULT_POLICY,
+) -> T:
+    """Выполнить work() + commit, повторяя при временных ошибках БД."""
+    attempt = 1
+    while True:
+        try:
+            result = await work()
+            await session.commit()
+            return result
+        except DBAPIError as exc:
+            await session.rollback()
+
+            reason = transient_reason(exc)
+            if reason is None:
+                raise
+            if attempt >= policy.attempts:
+                RETRIES_EXHAUSTED.inc(operation=operation)
+                logger.warning("%s: временная ошибка БД после %d попыток: %s", operation, attempt, reason)
+                raise
+
+            RETRIES.inc(operation=operation, reason=reason)
+            await asyncio.sleep(policy.backoff(attempt))
+            attempt += 1
@@ -0,0 +1,127 @@
+# src/database/routing.py
+"""
+Маршрутизация запросов между основной БД и репликой для чтения.
+
+Сессия уходит на реплику, только если:
+  - реплика настроена (DATABASE_REPLICA_URL);
+  - unit of work помечен как read-only (session.info["read_only"]);
+  - в этой сессии ещё не было записи и нет явного use_primary();
+  - это SELECT (text() и прочие «непонятные» запросы — на основную БД).
+
+Всё остальное (flush, INSERT/UPDATE/DELETE, чтение после записи) идёт
+на основную БД. После коммита с изменениями пользователь на
+READ_YOUR_WRITES_SECONDS «прилипает» к основной БД, чтобы сразу увидеть
+свой новый баланс, даже если реплика отстаёт.
+"""
+import time
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from src.monitoring.metrics import REGISTRY
+
+ROUTED_QUERIES = REGISTRY.counter(
+    "bonus_bot_db_routed_total",
+    "Обращения к БД по целевому движку",
+    labelnames=("target",),
+)
+
+
+class RoutingSession(Session):
+    """Session с двумя движками: self.bind (основная БД) и replica_bind."""
+
+    replica_bind: Optional[Engine] = None
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        if self._flushing or getattr(clause, "is_dml", False):
+            self.info["wrote"] = True
+        elif getattr(clause, "is_select", False) and self._routes_to_replica():
+            ROUTED_QUERIES.inc(target="replica")
+            return self.replica_bind
+
+        ROUTED_QUERIES.inc(target="primary")
+        return super().get_bind(mapper, clause=clause, **kw)
+
+    def _routes_to_replica(self) -> bool:
+        if self.replica_bind is None or not self.info.get("read_only"):
+            return False
+        return not (self.info.get("wrote") or self.info.get("primary_depth"))
+
+
+def configure_replica(replica_bind: Optional[Engine], read_your_writes_seconds: float):
+    RoutingSession.replica_bind = replica_bind
+    recent_writers.ttl = read_your_writes_seconds
+
+
+@contextmanager
+def use_primary(session):
+    """
+    Временно читать с основной БД (например, проверки перед записью,
+    чтобы не начислить бонус повторно по отставшей реплике).
+    """
+    info = session.info
+    info["primary_depth"] = info.get("primary_depth", 0) + 1
+    try:
+        yield session
+    finally:
+        info["primary_depth"] -= 1
+
+
+# ------------------------------------------------------------------
+# Read your own writes
+# ------------------------------------------------------------------
+class RecentWriters:
+    """telegram_id -> момент, до которого читаем только с основной БД."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._until: dict[int, float] = {}
+
+    def remember(self, telegram_ids: Iterable[int]):
+        now = time.monotonic()
+        if len(self._until) > 10_000:
+            self._until = {k: v for k, v in self._until.items() if v >= now}
+
+        deadline = now + self.ttl
+        for tg_id in telegram_ids:
+            if tg_id is not None:
+                self._until[tg_id] = deadline
+
+    def is_pinned(self, telegram_id: int) -> bool:
+        deadline = self._until.get(telegram_id)
+        if deadline is None:
+            return False
+        if deadline < time.monotonic():
+            del self._until[telegram_id]
+            return False
+        return True
+
+    def clear(self):
+        self._until.clear()
+
+
+recent_writers = RecentWriters(ttl=5.0)
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _collect_written_users(session, flush_context, instances):
+    from src.models.user import User
+
+    written = session.info.setdefault("written_telegram_ids", set())
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, User):
+            written.add(obj.telegram_id)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pin_recent_writers(session):
+    written = session.info.pop("written_telegram_ids", set())
+    if not (written or session.info.get("wrote")):
+        return
+    actor_id = session.info.get("actor_id")
+    if actor_id is not None:
+        written.add(actor_id)
+    recent_writers.remember(written)
@@ -1,31 +1,137 @@
 # src/database/session.py
-import os
 from contextlib import asynccontextmanager
+from typing import Optional
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+    async_sessionmaker,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.config.settings import settings, Settings
+from .pragmas import install_sqlite_pragmas
+from .unit_of_work import install_unit_of_work_hooks
+from .routing import RoutingSession, configure_replica
+
+
+def _is_memory_sqlite(url: URL) -> bool:
+    return url.database in (None, "", ":memory:")
+
+
+def build_engine_options(url: URL, cfg: Settings) -> dict:
+    """
+    Параметры create_async_engine для конкретного драйвера.
+
+    PostgreSQL/asyncpg получает полноценный пул (size/overflow/recycle/pre-ping)
+    и настройки кэша prepared statements. Файловый SQLite тоже держит
+    пул соединений вместо NullPool, чтобы не открывать файл на каждую сессию.
+    """
+    options: dict = {"echo": cfg.SQLALCHEMY_ECHO}
+    is_sqlite = url.get_backend_name() == "sqlite"
+
+    if is_sqlite:
+        options["connect_args"] = {"check_same_thread": False}
+        if _is_memory_sqlite(url):
+            # in-memory база живёт в одном соединении — пул не нужен
+            return options
+        options["poolclass"] = AsyncAdaptedQueuePool
+
+    options.update(
+        pool_size=cfg.DB_POOL_SIZE,
+        max_overflow=cfg.DB_MAX_OVERFLOW,
+        pool_timeout=cfg.DB_POOL_TIMEOUT,
+        pool_recycle=cfg.DB_POOL_RECYCLE,
+        # файловое соединение SQLite не «протухает», пинг там лишний
+        pool_pre_ping=cfg.DB_POOL_PRE_PING and not is_sqlite,
+    )
+
+    if url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            # кэш самого asyncpg
+            "statement_cache_size": cfg.DB_STATEMENT_CACHE_SIZE,
+            "server_settings": {"application_name": "bonus_bot"},
+        }
 
-# Используем SQLite
-DATABASE_URL = "sqlite+aiosqlite:///./bonus_bot.db"
+    return options
 
-def _parse_bool(value: str | None) -> bool:
-    if value is None:
-        return False
-    return value.strip().lower() in {"1", "true", "yes", "on"}
 
+def build_url(cfg: Settings, database_url: Optional[str] = None) -> URL:
+    url = make_url(database_url or cfg.DATABASE_URL)
+    if url.get_driver_name() == "asyncpg":
+        # кэш prepared statements на стороне диалекта SQLAlchemy
+        url = url.update_query_dict(
+            {"prepared_statement_cache_size": str(cfg.DB_STATEMENT_CACHE_SIZE)}
+        )
+    return url
+
+
+def create_engine_from_settings(
+    cfg: Settings = settings,
+    database_url: Optional[str] = None,
+) -> AsyncEngine:
+    url = build_url(cfg, database_url)
+    new_engine = create_async_engine(url, **build_engine_options(url, cfg))
+    if url.get_backend_name() == "sqlite":
+        install_sqlite_pragmas(new_engine, cfg.SQLITE_PRAGMA_PROFILE)
+    return new_engine
+
+
+def describe_pool(target: AsyncEngine, cfg: Settings = settings) -> dict:
+    """
+    Конфигурация пула (для логов и самопроверки на старте): размер, таймаут
+    и состояние — публичным API пула, остальное — то, что передали в
+    create_async_engine (build_engine_options).
+    """
+    pool = target.pool
+    info = {
+        "url": target.url.render_as_string(hide_password=True),
+        "dialect": target.dialect.name,
+        "driver": target.dialect.driver,
+        "pool": type(pool).__name__,
+    }
+
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        options = build_engine_options(target.url, cfg)
+        info.update(
+            size=pool.size(),
+            max_overflow=options["max_overflow"],
+            timeout=pool.timeout(),
+            recycle=options["pool_recycle"],
+            pre_ping=options["pool_pre_ping"],
+            status=pool.status(),
+        )
+
+    if target.dialect.driver == "asyncpg":
+        info["statement_cache_size"] = cfg.DB_STATEMENT_CACHE_SIZE
+    elif target.dialect.name == "sqlite":
+        info["sqlite_profile"] = cfg.SQLITE_PRAGMA_PROFILE
+
+    return info
 
-SQLALCHEMY_ECHO = _parse_bool(os.getenv("SQLALCHEMY_ECHO"))
 
 # Создаем асинхронный движок
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=SQLALCHEMY_ECHO,
-    connect_args={"check_same_thread": False}
+engine = create_engine_from_settings()
+install_unit_of_work_hooks(engine)
+
+# Реплика для read-only запросов (если настроена)
+replica_engine: Optional[AsyncEngine] = None
+if settings.DATABASE_REPLICA_URL:
+    replica_engine = create_engine_from_settings(settings, settings.DATABASE_REPLICA_URL)
+    install_unit_of_work_hooks(replica_engine)
+
+configure_replica(
+    replica_engine.sync_engine if replica_engine is not None else None,
+    settings.READ_YOUR_WRITES_SECONDS,
 )
 
-# Фабрика сессий
+# Фабрика сессий: запись — в основную БД, read-only unit of work — в реплику
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
     expire_on_commit=False,
     autoflush=False
 )
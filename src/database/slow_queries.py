@@ -0,0 +1,135 @@
+# src/database/slow_queries.py
+"""
+Журнал медленных SQL-запросов (JSONL с ротацией).
+
+Запрос, выполнявшийся дольше SLOW_QUERY_THRESHOLD_MS, с вероятностью
+SLOW_QUERY_SAMPLE_RATE попадает в SLOW_QUERY_LOG_PATH одной JSON-строкой:
+
+    {"ts": ..., "duration_ms": ..., "rows": ..., "statement": "...",
+     "params": {"telegram_id_1": "int"}, "executemany": false,
+     "handler": "user_balance",
+     "caller": "src/services/holiday_bonus_service.py:_check_calendar_holidays",
+     "engine": "primary"}
+
+rows — rowcount драйвера; null, если драйвер его не сообщает (SELECT на
+SQLite, executemany на asyncpg): запись делается сразу после execute,
+до того как строки прочитаны. Значения параметров не пишем — только их
+типы (в них телефоны).
+handler — хендлер апдейта (см. InstrumentationMiddleware), caller —
+ближайшая функция проекта вне src/database, из которой пришёл запрос.
+"""
+import json
+import logging
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+import greenlet
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.database.unit_of_work import current_stats, cursor_rows
+from src.monitoring.logs import rotating_file_handler, start_queue_logging
+from src.monitoring.metrics import REGISTRY
+
+SLOW_QUERIES = REGISTRY.counter(
+    "bonus_bot_db_slow_queries_total",
+    "Запросы дольше порога (включая не попавшие в выборку)",
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+SRC_DIR = str(PROJECT_ROOT / "src")
+# сам слой доступа к БД (queries, retry, routing) атрибуцией не считаем
+DATABASE_DIR = str(PROJECT_ROOT / "src" / "database")
+
+slow_query_logger = logging.getLogger("bonus_bot.slow_sql")
+
+
+def configure_slow_query_log(path: str, max_bytes: int, backup_count: int):
+    # запись в файл — в фоновом потоке, как и основной лог (src.monitoring.logs)
+    handler = rotating_file_handler(path, max_bytes, backup_count)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    slow_query_logger.setLevel(logging.INFO)
+    slow_query_logger.propagate = False
+    start_queue_logging(slow_query_logger, [handler])
+
+
+def _param_shape(parameters: Any) -> Any:
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _caller() -> Optional[str]:
+    """
+    Первая функция проекта (вне src/database) в стеке вызова.
+
+    Под AsyncSession запрос выполняется в greenlet'е SQLAlchemy, и его
+    стек обрывается на greenlet_spawn — продолжаем по кадру родительского
+    greenlet'а, где висят корутины сервиса/хендлера.
+    """
+    frame = sys._getframe(2)
+    current = greenlet.getcurrent()
+    while True:
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(SRC_DIR) and not filename.startswith(DATABASE_DIR):
+                return f"{Path(filename).relative_to(PROJECT_ROOT).as_posix()}:{frame.f_code.co_name}"
+            frame = frame.f_back
+        current = current.parent
+        if current is None:
+            return None
+        frame = current.gr_frame
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms: float, sample_rate: float, engine_name: str):
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.engine_name = engine_name
+
+    def before(self, conn, cursor, statement, parameters, context, executemany):
+        context._slow_query_started = time.perf_counter()
+
+    def after(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_slow_query_started", None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        if duration < self.threshold:
+            return
+
+        SLOW_QUERIES.inc()
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+
+        stats = current_stats()
+        record = {
+            "ts": datetime.now().isoformat(timespec="milliseconds"),
+            "duration_ms": round(duration * 1000, 3),
+            "rows": cursor_rows(cursor),
+            "statement": " ".join(statement.split()),
+            "params": _param_shape(parameters[0] if executemany and parameters else parameters),
+            "executemany": executemany,
+            "handler": stats.handler if stats else None,
+            "caller": _caller(),
+            "engine": self.engine_name,
+        }
+        slow_query_logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def install_slow_query_log(
+    target: AsyncEngine,
+    threshold_ms: float,
+    sample_rate: float,
+    engine_name: str = "primary",
+) -> SlowQueryLog:
+    log = SlowQueryLog(threshold_ms, sample_rate, engine_name)
+    event.listen(target.sync_engine, "before_cursor_execute", log.before)
+    event.listen(target.sync_engine, "after_cursor_execute", log.after)
+    return log
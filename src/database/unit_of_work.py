@@ -0,0 +1,156 @@
+# src/database/unit_of_work.py
+"""
+Учёт обращений к БД в рамках одного апдейта (unit of work).
+
+Внутри track_unit_of_work() считаем, сколько сессий реально начали
+транзакцию, сколько раз соединение было взято из пула, сколько
+выполнено SQL-запросов и сколько строк они вернули/затронули (у запросов
+через сессию — по прочитанному результату, у остальных — по rowcount
+драйвера, см. cursor_rows). Контекст передаётся через contextvars,
+поэтому работает и в greenlet-ах SQLAlchemy, и в тасках, порождённых из
+хендлера.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+from src.monitoring.metrics import REGISTRY
+
+UOW_SESSIONS = REGISTRY.counter(
+    "bonus_bot_db_sessions_total",
+    "Сессии, начавшие транзакцию в рамках апдейта",
+)
+UOW_CONNECTIONS = REGISTRY.counter(
+    "bonus_bot_db_connection_checkouts_total",
+    "Выдачи соединений из пула в рамках апдейта",
+)
+UOW_QUERIES = REGISTRY.histogram(
+    "bonus_bot_update_queries",
+    "SQL-запросов на один апдейт",
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34),
+)
+UOW_ROWS = REGISTRY.histogram(
+    "bonus_bot_update_rows",
+    "Строк прочитано/изменено за один апдейт",
+    buckets=(0, 1, 10, 50, 100, 500, 1000, 5000),
+)
+UOW_UPDATES = REGISTRY.counter(
+    "bonus_bot_db_units_of_work_total",
+    "Обработанные апдейты по факту обращения к БД",
+    labelnames=("touched_db",),
+)
+
+
+@dataclass
+class UnitOfWorkStats:
+    session_ids: set[int] = field(default_factory=set)
+    connections: int = 0
+    queries: int = 0
+    rows: int = 0
+    # хендлер апдейта (ставит InstrumentationMiddleware) — для атрибуции запросов
+    handler: Optional[str] = None
+
+    @property
+    def sessions(self) -> int:
+        return len(self.session_ids)
+
+
+# опция выполнения: строки запроса посчитает _on_orm_execute
+ROWS_ON_RESULT = "unit_of_work_rows_on_result"
+
+_current: ContextVar[Optional[UnitOfWorkStats]] = ContextVar("db_unit_of_work", default=None)
+
+
+def current_stats() -> Optional[UnitOfWorkStats]:
+    return _current.get()
+
+
+@contextmanager
+def track_unit_of_work() -> Iterator[UnitOfWorkStats]:
+    stats = UnitOfWorkStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        UOW_SESSIONS.inc(stats.sessions)
+        UOW_CONNECTIONS.inc(stats.connections)
+        UOW_QUERIES.observe(stats.queries)
+        UOW_ROWS.observe(stats.rows)
+        UOW_UPDATES.inc(touched_db="yes" if stats.connections else "no")
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    stats = _current.get()
+    if stats is not None:
+        stats.connections += 1
+
+
+def _on_before_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+
+
+def _on_after_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or context.execution_options.get(ROWS_ON_RESULT):
+        return
+    stats.rows += cursor_rows(cursor) or 0
+
+
+def _on_orm_execute(orm_execute_state):
+    """
+    Запросы через сессию: строки считаем по результату, а не по rowcount —
+    для SELECT на SQLite драйвер его не знает. Результат async-драйверов
+    и так целиком в памяти, freeze() его не перечитывает.
+    """
+    stats = _current.get()
+    if stats is None:
+        return None
+    options = orm_execute_state.execution_options
+    if options.get("stream_results") or options.get("yield_per"):
+        return None
+
+    result = orm_execute_state.invoke_statement(execution_options={ROWS_ON_RESULT: True})
+    if not getattr(result, "returns_rows", True):
+        # UPDATE/DELETE без RETURNING
+        stats.rows += max(result.rowcount, 0)
+        return result
+    frozen = result.freeze()
+    stats.rows += len(frozen.data)
+    return frozen()
+
+
+def cursor_rows(cursor) -> Optional[int]:
+    """
+    Строк вернул/затронул запрос по публичному DB-API rowcount; None —
+    драйвер не знает. asyncpg заполняет rowcount и для SELECT (из статуса
+    "SELECT n"), sqlite3 — лишь для INSERT/UPDATE/DELETE; для SELECT на
+    SQLite и executemany под asyncpg будет None, а не 0.
+    """
+    rowcount = getattr(cursor, "rowcount", -1)
+    if rowcount is None or rowcount < 0:
+        return None
+    return rowcount
+
+
+def _on_session_begin(session, transaction, connection):
+    stats = _current.get()
+    if stats is not None:
+        stats.session_ids.add(id(session))
+
+
+def install_unit_of_work_hooks(target: AsyncEngine):
+    event.listen(target.sync_engine, "checkout", _on_checkout)
+    event.listen(target.sync_engine, "before_cursor_execute", _on_before_execute)
+    event.listen(target.sync_engine, "after_cursor_execute", _on_after_execute)
+    if not event.contains(Session, "after_begin", _on_session_begin):
+        event.listen(Session, "after_begin", _on_session_begin)
+    if not event.contains(Session, "do_orm_execute", _on_orm_execute):
+        event.listen(Session, "do_orm_execute", _on_orm_execute)
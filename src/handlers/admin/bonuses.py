@@ -1,19 +1,20 @@
 # src/handlers/admin/bonuses.py
 
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 
-from sqlalchemy import select
-
-from src.database import AsyncSessionLocal
-from src.models.user import User
+from src.database import queries
+from src.database.retry import run_in_transaction
 from src.services.holiday_bonus_service import HolidayBonusService
+from src.services.user_service import UserService
+from src.utils.user_cards import format_user_card
 from src.keyboards.admin_kb import (
     admin_back_to_users_kb,
     admin_user_actions_kb,
 )
+from src.utils.dispatch_index import DataStartsWith
 
 router = Router()
 
@@ -32,36 +33,22 @@ class BonusFSM(StatesGroup):
 # Вернуться к карточке пользователя
 # ============================================================
 
-@router.callback_query(F.data.startswith("bonus_back_user:"))
-async def bonus_back_user(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(DataStartsWith("bonus_back_user:"))
+async def bonus_back_user(callback: CallbackQuery, state: FSMContext, session):
     user_id = int(callback.data.split(":")[1])
 
-    async with AsyncSessionLocal() as session:
-        user = (
-            await session.execute(select(User).where(User.id == user_id))
-        ).scalar_one_or_none()
+    card = await UserService(session).get_user_card(user_id)
 
-    if not user:
+    if not card:
         await callback.message.edit_text("❌ Пользователь не найден")
         await state.clear()
         await callback.answer()
         return
 
-    text = (
-        f"👤 *Пользователь*\n\n"
-        f"ID: {user.id}\n"
-        f"Telegram ID: {user.telegram_id}\n"
-        f"Имя: {user.first_name or ''} {user.last_name or ''}\n"
-        f"Телефон: {user.phone or '-'}\n"
-        f"Обычные бонусы: {user.balance}\n"
-        f"Праздничные бонусы: {user.holiday_balance}\n"
-        f"Всего бонусов: {user.total_balance}\n"
-    )
-
     await callback.message.edit_text(
-        text,
+        format_user_card(card),
         parse_mode="Markdown",
-        reply_markup=admin_user_actions_kb(user.id),
+        reply_markup=admin_user_actions_kb(card.id),
     )
     await state.clear()
     await callback.answer()
@@ -71,14 +58,13 @@ async def bonus_back_user(callback: CallbackQuery, state: FSMContext):
 # Начисление бонусов (ручной ввод)
 # ============================================================
 
-@router.callback_query(F.data.startswith("bonus_add_user:"))
-async def admin_bonus_add(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(DataStartsWith("bonus_add_user:"))
+async def admin_bonus_add(callback: CallbackQuery, state: FSMContext, session):
     user_id = int(callback.data.split(":")[1])
 
-    async with AsyncSessionLocal() as session:
-        user = (
-            await session.execute(select(User).where(User.id == user_id))
-        ).scalar_one_or_none()
+    user = (
+        await session.execute(queries.user_by_id(user_id))
+    ).scalar_one_or_none()
 
     if not user:
         await callback.answer("Пользователь не найден", show_alert=True)
@@ -95,7 +81,7 @@ async def admin_bonus_add(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(BonusFSM.add)
-async def admin_bonus_add_finish(message: Message, state: FSMContext):
+async def admin_bonus_add_finish(message: Message, state: FSMContext, session):
     try:
         if message.text is None:
             raise ValueError
@@ -108,13 +94,13 @@ async def admin_bonus_add_finish(message: Message, state: FSMContext):
     data = await state.get_data()
     user_id = data["user_id"]
 
-    async with AsyncSessionLocal() as session:
+    async def _add():
         user = (
-            await session.execute(select(User).where(User.id == user_id))
+            await session.execute(queries.user_by_id(user_id))
         ).scalar_one()
-
         user.balance += amount
-        await session.commit()
+
+    await run_in_transaction(session, _add, operation="admin_bonus_add")
 
     await message.answer(
         f"✅ Пользователю начислено *{amount}* бонусов.",
@@ -127,14 +113,13 @@ async def admin_bonus_add_finish(message: Message, state: FSMContext):
 # Списание бонусов (ручной ввод)
 # ============================================================
 
-@router.callback_query(F.data.startswith("bonus_sub_user:"))
-async def admin_bonus_sub(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(DataStartsWith("bonus_sub_user:"))
+async def admin_bonus_sub(callback: CallbackQuery, state: FSMContext, session):
     user_id = int(callback.data.split(":")[1])
 
-    async with AsyncSessionLocal() as session:
-        user = (
-            await session.execute(select(User).where(User.id == user_id))
-        ).scalar_one_or_none()
+    user = (
+        await session.execute(queries.user_by_id(user_id))
+    ).scalar_one_or_none()
 
     if not user:
         await callback.answer("Пользователь не найден", show_alert=True)
@@ -151,7 +136,7 @@ async def admin_bonus_sub(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(BonusFSM.subtract)
-async def admin_bonus_sub_finish(message: Message, state: FSMContext):
+async def admin_bonus_sub_finish(message: Message, state: FSMContext, session):
     try:
         if message.text is None:
             raise ValueError
@@ -164,15 +149,13 @@ async def admin_bonus_sub_finish(message: Message, state: FSMContext):
     data = await state.get_data()
     user_id = data["user_id"]
 
-    async with AsyncSessionLocal() as session:
+    async def _subtract() -> bool:
         user = (
-            await session.execute(select(User).where(User.id == user_id))
+            await session.execute(queries.user_by_id(user_id))
         ).scalar_one()
 
         if user.total_balance < amount:
-            return await message.answer(
-                "❌ Недостаточно бонусов для списания!"
-            )
+            return False
 
         holiday_service = HolidayBonusService(session)
         used_holiday = await holiday_service.apply_holiday_bonus_spend(user.id, amount)
@@ -181,7 +164,12 @@ async def admin_bonus_sub_finish(message: Message, state: FSMContext):
             user.balance -= remaining
             if user.balance < 0:
                 user.balance = 0
-        await session.commit()
+        return True
+
+    if not await run_in_transaction(session, _subtract, operation="admin_bonus_subtract"):
+        return await message.answer(
+            "❌ Недостаточно бонусов для списания!"
+        )
 
     await message.answer(
         f"🧾 С пользователя списано *{amount}* бонусов.",
@@ -194,14 +182,13 @@ async def admin_bonus_sub_finish(message: Message, state: FSMContext):
 # Начисление 5% от суммы покупки
 # ============================================================
 
-@router.callback_query(F.data.startswith("bonus_percent_user:"))
-async def admin_bonus_percent(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(DataStartsWith("bonus_percent_user:"))
+async def admin_bonus_percent(callback: CallbackQuery, state: FSMContext, session):
     user_id = int(callback.data.split(":")[1])
 
-    async with AsyncSessionLocal() as session:
-        user = (
-            await session.execute(select(User).where(User.id == user_id))
-        ).scalar_one_or_none()
+    user = (
+        await session.execute(queries.user_by_id(user_id))
+    ).scalar_one_or_none()
 
     if not user:
         await callback.answer("Пользователь не найден", show_alert=True)
@@ -218,7 +205,7 @@ async def admin_bonus_percent(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(BonusFSM.percent)
-async def admin_bonus_percent_finish(message: Message, state: FSMContext):
+async def admin_bonus_percent_finish(message: Message, state: FSMContext, session):
     try:
         if message.text is None:
             raise ValueError
@@ -233,13 +220,13 @@ async def admin_bonus_percent_finish(message: Message, state: FSMContext):
     data = await state.get_data()
     user_id = data["user_id"]
 
-    async with AsyncSessionLocal() as session:
+    async def _add_percent():
         user = (
-            await session.execute(select(User).where(User.id == user_id))
+            await session.execute(queries.user_by_id(user_id))
         ).scalar_one()
-
         user.balance += bonus
-        await session.commit()
+
+    await run_in_transaction(session, _add_percent, operation="admin_bonus_percent")
 
     await message.answer(
         f"💸 Покупка: *{purchase_amount}₽*\n"
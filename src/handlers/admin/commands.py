@@ -3,10 +3,12 @@
 from aiogram import Router
 from aiogram.types import Message
 from aiogram.filters import Command
-from sqlalchemy import select, func
+from sqlalchemy import select
 
-from src.database import AsyncSessionLocal
+from src.database import queries
+from src.database.identity import identity_cache
 from src.models.user import User
+from src.services.bonus_service import BonusService
 
 # корректный импорт новой клавиатуры
 from src.keyboards.admin_kb import admin_main_menu_kb
@@ -17,26 +19,22 @@ router = Router()
 # ---------------------------------------------------------
 # Проверка роли администратора
 # ---------------------------------------------------------
-async def is_admin(tg_id: int) -> bool:
-    async with AsyncSessionLocal() as session:
-        res = await session.execute(select(User).where(User.telegram_id == tg_id))
-        u = res.scalar_one_or_none()
-        return bool(u and u.role == "admin")
+async def is_admin(session, tg_id: int) -> bool:
+    return (await identity_cache.resolve(session, tg_id, require_admin=True)).is_admin
 
 
 # ---------------------------------------------------------
 # Команда: статистика
 # ---------------------------------------------------------
-@router.message(Command("stats"))
-async def admin_stats(message: Message):
-    if not await is_admin(message.from_user.id):
+@router.message(Command("stats"), flags={"read_only": True})
+async def admin_stats(message: Message, session):
+    if not await is_admin(session, message.from_user.id):
         return await message.answer("⛔ Нет доступа")
 
-    async with AsyncSessionLocal() as session:
-        total_users = await session.scalar(select(func.count(User.id)))
-        total_balance = await session.scalar(
-            select(func.sum(User.balance + User.holiday_balance))
-        )
+    total_users = await session.scalar(queries.users_count())
+    total_balance = await session.scalar(
+        queries.users_total_balance()
+    )
 
     total_balance = total_balance or 0
 
@@ -53,8 +51,8 @@ async def admin_stats(message: Message):
 # Команда: начислить бонусы по Telegram ID
 # ---------------------------------------------------------
 @router.message(Command("addbonus"))
-async def add_bonus_cmd(message: Message):
-    if not await is_admin(message.from_user.id):
+async def add_bonus_cmd(message: Message, session):
+    if not await is_admin(session, message.from_user.id):
         return await message.answer("⛔ Нет доступа")
 
     parts = message.text.split()
@@ -67,24 +65,25 @@ async def add_bonus_cmd(message: Message):
     except ValueError:
         return await message.answer("ID и сумма должны быть числами")
 
-    async with AsyncSessionLocal() as session:
-        stmt = select(User).where(User.telegram_id == tg_id)
-        res = await session.execute(stmt)
-        user = res.scalar_one_or_none()
+    if amount <= 0:
+        return await message.answer("Сумма должна быть положительной")
+
+    stmt = queries.user_by_telegram_id(tg_id)
+    res = await session.execute(stmt)
+    user = res.scalar_one_or_none()
 
-        if not user:
-            return await message.answer("❌ Пользователь не найден")
+    if not user:
+        return await message.answer("❌ Пользователь не найден")
 
-        old_balance = user.balance
-        user.balance += amount
-        await session.commit()
+    # с повтором транзакции и строкой истории, как и остальные начисления
+    new_balance = await BonusService(session).add_bonus(user.id, amount)
 
-        await message.answer(
-            f"✅ Бонусы начислены!\n\n"
-            f"👤 {user.first_name}\n"
-            f"💎 Было (обычные): {old_balance}\n"
-            f"💎 Стало (обычные): {user.balance}"
-        )
+    await message.answer(
+        f"✅ Бонусы начислены!\n\n"
+        f"👤 {user.first_name}\n"
+        f"💎 Было (обычные): {new_balance - amount}\n"
+        f"💎 Стало (обычные): {new_balance}"
+    )
 
 
 # ---------------------------------------------------------
@@ -102,9 +101,9 @@ def normalize_phone(phone: str) -> str:
 # ---------------------------------------------------------
 # Команда: поиск пользователя по телефону
 # ---------------------------------------------------------
-@router.message(Command("findphone"))
-async def find_phone_cmd(message: Message):
-    if not await is_admin(message.from_user.id):
+@router.message(Command("findphone"), flags={"read_only": True})
+async def find_phone_cmd(message: Message, session):
+    if not await is_admin(session, message.from_user.id):
         return await message.answer("⛔ Нет доступа")
 
     args = message.text.split(maxsplit=1)
@@ -113,9 +112,8 @@ async def find_phone_cmd(message: Message):
 
     search = normalize_phone(args[1])
 
-    async with AsyncSessionLocal() as session:
-        stmt = select(User).where(User.phone.ilike(f"%{search}%"))
-        users = (await session.execute(stmt)).scalars().all()
+    stmt = select(User).where(User.phone.ilike(f"%{search}%"))
+    users = (await session.execute(stmt)).scalars().all()
 
     if not users:
         return await message.answer("❌ Пользователь не найден")
@@ -135,13 +133,12 @@ async def find_phone_cmd(message: Message):
 # Команда: список пользователей
 # ---------------------------------------------------------
 @router.message(Command("users"))
-async def list_users(message: Message):
-    if not await is_admin(message.from_user.id):
+async def list_users(message: Message, session):
+    if not await is_admin(session, message.from_user.id):
         return await message.answer("⛔ Нет доступа")
 
-    async with AsyncSessionLocal() as session:
-        stmt = select(User).order_by(User.created_at.desc())
-        users = (await session.execute(stmt)).scalars().all()
+    stmt = select(User).order_by(User.created_at.desc())
+    users = (await session.execute(stmt)).scalars().all()
 
     text = "<b>👥 Список пользователей</b>\n\n"
     for u in users[:30]:
@@ -1,22 +1,32 @@
 # src/handlers/admin/holidays.py
 
-from aiogram import Router, F
+import time
+from contextlib import suppress
+from datetime import datetime
+from typing import Optional
+
+from aiogram import Router
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
 
 from sqlalchemy import select
-from datetime import datetime, timedelta
 
-from src.database import AsyncSessionLocal
-from src.models.holiday_bonus import HolidayBonus, UserHolidayBonus
-from src.models.user import User
-from src.services.holiday_bonus_service import HolidayBonusService
+from src.database import queries
+from src.database.retry import run_in_transaction
+from src.jobs.accrual import AccrualJob, AccrualReport
+from src.jobs.claims import HolidayBusy
+from src.jobs.revocation import HolidayRevocation, RevocationReport
+from src.jobs.scheduler import spawn
+from src.models.holiday_bonus import HolidayBonus
+from src.services.holiday_calendar import holiday_calendar
 from src.keyboards.admin_kb import (
     admin_back_kb,
     admin_holiday_actions_kb,
     admin_holidays_list_kb,
 )
+from src.utils.dispatch_index import DataIs, DataStartsWith
 
 router = Router()
 
@@ -34,10 +44,9 @@ class HolidayFSM(StatesGroup):
 # Просмотр списка праздников
 # =====================================================
 
-@router.callback_query(F.data == "admin_holiday_list")
-async def admin_holiday_list(callback: CallbackQuery):
-    async with AsyncSessionLocal() as session:
-        holidays = (await session.execute(select(HolidayBonus))).scalars().all()
+@router.callback_query(DataIs("admin_holiday_list"))
+async def admin_holiday_list(callback: CallbackQuery, session):
+    holidays = (await session.execute(select(HolidayBonus))).scalars().all()
 
     if not holidays:
         text = "🎉 Список праздников пока пуст."
@@ -58,16 +67,15 @@ async def admin_holiday_list(callback: CallbackQuery):
 # Открытие одного праздника
 # =====================================================
 
-@router.callback_query(F.data.startswith("admin_holiday_open:"))
-async def admin_holiday_open(callback: CallbackQuery):
+@router.callback_query(DataStartsWith("admin_holiday_open:"))
+async def admin_holiday_open(callback: CallbackQuery, session):
     holiday_id = int(callback.data.split(":")[1])
 
-    async with AsyncSessionLocal() as session:
-        holiday = (
-            await session.execute(
-                select(HolidayBonus).where(HolidayBonus.id == holiday_id)
-            )
-        ).scalar_one_or_none()
+    holiday = (
+        await session.execute(
+            queries.holiday_by_id(holiday_id)
+        )
+    ).scalar_one_or_none()
 
     if not holiday:
         await callback.answer("Ошибка: праздник не найден", show_alert=True)
@@ -91,7 +99,7 @@ async def admin_holiday_open(callback: CallbackQuery):
 # Создание нового праздника — шаг 1 (название)
 # =====================================================
 
-@router.callback_query(F.data == "admin_holiday_add")
+@router.callback_query(DataIs("admin_holiday_add"))
 async def holiday_create(callback: CallbackQuery, state: FSMContext):
     await state.set_state(HolidayFSM.name)
 
@@ -120,7 +128,7 @@ async def holiday_set_name(message: Message, state: FSMContext):
 # =====================================================
 
 @router.message(HolidayFSM.amount)
-async def holiday_set_amount(message: Message, state: FSMContext):
+async def holiday_set_amount(message: Message, state: FSMContext, session):
     try:
         amount = int(message.text)
         if amount <= 0:
@@ -132,10 +140,10 @@ async def holiday_set_amount(message: Message, state: FSMContext):
     data = await state.get_data()
     name = data["name"]
 
-    async with AsyncSessionLocal() as session:
-        holiday = HolidayBonus(name=name, amount=amount)
-        session.add(holiday)
-        await session.commit()
+    holiday = HolidayBonus(name=name, amount=amount)
+    session.add(holiday)
+    await session.commit()
+    holiday_calendar.invalidate()
 
     await message.answer(
         f"🎉 Праздник *{name}* создан! Бонус: {amount}",
@@ -145,31 +153,106 @@ async def holiday_set_amount(message: Message, state: FSMContext):
     await state.clear()
 
 
+# =====================================================
+# Длинные операции (начисление всем, списание при удалении)
+# идут в фоне и показывают прогресс в сообщении админа
+# =====================================================
+
+# Сколько секунд минимум между правками сообщения о прогрессе
+PROGRESS_EDIT_INTERVAL = 2.0
+
+BUSY_TEXT = "⏳ По празднику уже идёт начисление или списание"
+
+
+def _is_claimed(holiday) -> bool:
+    # подсказка до запуска; сам захват (src.jobs.claims) — в задаче
+    return holiday.claimed_until is not None and holiday.claimed_until > datetime.now()
+
+
+def _progress_editor(message: Message):
+    last_edit = time.monotonic()
+
+    async def edit(text: str):
+        nonlocal last_edit
+        if time.monotonic() - last_edit < PROGRESS_EDIT_INTERVAL:
+            return
+        last_edit = time.monotonic()
+        with suppress(TelegramBadRequest):
+            await message.edit_text(text, parse_mode="Markdown")
+
+    return edit
+
+
 # =====================================================
 # Удаление праздника
 # =====================================================
 
-@router.callback_query(F.data.startswith("holiday_delete:"))
-async def holiday_delete(callback: CallbackQuery):
+def _revoke_progress_text(name: str, report: RevocationReport) -> str:
+    return (
+        f"⏳ Удаляем праздник *{name}*, списываем бонусы…\n"
+        f"Списано бонусов: {report.bonuses} из {report.bonuses_total}"
+    )
+
+
+async def _revoke_and_delete(message: Message, holiday_id: int, name: str):
+    edit = _progress_editor(message)
+    try:
+        report = await HolidayRevocation().run(
+            holiday_id, on_progress=lambda r: edit(_revoke_progress_text(name, r))
+        )
+    except HolidayBusy:
+        await message.edit_text(f"{BUSY_TEXT}. Праздник выключен — удалите его ещё раз позже.")
+        return
+    except Exception:
+        await message.edit_text("❌ Списание прервано. Праздник выключен — удалите его ещё раз, чтобы продолжить.")
+        raise
+
+    if not report.deleted:
+        await message.edit_text(
+            f"⚠️ Списано бонусов: {report.bonuses}, но часть ещё занята другими операциями — "
+            "праздник выключен, но не удалён. Удалите его ещё раз позже."
+        )
+        return
+    await message.edit_text(
+        f"🗑 Праздник удалён, списано бонусов: {report.bonuses} "
+        f"у {report.users} пользователей ({report.amount})."
+    )
+
+
+@router.callback_query(DataStartsWith("holiday_delete:"))
+async def holiday_delete(callback: CallbackQuery, session):
     holiday_id = int(callback.data.split(":")[1])
 
-    async with AsyncSessionLocal() as session:
+    async def _disable() -> Optional[str]:
         holiday = (
             await session.execute(
-                select(HolidayBonus).where(HolidayBonus.id == holiday_id)
+                queries.holiday_by_id(holiday_id)
             )
         ).scalar_one_or_none()
 
         if not holiday:
-            await callback.answer("Ошибка: праздник не найден", show_alert=True)
-            return
+            return None
+        if _is_claimed(holiday):
+            return ""
 
-        holiday_service = HolidayBonusService(session)
-        await holiday_service.expire_holiday_bonuses_for_holiday(holiday.id)
-        await session.delete(holiday)
-        await session.commit()
+        # сразу перестаём начислять; строку удалит HolidayRevocation после списания
+        holiday.is_active = False
+        return holiday.name
 
-    await callback.message.edit_text("🗑 Праздник удалён, бонусы списаны.")
+    name = await run_in_transaction(session, _disable, operation="holiday_disable")
+    if name is None:
+        await callback.answer("Ошибка: праздник не найден", show_alert=True)
+        return
+    if not name:
+        await callback.answer(BUSY_TEXT, show_alert=True)
+        return
+    holiday_calendar.invalidate()
+
+    await callback.message.edit_text(
+        f"⏳ Праздник *{name}* выключен, бонусы списываются…",
+        parse_mode="Markdown"
+    )
+    spawn("holiday_revocation", lambda: _revoke_and_delete(callback.message, holiday_id, name))
     await callback.answer()
 
 
@@ -177,44 +260,67 @@ async def holiday_delete(callback: CallbackQuery):
 # Начисление бонусов всем пользователям за праздник
 # =====================================================
 
-@router.callback_query(F.data.startswith("holiday_give:"))
-async def holiday_give(callback: CallbackQuery):
-    holiday_id = int(callback.data.split(":")[1])
+def _give_progress_text(name: str, report: AccrualReport) -> str:
+    return (
+        f"⏳ Начисляем бонусы за *{name}*…\n"
+        f"Обработано пользователей: {report.users_scanned} из {report.users_total}\n"
+        f"Начислено: {report.awards}"
+    )
 
-    async with AsyncSessionLocal() as session:
-        holiday = (
-            await session.execute(
-                select(HolidayBonus).where(HolidayBonus.id == holiday_id)
-            )
-        ).scalar_one_or_none()
 
-        if not holiday:
-            await callback.answer("Ошибка: праздник не найден", show_alert=True)
-            return
+async def _give_to_all(message: Message, holiday_id: int, name: str):
+    edit = _progress_editor(message)
+    try:
+        report = await AccrualJob().give(
+            holiday_id, on_progress=lambda r: edit(_give_progress_text(name, r))
+        )
+    except HolidayBusy:
+        await message.edit_text(BUSY_TEXT)
+        return
+    except Exception:
+        await message.edit_text("❌ Начисление прервано. Можно запустить ещё раз — уже начисленное не задвоится.")
+        raise
+
+    if report is None:
+        text = "Ошибка: праздник не найден или выключен"
+    elif report.awards:
+        text = (
+            f"🎁 Начислено {report.awards} пользователям по {report.amount // report.awards} "
+            f"бонусов за *{name}*!"
+        )
+    else:
+        text = f"🎁 Бонусы за *{name}* уже начислены всем пользователям."
+    await message.edit_text(text, parse_mode="Markdown")
 
-        users = (await session.execute(select(User))).scalars().all()
 
-        for user in users:
-            user.holiday_balance += holiday.amount
+@router.callback_query(DataStartsWith("holiday_give:"))
+async def holiday_give(callback: CallbackQuery, session):
+    holiday_id = int(callback.data.split(":")[1])
 
-            expires_at = None
-            if holiday.days_valid is not None:
-                expires_at = datetime.now() + timedelta(days=holiday.days_valid)
+    holiday = (
+        await session.execute(
+            queries.holiday_by_id(holiday_id)
+        )
+    ).scalar_one_or_none()
 
-            session.add(
-                UserHolidayBonus(
-                    user_id=user.id,
-                    holiday_id=holiday.id,
-                    amount=holiday.amount,
-                    expires_at=expires_at,
-                    is_active=True,
-                )
-            )
+    if not holiday:
+        await callback.answer("Ошибка: праздник не найден", show_alert=True)
+        return
 
-        await session.commit()
+    if not holiday.is_active:
+        # выключен удалением (списание идёт или прервано) — новые бонусы оно не спишет
+        await callback.answer("Праздник выключен, начислить нельзя", show_alert=True)
+        return
+
+    if _is_claimed(holiday):
+        await callback.answer(BUSY_TEXT, show_alert=True)
+        return
 
+    # начисляем чанками в фоне (src.jobs.accrual), сообщение показывает прогресс;
+    # повторный запуск не задвоит бонусы (src.database.locks)
     await callback.message.edit_text(
-        f"🎁 Всем пользователям начислено {holiday.amount} бонусов за *{holiday.name}*!",
+        f"⏳ Начисляем бонусы за *{holiday.name}*…",
         parse_mode="Markdown"
     )
+    spawn("holiday_give", lambda: _give_to_all(callback.message, holiday_id, holiday.name))
     await callback.answer()
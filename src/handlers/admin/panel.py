@@ -1,6 +1,6 @@
 # src/handlers/admin/panel.py
 
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
@@ -11,10 +11,10 @@ from src.keyboards.admin_kb import (
     admin_bonuses_menu_kb,
     admin_holidays_menu_kb,
 )
-from src.database import AsyncSessionLocal
-from src.models.user import User
+from src.database import queries
 from src.handlers.admin.qr_scan import QrScanFSM
-from sqlalchemy import select, func
+from src.services.user_service import UserService
+from src.utils.dispatch_index import DataIs, DataStartsWith, TextIs
 
 router = Router()
 
@@ -22,7 +22,7 @@ router = Router()
 # ---------------------------------------------------------
 # Вход в админ-панель
 # ---------------------------------------------------------
-@router.message(F.text == "/admin")
+@router.message(TextIs("/admin"))
 async def open_admin_panel(message: Message, is_admin: bool):
     if not is_admin:
         return await message.answer("⛔ У вас нет доступа!")
@@ -33,7 +33,7 @@ async def open_admin_panel(message: Message, is_admin: bool):
 # ---------------------------------------------------------
 # Переход в главное меню админа
 # ---------------------------------------------------------
-@router.callback_query(F.data == "admin_menu")
+@router.callback_query(DataIs("admin_menu"))
 async def admin_menu(callback: CallbackQuery, state: FSMContext):
     await state.clear()
     await callback.message.edit_text("⚙ Админ-панель", reply_markup=admin_main_menu_kb())
@@ -43,29 +43,24 @@ async def admin_menu(callback: CallbackQuery, state: FSMContext):
 # ---------------------------------------------------------
 # Блок пользователей → показать список
 # ---------------------------------------------------------
-@router.callback_query(F.data == "admin_users")
-async def admin_open_users(callback: CallbackQuery):
+@router.callback_query(DataIs("admin_users"), flags={"read_only": True, "single_flight": True})
+async def admin_open_users(callback: CallbackQuery, session):
     page = 1
-    await send_users_page(callback, page)
+    await send_users_page(callback, page, session)
 
 
-@router.callback_query(F.data.startswith("admin_users_page:"))
-async def admin_users_page(callback: CallbackQuery):
+@router.callback_query(DataStartsWith("admin_users_page:"), flags={"read_only": True, "single_flight": True})
+async def admin_users_page(callback: CallbackQuery, session):
     page = int(callback.data.split(":")[1])
-    await send_users_page(callback, page)
+    await send_users_page(callback, page, session)
 
 
-async def send_users_page(callback: CallbackQuery, page: int):
+async def send_users_page(callback: CallbackQuery, page: int, session):
     LIMIT = 10
     offset = (page - 1) * LIMIT
 
-    async with AsyncSessionLocal() as session:
-        total = await session.scalar(select(func.count(User.id)))
-        users = (
-            await session.execute(
-                select(User).order_by(User.id.desc()).offset(offset).limit(LIMIT)
-            )
-        ).scalars().all()
+    total = await session.scalar(queries.users_count())
+    users = await UserService(session).get_user_list_page(offset, LIMIT)
 
     total_pages = max((total + LIMIT - 1) // LIMIT, 1)
 
@@ -86,7 +81,7 @@ async def send_users_page(callback: CallbackQuery, page: int):
 # ---------------------------------------------------------
 # Меню управления бонусами
 # ---------------------------------------------------------
-@router.callback_query(F.data == "admin_bonuses")
+@router.callback_query(DataIs("admin_bonuses"))
 async def admin_bonuses(callback: CallbackQuery):
     await callback.message.edit_text(
         "🎁 Управление бонусами",
@@ -98,7 +93,7 @@ async def admin_bonuses(callback: CallbackQuery):
 # ---------------------------------------------------------
 # Меню управления праздниками
 # ---------------------------------------------------------
-@router.callback_query(F.data == "admin_holidays")
+@router.callback_query(DataIs("admin_holidays"))
 async def admin_holidays(callback: CallbackQuery):
     try:
         await callback.message.edit_text(
@@ -120,7 +115,7 @@ async def admin_holidays(callback: CallbackQuery):
 # ---------------------------------------------------------
 # Сканирование QR-кода
 # ---------------------------------------------------------
-@router.callback_query(F.data == "admin_qr_scan")
+@router.callback_query(DataIs("admin_qr_scan"))
 async def admin_qr_scan(callback: CallbackQuery, state: FSMContext):
     await state.set_state(QrScanFSM.waiting)
     await callback.message.edit_text(
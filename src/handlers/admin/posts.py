@@ -4,16 +4,16 @@ import asyncio
 from io import BytesIO
 from typing import Literal
 
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import CallbackQuery, Message, BufferedInputFile
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest
 from sqlalchemy import select
 
-from src.database import AsyncSessionLocal
 from src.models.user import User
 from src.keyboards.admin_kb import admin_back_kb, admin_main_menu_kb
+from src.utils.dispatch_index import DataIs
 
 router = Router()
 
@@ -124,12 +124,12 @@ async def _broadcast_post(
 async def _run_broadcast(
     message: Message,
     state: FSMContext,
+    session,
     text: str,
     media_type: Literal["photo", "video", "animation", "document"],
     file_source: FileSource,
 ):
-    async with AsyncSessionLocal() as session:
-        users = (await session.execute(select(User.telegram_id))).scalars().all()
+    users = (await session.execute(select(User.telegram_id))).scalars().all()
 
     await state.clear()
     await message.answer("📤 Рассылка запущена, результат придет отдельным сообщением.")
@@ -146,7 +146,7 @@ async def _run_broadcast(
     )
 
 
-@router.callback_query(F.data == "admin_post_create")
+@router.callback_query(DataIs("admin_post_create"))
 async def admin_post_create(callback: CallbackQuery, state: FSMContext, is_admin: bool):
     if not is_admin:
         return await callback.answer("⛔ У вас нет доступа!", show_alert=True)
@@ -160,7 +160,7 @@ async def admin_post_create(callback: CallbackQuery, state: FSMContext, is_admin
     await callback.answer()
 
 
-@router.callback_query(F.data == "admin_post_cancel")
+@router.callback_query(DataIs("admin_post_cancel"))
 async def admin_post_cancel(callback: CallbackQuery, state: FSMContext, is_admin: bool):
     if not is_admin:
         return await callback.answer("⛔ У вас нет доступа!", show_alert=True)
@@ -171,7 +171,7 @@ async def admin_post_cancel(callback: CallbackQuery, state: FSMContext, is_admin
 
 
 @router.message(AdminPostFSM.text)
-async def admin_post_text(message: Message, state: FSMContext, is_admin: bool):
+async def admin_post_text(message: Message, state: FSMContext, is_admin: bool, session):
     if not is_admin:
         await state.clear()
         return await message.answer("⛔ У вас нет доступа!")
@@ -182,7 +182,7 @@ async def admin_post_text(message: Message, state: FSMContext, is_admin: bool):
 
     media_type, file_source = await _extract_media_from_message(message)
     if file_source:
-        return await _run_broadcast(message, state, text, media_type, file_source)
+        return await _run_broadcast(message, state, session, text, media_type, file_source)
 
     await state.update_data(text=text)
     await state.set_state(AdminPostFSM.media)
@@ -193,7 +193,7 @@ async def admin_post_text(message: Message, state: FSMContext, is_admin: bool):
 
 
 @router.message(AdminPostFSM.media)
-async def admin_post_media(message: Message, state: FSMContext, is_admin: bool):
+async def admin_post_media(message: Message, state: FSMContext, is_admin: bool, session):
     if not is_admin:
         await state.clear()
         return await message.answer("⛔ У вас нет доступа!")
@@ -209,4 +209,4 @@ async def admin_post_media(message: Message, state: FSMContext, is_admin: bool):
     if not file_source:
         return await message.answer("Отправьте фото или медиафайл (видео/гиф/документ).")
 
-    await _run_broadcast(message, state, text, media_type, file_source)
+    await _run_broadcast(message, state, session, text, media_type, file_source)
@@ -8,10 +8,9 @@ from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.dispatcher.event.bases import SkipHandler
-from sqlalchemy import select
 
-from src.database import AsyncSessionLocal
-from src.models.user import User
+from src.services.user_service import UserService
+from src.utils.user_cards import format_user_card
 from src.keyboards.admin_kb import admin_user_actions_kb
 from src.handlers.admin.posts import AdminPostFSM
 
@@ -34,20 +33,14 @@ def _decode_qr_code(image_bytes: bytes) -> str | None:
 
 
 @router.message(F.photo | F.document)
-async def scan_qr_code(message: Message, state: FSMContext):
+async def scan_qr_code(message: Message, state: FSMContext, session, is_admin: bool):
     # не мешаем созданию постов админом
     current_state = await state.get_state()
     if current_state in {AdminPostFSM.text.state, AdminPostFSM.media.state}:
         raise SkipHandler()
 
-    # --- проверяем, что это админ ---
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        admin = result.scalar_one_or_none()
-
-    if not admin or admin.role != "admin":
+    # --- проверяем, что это админ (роль уже прочитана AdminMiddleware) ---
+    if not is_admin:
         raise SkipHandler()  # игнорируем, если не админ
 
     if message.photo:
@@ -83,31 +76,16 @@ async def scan_qr_code(message: Message, state: FSMContext):
         return
 
     # --- ищем пользователя ---
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == tg_id)
-        )
-        user = result.scalar_one_or_none()
+    card = await UserService(session).get_user_card_by_tg_id(tg_id)
 
-    if not user:
+    if not card:
         await message.answer("❌ Пользователь не найден в базе")
         return
 
-    text = (
-        f"👤 *Пользователь найден!*\n\n"
-        f"ID: {user.id}\n"
-        f"Telegram ID: {user.telegram_id}\n"
-        f"Имя: {user.first_name} {user.last_name or ''}\n"
-        f"Телефон: {user.phone or '-'}\n"
-        f"Обычные бонусы: {user.balance}\n"
-        f"Праздничные бонусы: {user.holiday_balance}\n"
-        f"Всего бонусов: {user.total_balance}\n"
-    )
-
     await message.answer(
-        text,
+        format_user_card(card, title="👤 *Пользователь найден!*"),
         parse_mode="Markdown",
-        reply_markup=admin_user_actions_kb(user.id),
+        reply_markup=admin_user_actions_kb(card.id),
     )
 
     await state.clear()
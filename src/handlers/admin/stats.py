@@ -1,27 +1,31 @@
-from aiogram import Router, F
+from datetime import date
+
+from aiogram import Router
 from aiogram.types import CallbackQuery
-from sqlalchemy import select, func
 
-from src.database import AsyncSessionLocal
-from src.models.user import User
-from src.models.transaction import Transaction
+from src.database import queries
+from src.services.birthdays import birthdays_count
+from src.utils.dispatch_index import DataIs
 
 router = Router()
 
-@router.callback_query(F.data == "admin_stats")
-async def admin_stats(callback: CallbackQuery):
-    async with AsyncSessionLocal() as session:
-        total_users = await session.scalar(select(func.count(User.id)))
-        total_balance = await session.scalar(
-            select(func.sum(User.balance + User.holiday_balance))
-        )
-        total_trx = await session.scalar(select(func.count(Transaction.id)))
+@router.callback_query(DataIs("admin_stats"), flags={"read_only": True, "single_flight": True})
+async def admin_stats(callback: CallbackQuery, session):
+    total_users = await session.scalar(queries.users_count())
+    total_balance = await session.scalar(
+        queries.users_total_balance()
+    )
+    total_trx = await session.scalar(queries.transactions_count())
+    today = date.today()
+    birthdays_today = await session.scalar(birthdays_count(today))
+    birthdays_week = await session.scalar(birthdays_count(today, days=6))
 
     text = (
         "<b>📊 Общая статистика</b>\n\n"
         f"👥 Пользователей: <b>{total_users}</b>\n"
         f"💎 Всего бонусов: <b>{total_balance or 0}</b>\n"
-        f"📜 Историй операций: <b>{total_trx}</b>"
+        f"📜 Историй операций: <b>{total_trx}</b>\n"
+        f"🎂 Дней рождения сегодня: <b>{birthdays_today}</b>, за неделю: <b>{birthdays_week}</b>"
     )
 
     await callback.message.edit_text(text)
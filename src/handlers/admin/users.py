@@ -1,21 +1,24 @@
 # src/handlers/admin/users.py
 
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
 
 from sqlalchemy import select
-from src.database import AsyncSessionLocal
 
+from src.database import queries
 from src.models.user import User
 from src.models.transaction import Transaction
+from src.services.user_service import UserService
+from src.utils.user_cards import format_user_card
 
 from src.keyboards.admin_kb import (
     admin_user_actions_kb,
     admin_back_to_users_kb,
     admin_confirm_action_kb,
 )
+from src.utils.dispatch_index import DataIs, DataStartsWith
 
 router = Router()
 
@@ -34,12 +37,11 @@ class EditBalanceFSM(StatesGroup):
 #   Список пользователей
 # ==============================
 
-@router.callback_query(F.data == "admin_users")
-async def admin_users_list(callback: CallbackQuery):
-    async with AsyncSessionLocal() as session:
-        users = (
-            await session.execute(select(User).order_by(User.id).limit(200))
-        ).scalars().all()
+@router.callback_query(DataIs("admin_users"))
+async def admin_users_list(callback: CallbackQuery, session):
+    users = (
+        await session.execute(select(User).order_by(User.id).limit(200))
+    ).scalars().all()
 
     if not users:
         return await callback.message.edit_text(
@@ -67,31 +69,18 @@ async def admin_users_list(callback: CallbackQuery):
 #   Открыть профиль пользователя
 # ==============================
 
-@router.callback_query(F.data.startswith("open_user:"))
-async def open_user(callback: CallbackQuery):
+@router.callback_query(DataStartsWith("open_user:"))
+async def open_user(callback: CallbackQuery, session):
     uid = int(callback.data.split(":")[1])
 
-    async with AsyncSessionLocal() as session:
-        user = (await session.execute(select(User).where(User.id == uid))).scalar_one_or_none()
-
-        if not user:
-            return await callback.answer("❌ Пользователь не найден")
-
-    text = (
-        f"👤 *Пользователь*\n\n"
-        f"ID: {user.id}\n"
-        f"Telegram ID: {user.telegram_id}\n"
-        f"Имя: {user.first_name} {user.last_name or ''}\n"
-        f"Телефон: {user.phone or '-'}\n"
-        f"Обычные бонусы: {user.balance}\n"
-        f"Праздничные бонусы: {user.holiday_balance}\n"
-        f"Всего бонусов: {user.total_balance}\n"
-        f"Роль: {user.role}\n"
-    )
+    card = await UserService(session).get_user_card(uid)
+
+    if not card:
+        return await callback.answer("❌ Пользователь не найден")
 
     await callback.message.edit_text(
-        text,
-        reply_markup=admin_user_actions_kb(user.id),
+        format_user_card(card, show_role=True),
+        reply_markup=admin_user_actions_kb(card.id),
         parse_mode="Markdown"
     )
 
@@ -100,7 +89,7 @@ async def open_user(callback: CallbackQuery):
 #   Начислить / Списать бонусы
 # ==============================
 
-@router.callback_query(F.data.startswith(("user_bonus_add", "user_bonus_sub")))
+@router.callback_query(DataStartsWith("user_bonus_add", "user_bonus_sub"))
 async def start_balance_edit(callback: CallbackQuery, state: FSMContext):
     action, uid = callback.data.split(":")
     uid = int(uid)
@@ -141,46 +130,45 @@ async def process_amount(message: Message, state: FSMContext):
 #   Подтверждение операции
 # ==============================
 
-@router.callback_query(F.data == "confirm_action")
-async def confirm_balance_edit(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(DataIs("confirm_action"))
+async def confirm_balance_edit(callback: CallbackQuery, state: FSMContext, session):
     data = await state.get_data()
 
     uid = data["user_id"]
     amount = data["amount"]
     action = data["action"]
 
-    async with AsyncSessionLocal() as session:
-        user = (await session.execute(select(User).where(User.id == uid))).scalar_one_or_none()
-
-        if not user:
-            return await callback.answer("❌ Пользователь не найден")
-
-        if "add" in action:
-            user.balance += amount
-            text = f"➕ Начислено {amount} баллов"
-        else:
-            user.balance -= amount
-            if user.balance < 0:
-                user.balance = 0
-            text = f"➖ Списано {amount} баллов"
-
-        # История транзакций (если используется)
-        tr = Transaction(
-            user_id=user.id,
-            amount=amount if "add" in action else -amount,
-            operation_type="add" if "add" in action else "subtract",
-            description="Admin operation"
-        )
-        session.add(tr)
+    user = (await session.execute(queries.user_by_id(uid))).scalar_one_or_none()
+
+    if not user:
+        return await callback.answer("❌ Пользователь не найден")
+
+    if "add" in action:
+        user.balance += amount
+        text = f"➕ Начислено {amount} баллов"
+    else:
+        user.balance -= amount
+        if user.balance < 0:
+            user.balance = 0
+        text = f"➖ Списано {amount} баллов"
+
+    # История транзакций (если используется)
+    tr = Transaction(
+        user_id=user.id,
+        amount=amount if "add" in action else -amount,
+        operation_type="add" if "add" in action else "subtract",
+        description="Admin operation"
+    )
+    session.add(tr)
 
-        await session.commit()
+    await session.commit()
 
     await state.clear()
     await callback.message.edit_text(text)
     await callback.answer("Готово")
 
 
-@router.callback_query(F.data == "cancel_action")
+@router.callback_query(DataIs("cancel_action"))
 async def cancel_action(callback: CallbackQuery, state: FSMContext):
     await state.clear()
     await callback.message.edit_text(
@@ -1,17 +1,18 @@
 # src/handlers/user/balance.py
 
 import logging
+from contextlib import nullcontext
 
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message
-from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 
-from src.database import AsyncSessionLocal, ensure_schema
+from src.database import queries, use_primary
+from src.database.identity import identity_cache
 from src.models.user import User
-from src.models.transaction import Transaction
-from src.services.user_service import UserService
+from src.services.user_service import UserService, lazy_accrual
 from src.keyboards.user_kb import get_user_main_menu, get_back_to_menu
+from src.utils.dispatch_index import TextIs
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -20,29 +21,29 @@ logger = logging.getLogger(__name__)
 # =========================
 #  Мой баланс
 # =========================
-@router.message(F.text == "💰 Мой баланс")
-async def user_balance(message: Message):
+@router.message(TextIs("💰 Мой баланс"), flags={"read_only": True, "throttle": 3, "single_flight": True})
+async def user_balance(message: Message, session):
     try:
-        await ensure_schema()
-        async with AsyncSessionLocal() as session:
-            # находим пользователя по telegram_id
-            result = await session.execute(
-                select(User).where(User.telegram_id == message.from_user.id)
-            )
-            user = result.scalar_one_or_none()
-
-            if not user:
-                await message.answer("❌ Вы ещё не зарегистрированы. Нажмите /start")
-                return
-
-            # обновляем праздничные бонусы (НГ, ДР и т.п.)
-            user_service = UserService(session)
-            await user_service.check_and_award_holiday_bonuses(user.id)
-            await session.refresh(user)
-
-            balance = user.balance
-            holiday_balance = user.holiday_balance
-            holiday_info = await user_service.get_user_holiday_bonuses_info(user.id)
+        user_service = UserService(session)
+        # ленивое начисление читает и пишет только основную БД;
+        # без него (ACCRUAL_MODE=scheduled) экран читает с реплики
+        with use_primary(session) if lazy_accrual() else nullcontext():
+            identity = await identity_cache.resolve(session, message.from_user.id)
+            user = None
+            if identity.registered:
+                user = await session.get(User, identity.user_id)
+            if user and lazy_accrual():
+                # обновляем праздничные бонусы (НГ, ДР и т.п.);
+                # начисление берёт этот же объект из identity map, без повторного SELECT
+                await user_service.check_and_award_holiday_bonuses(user.id)
+
+        if not user:
+            await message.answer("❌ Вы ещё не зарегистрированы. Нажмите /start")
+            return
+
+        balance = user.balance
+        holiday_balance = user.holiday_balance
+        holiday_info = await user_service.get_user_holiday_bonuses_info(user.id)
 
     except SQLAlchemyError:
         logger.exception("Ошибка при получении баланса пользователя")
@@ -74,31 +75,23 @@ async def user_balance(message: Message):
 # =========================
 #  История операций
 # =========================
-@router.message(F.text == "📊 История операций")
-async def user_history(message: Message):
+@router.message(TextIs("📊 История операций"), flags={"read_only": True, "throttle": 3, "single_flight": True})
+async def user_history(message: Message, session):
     try:
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(User).where(User.telegram_id == message.from_user.id)
-            )
-            user = result.scalar_one_or_none()
+        with use_primary(session) if lazy_accrual() else nullcontext():
+            identity = await identity_cache.resolve(session, message.from_user.id)
 
-            if not user:
+            if not identity.registered:
                 await message.answer("❌ Вы ещё не зарегистрированы. Нажмите /start")
                 return
 
-            # можно тоже обновить праздничные бонусы при входе в историю
-            user_service = UserService(session)
-            await user_service.check_and_award_holiday_bonuses(user.id)
-            await session.refresh(user)
+            if lazy_accrual():
+                # можно тоже обновить праздничные бонусы при входе в историю
+                user_service = UserService(session)
+                await user_service.check_and_award_holiday_bonuses(identity.user_id)
 
-            tr_result = await session.execute(
-                select(Transaction)
-                .where(Transaction.user_id == user.id)
-                .order_by(Transaction.id.desc())
-                .limit(10)
-            )
-            transactions = tr_result.scalars().all()
+        tr_result = await session.execute(queries.recent_transactions(identity.user_id, 10))
+        transactions = tr_result.scalars().all()
 
     except SQLAlchemyError:
         logger.exception("Ошибка при получении истории операций")
@@ -127,7 +120,7 @@ async def user_history(message: Message):
 # =========================
 #  Назад в меню
 # =========================
-@router.message(F.text == "⬅️ Назад в меню")
+@router.message(TextIs("⬅️ Назад в меню"))
 async def back_to_menu(message: Message):
     await message.answer(
         "Главное меню:",
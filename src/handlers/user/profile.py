@@ -4,14 +4,15 @@ from io import BytesIO
 import logging
 
 import qrcode
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, BufferedInputFile
-from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 
+from src.database.identity import identity_cache
 from src.models.user import User
-from src.services.user_service import UserService
+from src.services.user_service import UserService, lazy_accrual
 from src.keyboards.user_kb import get_user_main_menu, get_back_to_menu
+from src.utils.dispatch_index import TextIs
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -20,17 +21,26 @@ logger = logging.getLogger(__name__)
 # =========================
 #  Мой профиль
 # =========================
-@router.message(F.text == "👤 Мой профиль")
+# без ленивого начисления профиль только читает — можно с реплики
+@router.message(
+    TextIs("👤 Мой профиль"),
+    flags={"read_only": not lazy_accrual(), "throttle": 3, "single_flight": True},
+)
 async def user_profile(message: Message, session):
     """
     Показывает профиль пользователя.
     session приходит из DBSessionMiddleware (data["session"])
     """
     try:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
+        identity = await identity_cache.resolve(session, message.from_user.id)
+        user = None
+        if identity.registered:
+            user = await session.get(User, identity.user_id)
+        if user and lazy_accrual():
+            # обновляем праздничные бонусы (ДР, праздники, сгорание);
+            # начисление берёт этот же объект из identity map, без повторного SELECT
+            user_service = UserService(session)
+            await user_service.check_and_award_holiday_bonuses(user.id)
 
         if not user:
             await message.answer(
@@ -39,11 +49,6 @@ async def user_profile(message: Message, session):
             )
             return
 
-        # обновляем праздничные бонусы (ДР, праздники, сгорание)
-        user_service = UserService(session)
-        await user_service.check_and_award_holiday_bonuses(user.id)
-        await session.refresh(user)
-
         phone = getattr(user, "phone", None) or "-"
         birth_date = getattr(user, "birth_date", None)
         if birth_date:
@@ -94,18 +99,15 @@ async def user_profile(message: Message, session):
 # =========================
 #  Показать QR-код
 # =========================
-@router.message(F.text == "📱 Показать QR-код")
+@router.message(TextIs("📱 Показать QR-код"), flags={"throttle": 2, "single_flight": True})
 async def user_qr(message: Message, session):
     """
     Генерирует и отправляет QR-код пользователя.
     """
     try:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
+        identity = await identity_cache.resolve(session, message.from_user.id)
 
-        if not user:
+        if not identity.registered:
             await message.answer(
                 "❌ Вы ещё не зарегистрированы. Нажмите /start",
                 reply_markup=get_user_main_menu(),
@@ -113,7 +115,7 @@ async def user_qr(message: Message, session):
             return
 
         # строка, которую шифруем в QR
-        qr_data = f"user:{user.telegram_id}"   # <<< вот так
+        qr_data = f"user:{message.from_user.id}"   # <<< вот так
 
         qr = qrcode.QRCode(
             version=1,
@@ -133,7 +135,7 @@ async def user_qr(message: Message, session):
 
         photo = BufferedInputFile(
             buffer.getvalue(),
-            filename=f"user_{user.id}_qr.png",
+            filename=f"user_{identity.user_id}_qr.png",
         )
 
     except SQLAlchemyError:
@@ -15,6 +15,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.exceptions import TelegramBadRequest
 
+from src.database.identity import identity_cache
 from src.services.user_service import UserService
 from src.keyboards.user_kb import get_user_main_menu
 
@@ -86,12 +87,9 @@ async def cmd_start(message: Message, state: FSMContext, session):
       2) ставим state = full_name и просим ФИО.
     Зарегистрированный — сразу меню.
     """
-    user_service = UserService(session)
-    tg_id = message.from_user.id
-
-    user = await user_service.get_user_by_tg_id(tg_id)
+    identity = await identity_cache.resolve(session, message.from_user.id)
 
-    if user:
+    if identity.registered:
         await state.clear()
         await message.answer(
             "👋 Вы уже зарегистрированы!",
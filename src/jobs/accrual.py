@@ -0,0 +1,418 @@
+# src/jobs/accrual.py
+"""
+Ночное начисление праздничных бонусов всем пользователям сразу.
+
+Вместо проверки «а не положен ли бонус» при каждом открытии профиля /
+баланса (HolidayBonusService.check_and_award_user_bonuses) задача раз в
+сутки проходит таблицу users чанками по id (keyset, ACCRUAL_CHUNK_SIZE)
+и на каждый чанк выполняет несколько set-based запросов в одной
+транзакции:
+
+1) INSERT INTO user_holiday_bonuses … SELECT FROM users — бонус ко дню
+   рождения тем, у кого он сегодня (по индексу birth_mmdd, 29 февраля в
+   невисокосный год — 28-го) и кому в этом году ещё не начисляли;
+2) то же для каждого праздника, в окно начисления которого попадает
+   сегодня (окна — HolidayCalendar);
+3) UPDATE users SET holiday_balance = holiday_balance + CASE id WHEN … END
+   WHERE id IN (…) — один запрос на чанк;
+4) пачечная вставка строк истории по новым бонусам.
+
+Шаги 1–2 возвращают вставленное (INSERT … RETURNING user_id) — из этого
+и считаются шаги 3–4, так что одновременные прогоны (ночной и ручной)
+не засчитают друг другу чужие бонусы. А чтобы они не начислили один и
+тот же бонус дважды, чанк сначала берёт advisory-блокировки своих
+праздников (src.database.locks): второй прогон ждёт commit первого и его
+NOT EXISTS уже видит вставленное. Повторный прогон
+ничего не начислит: условие «ещё не начисляли» (ДР — в этом году,
+праздник — в его окне) то же, что и у ленивого начисления. Упавший прогон можно просто перезапустить.
+
+Тем же движком работает ручное «🎁 Начислить всем» из админки
+(AccrualJob.give): один праздник, всем пользователям, включая
+зарегистрированных сегодня; на время прогона праздник захвачен
+(src.jobs.claims). «Уже начисляли» — бонус за этот праздник в
+его текущем окне, а для праздника без даты (или вне окна) — за срок
+действия бонуса (days_valid), так что повторное нажатие не задвоит.
+
+    python -m src.jobs.accrual --dry-run
+    python -m src.jobs.accrual --date 2026-02-23
+"""
+import argparse
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import (
+    DateTime,
+    case,
+    exists,
+    func,
+    insert,
+    literal,
+    null,
+    or_,
+    select,
+    true,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config.settings import settings
+from src.database import AsyncSessionLocal, engine, queries, use_primary
+from src.database.locks import award_locks
+from src.database.retry import run_in_transaction
+from src.jobs.claims import holiday_claim
+from src.models.holiday_bonus import HolidayBonus, UserHolidayBonus
+from src.models.transaction import Transaction
+from src.models.user import User
+from src.monitoring.metrics import REGISTRY
+from src.services.holiday_bonus_service import (
+    BIRTHDAY_BONUS_AMOUNT,
+    BIRTHDAY_BONUS_DAYS_VALID,
+    BIRTHDAY_BONUS_DESCRIPTION,
+    HOLIDAY_BONUS_DESCRIPTION_PREFIX,
+)
+from src.services.birthdays import birthday_condition
+from src.services.holiday_calendar import AwardWindow, HolidayCalendar
+
+logger = logging.getLogger(__name__)
+
+ACCRUAL_AWARDS = REGISTRY.counter(
+    "bonus_bot_accrual_awards_total",
+    "Бонусы, начисленные ночной задачей",
+    labelnames=("kind",),
+)
+
+BONUS_COLUMNS = ["user_id", "holiday_id", "amount", "created_at", "expires_at", "is_active"]
+
+
+@dataclass
+class AccrualReport:
+    day: date
+    dry_run: bool
+    users_total: int = 0
+    chunks: int = 0
+    users_scanned: int = 0
+    birthday_awards: int = 0
+    holiday_awards: dict[str, int] = field(default_factory=dict)
+    amount: int = 0
+    balances_updated: int = 0
+    transactions_inserted: int = 0
+    duration: float = 0.0
+
+    @property
+    def awards(self) -> int:
+        return self.birthday_awards + sum(self.holiday_awards.values())
+
+    def summary(self) -> str:
+        holidays = ", ".join(f"{name}: {count}" for name, count in self.holiday_awards.items()) or "-"
+        return (
+            f"{'[dry-run] ' if self.dry_run else ''}начисление за {self.day:%d.%m.%Y}: "
+            f"пользователей {self.users_scanned} ({self.chunks} чанков), "
+            f"ДР {self.birthday_awards}, праздники [{holidays}], "
+            f"сумма {self.amount}, балансов обновлено {self.balances_updated}, "
+            f"операций записано {self.transactions_inserted}, за {self.duration:.2f} с"
+        )
+
+
+@dataclass(frozen=True)
+class _Award:
+    """Что начисляем: holiday_id=None — день рождения."""
+    holiday_id: Optional[int]
+    name: str
+    amount: int
+    expires_at: Optional[datetime]
+    # период, в котором уже выданный такой же бонус означает «не начислять»
+    awarded_since: datetime
+    awarded_until: datetime
+    # в день регистрации праздничные бонусы не начисляются (кроме ручной выдачи)
+    skip_registration_day: bool = True
+
+    @classmethod
+    def from_window(cls, window: AwardWindow, skip_registration_day: bool = True) -> "_Award":
+        return cls(
+            holiday_id=window.holiday_id,
+            name=window.name,
+            amount=window.amount,
+            expires_at=window.expires_at,
+            awarded_since=window.awarded_since,
+            awarded_until=window.awarded_until,
+            skip_registration_day=skip_registration_day,
+        )
+
+
+def manual_award(holiday: HolidayBonus, now: datetime) -> _Award:
+    """Ручная выдача праздника всем пользователям."""
+    windows = HolidayCalendar().load([holiday]).windows_on(now.date())
+    if windows:
+        # в окне праздника — то же «уже начисляли», что у ночного начисления
+        return _Award.from_window(windows[0], skip_registration_day=False)
+
+    if holiday.days_valid is None:
+        expires_at, awarded_since = None, datetime.min
+    else:
+        expires_at = now + timedelta(days=holiday.days_valid)
+        awarded_since = now - timedelta(days=max(holiday.days_valid, 1))
+    return _Award(
+        holiday_id=holiday.id,
+        name=holiday.name,
+        amount=holiday.amount,
+        expires_at=expires_at,
+        awarded_since=awarded_since,
+        awarded_until=now,
+        skip_registration_day=False,
+    )
+
+
+ProgressCallback = Callable[[AccrualReport], Awaitable[None]]
+
+
+class AccrualJob:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        chunk_size: int = settings.ACCRUAL_CHUNK_SIZE,
+    ):
+        self.session_factory = session_factory
+        self.chunk_size = chunk_size
+
+    async def run(self, day: Optional[date] = None, dry_run: bool = False) -> AccrualReport:
+        now = datetime.now()
+        if day is not None and day != now.date():
+            now = datetime.combine(day, now.time())
+        return await self._award_all(await self._awards_for(now), now, dry_run)
+
+    async def give(self, holiday_id: int, on_progress: Optional[ProgressCallback] = None) -> Optional[AccrualReport]:
+        """
+        Начислить праздник holiday_id всем пользователям; None — праздника нет
+        или он выключен, HolidayBusy — по нему уже идёт начисление или списание.
+        """
+        now = datetime.now()
+        async with self.session_factory() as session:
+            with use_primary(session):
+                holiday = (await session.execute(queries.holiday_by_id(holiday_id))).scalar_one_or_none()
+        if holiday is None or not holiday.is_active:
+            return None
+
+        async with holiday_claim(self.session_factory, holiday_id) as claim:
+            async def progress(report: AccrualReport):
+                await claim.renew()
+                if on_progress is not None:
+                    await on_progress(report)
+
+            return await self._award_all([manual_award(holiday, now)], now, dry_run=False, on_progress=progress)
+
+    async def _award_all(
+        self,
+        awards: list[_Award],
+        now: datetime,
+        dry_run: bool,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> AccrualReport:
+        started = time.perf_counter()
+        report = AccrualReport(day=now.date(), dry_run=dry_run)
+        for award in awards:
+            if award.holiday_id is not None:
+                report.holiday_awards[award.name] = 0
+
+        if on_progress is not None:
+            async with self.session_factory() as session:
+                report.users_total = await session.scalar(queries.users_count())
+
+        last_id = 0
+        while True:
+            async with self.session_factory() as session:
+                with use_primary(session):
+                    scanned, chunk_end = (await session.execute(self._chunk_stmt(last_id))).one()
+                    if not scanned:
+                        break
+                    counts, balances, ledger = await run_in_transaction(
+                        session,
+                        lambda: self._process_chunk(session, awards, now, last_id, chunk_end, dry_run),
+                        operation="accrual_chunk",
+                    )
+            report.chunks += 1
+            report.balances_updated += balances
+            report.transactions_inserted += ledger
+            report.users_scanned += scanned
+            for award, count in zip(awards, counts):
+                if award.holiday_id is None:
+                    report.birthday_awards += count
+                else:
+                    report.holiday_awards[award.name] += count
+                report.amount += award.amount * count
+            last_id = chunk_end
+            if on_progress is not None:
+                await on_progress(report)
+
+        report.duration = time.perf_counter() - started
+        if not dry_run:
+            ACCRUAL_AWARDS.inc(report.birthday_awards, kind="birthday")
+            ACCRUAL_AWARDS.inc(sum(report.holiday_awards.values()), kind="holiday")
+        logger.info("🎁 %s", report.summary())
+        return report
+
+    # ------------------------------------------------------------------
+    # Что начислять сегодня
+    # ------------------------------------------------------------------
+    async def _awards_for(self, now: datetime) -> list[_Award]:
+        awards = [
+            _Award(
+                holiday_id=None,
+                name="День рождения",
+                amount=BIRTHDAY_BONUS_AMOUNT,
+                expires_at=now + timedelta(days=BIRTHDAY_BONUS_DAYS_VALID),
+                awarded_since=datetime(now.year, 1, 1),
+                awarded_until=datetime(now.year, 12, 31, 23, 59, 59),
+            )
+        ]
+        # свежий снимок праздников, а не кэш процесса: прогон редкий
+        async with self.session_factory() as session:
+            windows = await HolidayCalendar().awardable(session, now.date())
+        awards.extend(_Award.from_window(window) for window in windows)
+        return awards
+
+    # ------------------------------------------------------------------
+    # SQL
+    # ------------------------------------------------------------------
+    def _chunk_stmt(self, last_id: int):
+        """(сколько пользователей в чанке, id последнего) — следующий чанк после last_id."""
+        ids = (
+            select(User.id)
+            .where(User.id > last_id)
+            .order_by(User.id)
+            .limit(self.chunk_size)
+            .subquery()
+        )
+        return select(func.count(ids.c.id), func.max(ids.c.id))
+
+    @staticmethod
+    def _eligible(award: _Award, now: datetime, first_id: int, last_id: int):
+        """Пользователи чанка, которым положен award и которым его ещё не давали."""
+        today_start = datetime.combine(now.date(), datetime.min.time())
+
+        if award.holiday_id is None:
+            same_award = UserHolidayBonus.holiday_id.is_(None)
+        else:
+            same_award = UserHolidayBonus.holiday_id == award.holiday_id
+
+        conditions = [
+            User.id > first_id,
+            User.id <= last_id,
+            ~exists().where(
+                UserHolidayBonus.user_id == User.id,
+                same_award,
+                UserHolidayBonus.created_at >= award.awarded_since,
+                UserHolidayBonus.created_at <= award.awarded_until,
+            ),
+        ]
+        if award.holiday_id is not None:
+            # праздник выключили (удаление) во время прогона — дальше не начисляем,
+            # иначе списание не увидит новые бонусы
+            conditions.append(
+                exists().where(HolidayBonus.id == award.holiday_id, HolidayBonus.is_active == True)
+            )
+        if award.skip_registration_day:
+            conditions.append(or_(User.created_at.is_(None), User.created_at < today_start))
+        if award.holiday_id is None:
+            conditions.append(birthday_condition(now.date()))
+
+        return select(
+            User.id,
+            null() if award.holiday_id is None else literal(award.holiday_id),
+            literal(award.amount),
+            literal(now, DateTime),
+            literal(award.expires_at, DateTime),
+            true(),
+        ).where(*conditions)
+
+    async def _process_chunk(
+        self,
+        session: AsyncSession,
+        awards: list[_Award],
+        now: datetime,
+        first_id: int,
+        last_id: int,
+        dry_run: bool,
+    ) -> tuple[list[int], int, int]:
+        """(начислено по каждому award, обновлено балансов, записано операций)."""
+        if not dry_run:
+            await award_locks(session, [award.holiday_id for award in awards])
+
+        counts = []
+        added: dict[int, int] = defaultdict(int)
+        ledger = []
+        for award in awards:
+            eligible = self._eligible(award, now, first_id, last_id)
+            if dry_run:
+                counts.append(
+                    (await session.execute(select(func.count()).select_from(eligible.subquery()))).scalar_one()
+                )
+                continue
+
+            # RETURNING — ровно то, что вставил этот запрос, без поиска по created_at
+            user_ids = (
+                await session.execute(
+                    insert(UserHolidayBonus)
+                    .from_select(BONUS_COLUMNS, eligible)
+                    .returning(UserHolidayBonus.user_id)
+                )
+            ).scalars().all()
+            counts.append(len(user_ids))
+
+            description = (
+                BIRTHDAY_BONUS_DESCRIPTION
+                if award.holiday_id is None
+                else f"{HOLIDAY_BONUS_DESCRIPTION_PREFIX}{award.name}"
+            )
+            for user_id in user_ids:
+                added[user_id] += award.amount
+                ledger.append({
+                    "user_id": user_id,
+                    "amount": award.amount,
+                    "operation_type": "add",
+                    "description": description,
+                    "created_at": now,
+                })
+
+        if dry_run or not added:
+            return counts, 0, 0
+
+        # один UPDATE на чанк: прибавка — CASE по id
+        users = User.__table__
+        await session.execute(
+            update(users)
+            .where(users.c.id.in_(sorted(added)))
+            .values(holiday_balance=func.coalesce(users.c.holiday_balance, 0) + case(added, value=users.c.id))
+        )
+        # у каждого пользователя строки истории в порядке awards (ДР — первым)
+        ledger.sort(key=lambda row: row["user_id"])
+        await session.execute(insert(Transaction), ledger)
+        return counts, len(added), len(ledger)
+
+
+# ----------------------------------------------------------
+# CLI
+# ----------------------------------------------------------
+async def _main(day: Optional[date], dry_run: bool):
+    try:
+        await AccrualJob().run(day=day, dry_run=dry_run)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Начисление праздничных бонусов всем пользователям")
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать, ничего не записывать")
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="дата начисления, ГГГГ-ММ-ДД")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    asyncio.run(_main(args.date, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# src/jobs/balances.py
+"""
+Списание с holiday_balance в фоновых задачах (сжигание, отмена праздника).
+
+Строка истории должна совпадать с реальным изменением баланса, поэтому
+балансы затронутых пользователей читаются под блокировкой строк
+(SELECT … FOR UPDATE, по порядку id — без взаимоблокировок), новое
+значение считается из прочитанного и записывается одним executemany.
+Параллельная трата или начисление ждут конца транзакции и видят уже
+списанный баланс.
+"""
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.user import User
+
+
+async def lock_balances(session: AsyncSession, user_ids) -> dict[int, int]:
+    """user_id -> holiday_balance (NULL как 0) для user_ids (список или подзапрос)."""
+    rows = await session.execute(
+        select(User.id, User.holiday_balance)
+        .where(User.id.in_(user_ids))
+        .order_by(User.id)
+        .with_for_update()
+    )
+    return {user_id: balance or 0 for user_id, balance in rows}
+
+
+async def write_balances(session: AsyncSession, balances: dict[int, int]):
+    if not balances:
+        return
+    users = User.__table__
+    await session.execute(
+        update(users).where(users.c.id == bindparam("b_id")).values(holiday_balance=bindparam("b_balance")),
+        [{"b_id": user_id, "b_balance": balance} for user_id, balance in sorted(balances.items())],
+    )
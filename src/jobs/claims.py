@@ -0,0 +1,99 @@
+# src/jobs/claims.py
+"""
+Захват праздника на время длинной операции: «🎁 Начислить всем»
+(AccrualJob.give) и списание при удалении (HolidayRevocation).
+
+Раньше от наложения защищало множество _busy в хендлере — только в
+пределах одного процесса. Теперь захват — строка в БД:
+
+    UPDATE holidays SET claimed_until = :until
+    WHERE id = :id AND (claimed_until IS NULL OR claimed_until < :now)
+
+прошёл — праздник наш до claimed_until, не прошёл — HolidayBusy, в каком
+бы процессе ни шла другая операция. Срок (CLAIM_LEASE) продлевается по
+ходу работы (renew), так что упавший процесс держит праздник не дольше
+срока. Ночной прогон праздник не захватывает: от двойного начисления его
+защищают блокировки src.database.locks, а выключенный праздник он не
+начисляет.
+"""
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.database import use_primary
+from src.database.retry import run_in_transaction
+from src.models.holiday_bonus import HolidayBonus
+
+CLAIM_LEASE = timedelta(minutes=10)
+
+
+class HolidayBusy(Exception):
+    """По празднику уже идёт начисление или списание."""
+
+    def __init__(self, holiday_id: int):
+        super().__init__(f"праздник {holiday_id} занят другой операцией")
+        self.holiday_id = holiday_id
+
+
+class HolidayClaim:
+    def __init__(self, session_factory: async_sessionmaker, holiday_id: int, lease: timedelta):
+        self.session_factory = session_factory
+        self.holiday_id = holiday_id
+        self.lease = lease
+        # своё значение claimed_until — по нему продлеваем и отпускаем только свой захват
+        self.until: Optional[datetime] = None
+
+    async def _set(self, until: Optional[datetime], condition) -> bool:
+        async with self.session_factory() as session:
+            with use_primary(session):
+                async def _update() -> bool:
+                    result = await session.execute(
+                        update(HolidayBonus)
+                        .where(HolidayBonus.id == self.holiday_id, condition)
+                        .values(claimed_until=until)
+                        .execution_options(synchronize_session=False)
+                    )
+                    return bool(result.rowcount)
+
+                return await run_in_transaction(session, _update, operation="holiday_claim")
+
+    async def acquire(self) -> bool:
+        """False — праздник занят (или его нет)."""
+        now = datetime.now()
+        until = now + self.lease
+        free = or_(HolidayBonus.claimed_until.is_(None), HolidayBonus.claimed_until < now)
+        if not await self._set(until, free):
+            return False
+        self.until = until
+        return True
+
+    async def renew(self):
+        """Продлить захват, если прошло больше половины срока."""
+        now = datetime.now()
+        if self.until is None or self.until - now > self.lease / 2:
+            return
+        until = now + self.lease
+        if await self._set(until, HolidayBonus.claimed_until == self.until):
+            self.until = until
+
+    async def release(self):
+        if self.until is not None:
+            await self._set(None, HolidayBonus.claimed_until == self.until)
+            self.until = None
+
+
+@asynccontextmanager
+async def holiday_claim(
+    session_factory: async_sessionmaker, holiday_id: int, lease: timedelta = CLAIM_LEASE
+) -> AsyncIterator[HolidayClaim]:
+    """Захватить праздник на время блока; занят — HolidayBusy."""
+    claim = HolidayClaim(session_factory, holiday_id, lease)
+    if not await claim.acquire():
+        raise HolidayBusy(holiday_id)
+    try:
+        yield claim
+    finally:
+        await claim.release()
@@ -0,0 +1,173 @@
+# src/jobs/expiry.py
+"""
+Фоновое сжигание просроченных праздничных бонусов.
+
+Раньше бонус сгорал, только когда владелец открывал профиль/баланс
+(_expire_old_bonuses), — у неактивных пользователей holiday_balance
+оставался завышенным, и вместе с ним итоги admin_stats. Сборщик раз в
+EXPIRY_SWEEP_INTERVAL секунд проходит все просроченные бонусы пачками
+(индекс ix_uhb_active_expires по is_active, expires_at). Каждая пачка —
+одна транзакция:
+
+1) SELECT … WHERE is_active AND expires_at <= now ORDER BY expires_at
+   LIMIT n (на PostgreSQL — FOR UPDATE SKIP LOCKED);
+2) UPDATE user_holiday_bonuses SET is_active = false WHERE id IN (…)
+   AND is_active RETURNING id — дальше обрабатываем только то, что
+   деактивировали сами (бонус мог сгореть параллельно при просмотре);
+3) балансы затронутых пользователей читаются под блокировкой
+   (src.jobs.balances), новые — уменьшены на сумму сгоревших бонусов, но
+   не ниже нуля — пишутся одним executemany;
+4) одна пачечная вставка строк «Сгорание праздничного бонуса» в
+   transactions (суммы — как у _expire_old_bonuses: не больше остатка,
+   т. е. ровно то, на что уменьшился баланс).
+
+Сгоревший бонус больше не попадает в выборку, так что прерванный прогон
+просто продолжается следующим, а повторный ничего не меняет.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config.settings import settings
+from src.database import AsyncSessionLocal, use_primary
+from src.database.retry import run_in_transaction
+from src.jobs.balances import lock_balances, write_balances
+from src.models.holiday_bonus import HolidayBonus, UserHolidayBonus
+from src.models.transaction import Transaction
+from src.monitoring.metrics import REGISTRY
+from src.services.holiday_bonus_service import burn_description
+
+logger = logging.getLogger(__name__)
+
+EXPIRED_BONUSES = REGISTRY.counter(
+    "bonus_bot_expired_bonuses_total",
+    "Праздничные бонусы, сожжённые фоновым сборщиком",
+)
+
+
+@dataclass
+class ExpiryReport:
+    batches: int = 0
+    bonuses: int = 0
+    users: int = 0
+    amount: int = 0
+    transactions_inserted: int = 0
+    duration: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"сгорание: бонусов {self.bonuses} у {self.users} пользователей "
+            f"({self.batches} пачек), списано {self.amount}, "
+            f"операций записано {self.transactions_inserted}, за {self.duration:.2f} с"
+        )
+
+
+class ExpirySweeper:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        batch_size: int = settings.EXPIRY_SWEEP_BATCH_SIZE,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+
+    async def run(self, now: Optional[datetime] = None) -> ExpiryReport:
+        started = time.perf_counter()
+        now = now or datetime.now()
+        report = ExpiryReport()
+
+        while True:
+            async with self.session_factory() as session:
+                with use_primary(session):
+                    bonuses, users, amount, ledger = await run_in_transaction(
+                        session, lambda: self._sweep_batch(session, now), operation="expiry_sweep"
+                    )
+            if not bonuses:
+                break
+            report.batches += 1
+            report.bonuses += bonuses
+            report.users += users
+            report.amount += amount
+            report.transactions_inserted += ledger
+            EXPIRED_BONUSES.inc(bonuses)
+
+        report.duration = time.perf_counter() - started
+        if report.bonuses:
+            logger.info("🔥 %s", report.summary())
+        return report
+
+    @staticmethod
+    def _due(now: datetime, limit: int):
+        return (
+            select(UserHolidayBonus.id)
+            .where(
+                UserHolidayBonus.is_active == True,
+                UserHolidayBonus.expires_at != None,
+                UserHolidayBonus.expires_at <= now,
+            )
+            .order_by(UserHolidayBonus.expires_at, UserHolidayBonus.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+
+    async def _sweep_batch(self, session: AsyncSession, now: datetime) -> tuple[int, int, int, int]:
+        """(сожжено бонусов, затронуто пользователей, списано, записано операций)."""
+        due_ids = (await session.execute(self._due(now, self.batch_size))).scalars().all()
+        if not due_ids:
+            return 0, 0, 0, 0
+
+        burned_ids = (
+            await session.execute(
+                update(UserHolidayBonus)
+                .where(UserHolidayBonus.id.in_(due_ids), UserHolidayBonus.is_active == True)
+                .values(is_active=False)
+                .returning(UserHolidayBonus.id)
+                .execution_options(synchronize_session=False)
+            )
+        ).scalars().all()
+        if not burned_ids:
+            return 0, 0, 0, 0
+
+        balances = await lock_balances(
+            session, select(UserHolidayBonus.user_id).where(UserHolidayBonus.id.in_(burned_ids))
+        )
+        rows = (
+            await session.execute(
+                select(UserHolidayBonus.user_id, UserHolidayBonus.amount, HolidayBonus.name)
+                .select_from(UserHolidayBonus)
+                .outerjoin(HolidayBonus, HolidayBonus.id == UserHolidayBonus.holiday_id)
+                .where(UserHolidayBonus.id.in_(burned_ids))
+                .order_by(UserHolidayBonus.user_id, UserHolidayBonus.expires_at, UserHolidayBonus.id)
+            )
+        ).all()
+
+        # строки истории — как при сжигании на просмотре: не больше остатка;
+        # баланс прочитан под блокировкой, так что история = реальное списание
+        remaining: dict[int, int] = {}
+        ledger = []
+        for user_id, amount, holiday_name in rows:
+            left = remaining.setdefault(user_id, balances.get(user_id, 0))
+            to_sub = min(left, amount)
+            if to_sub > 0:
+                remaining[user_id] = left - to_sub
+                ledger.append({
+                    "user_id": user_id,
+                    "amount": -to_sub,
+                    "operation_type": "subtract",
+                    "description": burn_description(holiday_name),
+                    "created_at": now,
+                })
+
+        await write_balances(
+            session,
+            {user_id: left for user_id, left in remaining.items() if left != balances.get(user_id, 0)},
+        )
+        if ledger:
+            await session.execute(insert(Transaction), ledger)
+
+        return len(burned_ids), len(remaining), -sum(row["amount"] for row in ledger), len(ledger)
@@ -0,0 +1,279 @@
+# src/jobs/reconcile.py
+"""
+Сверка users.holiday_balance с таблицей бонусов.
+
+holiday_balance — денормализованная сумма: её по-своему меняют ночное и
+ручное начисление, трата (apply_holiday_bonus_spend), сжигание и
+списание при удалении праздника. Инвариант — баланс равен сумме
+действующих бонусов пользователя:
+
+    SUM(amount) WHERE is_active AND (expires_at IS NULL OR expires_at > now)
+
+Сверка идёт чанками по users.id (keyset, RECONCILE_CHUNK_SIZE): на чанк
+один запрос с GROUP BY по бонусам пользователей чанка. Пользователи, у
+которых есть просроченные, но ещё не сожжённые бонусы, в расхождения не
+попадают — их баланс поправит src.jobs.expiry (со строкой истории).
+
+С --repair расхождения исправляются в той же транзакции, что и чтение
+чанка: UPDATE users … WHERE id = :id AND holiday_balance = :прочитанное
+(если баланс успел поменяться — пользователь пропускается до следующей
+сверки) и строка «Корректировка праздничного баланса» в transactions.
+
+Бюджет чтения RECONCILE_ROWS_PER_SECOND (строк users + бонусов в
+секунду): между чанками задача досыпает, чтобы не мешать боту днём.
+
+    python -m src.jobs.reconcile
+    python -m src.jobs.reconcile --repair --rows-per-second 5000
+"""
+import argparse
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import case, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config.settings import settings
+from src.database import AsyncSessionLocal, engine, use_primary
+from src.database.retry import run_in_transaction
+from src.models.holiday_bonus import UserHolidayBonus
+from src.models.transaction import Transaction
+from src.models.user import User
+from src.monitoring.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+BALANCE_REPAIRS = REGISTRY.counter(
+    "bonus_bot_holiday_balance_repairs_total",
+    "Исправленные сверкой расхождения holiday_balance",
+)
+
+REPAIR_DESCRIPTION = "Корректировка праздничного баланса (сверка)"
+
+# сколько расхождений показывать в отчёте
+SAMPLE_SIZE = 20
+
+
+class Drift(NamedTuple):
+    user_id: int
+    stored: int
+    expected: int  # сумма действующих бонусов
+
+    @property
+    def delta(self) -> int:
+        return self.stored - self.expected
+
+
+@dataclass
+class ReconcileReport:
+    repair: bool
+    chunks: int = 0
+    users_checked: int = 0
+    bonus_rows: int = 0
+    pending_expiry: int = 0
+    drifted: int = 0
+    over: int = 0  # баланс больше суммы бонусов
+    under: int = 0
+    drift_abs: int = 0
+    max_drift: int = 0
+    repaired: int = 0
+    changed_meanwhile: int = 0
+    throttled: float = 0.0
+    duration: float = 0.0
+    sample: list[Drift] = field(default_factory=list)
+
+    def add(self, drift: Drift):
+        self.drifted += 1
+        if drift.delta > 0:
+            self.over += 1
+        else:
+            self.under += 1
+        self.drift_abs += abs(drift.delta)
+        self.max_drift = max(self.max_drift, abs(drift.delta))
+        if len(self.sample) < SAMPLE_SIZE:
+            self.sample.append(drift)
+
+    def summary(self) -> str:
+        lines = [
+            f"{'' if self.repair else '[проверка] '}сверка holiday_balance: "
+            f"пользователей {self.users_checked} ({self.chunks} чанков), бонусов прочитано {self.bonus_rows}, "
+            f"за {self.duration:.2f} с (из них пауза бюджета {self.throttled:.2f} с)",
+            f"расхождений {self.drifted}: больше суммы бонусов {self.over}, меньше {self.under}, "
+            f"всего на {self.drift_abs}, максимум {self.max_drift}; "
+            f"ждут сжигания {self.pending_expiry}",
+        ]
+        if self.repair:
+            lines.append(f"исправлено {self.repaired}, изменились во время сверки {self.changed_meanwhile}")
+        lines.extend(
+            f"  user {d.user_id}: баланс {d.stored}, бонусов {d.expected} ({d.delta:+d})" for d in self.sample
+        )
+        return "\n".join(lines)
+
+
+class BalanceReconciler:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        chunk_size: int = settings.RECONCILE_CHUNK_SIZE,
+        rows_per_second: int = settings.RECONCILE_ROWS_PER_SECOND,
+    ):
+        self.session_factory = session_factory
+        self.chunk_size = chunk_size
+        self.rows_per_second = rows_per_second
+
+    async def run(self, repair: bool = False, now: Optional[datetime] = None) -> ReconcileReport:
+        started = time.perf_counter()
+        now = now or datetime.now()
+        report = ReconcileReport(repair=repair)
+
+        last_id = 0
+        while True:
+            chunk_started = time.perf_counter()
+            async with self.session_factory() as session:
+                with use_primary(session):
+                    rows, drifts, repaired = await run_in_transaction(
+                        session,
+                        lambda: self._check_chunk(session, last_id, now, repair),
+                        operation="reconcile_chunk",
+                    )
+            if not rows:
+                break
+            report.chunks += 1
+            report.users_checked += len(rows)
+            for _, _, _, pending, bonus_rows in rows:
+                report.bonus_rows += bonus_rows
+                report.pending_expiry += bool(pending)
+            for drift in drifts:
+                report.add(drift)
+            report.repaired += repaired
+            report.changed_meanwhile += len(drifts) - repaired if repair else 0
+            BALANCE_REPAIRS.inc(repaired)
+            last_id = rows[-1][0]
+            await self._pace(report, rows, time.perf_counter() - chunk_started)
+
+        report.duration = time.perf_counter() - started
+        logger.info("⚖️ %s", report.summary())
+        return report
+
+    async def _pace(self, report: ReconcileReport, rows: list, elapsed: float):
+        """Досыпаем, чтобы чтение не превышало rows_per_second."""
+        if self.rows_per_second <= 0:
+            return
+        read = len(rows) + sum(row[4] for row in rows)
+        pause = read / self.rows_per_second - elapsed
+        if pause > 0:
+            report.throttled += pause
+            await asyncio.sleep(pause)
+
+    def _chunk_query(self, last_id: int, now: datetime):
+        """(id, holiday_balance, сумма действующих, сумма просроченных активных, бонусов) по чанку."""
+        users = (
+            select(User.id, User.holiday_balance)
+            .where(User.id > last_id)
+            .order_by(User.id)
+            .limit(self.chunk_size)
+            .subquery()
+        )
+        live = or_(UserHolidayBonus.expires_at.is_(None), UserHolidayBonus.expires_at > now)
+        bonuses = (
+            select(
+                UserHolidayBonus.user_id,
+                func.sum(case((live, UserHolidayBonus.amount), else_=0)).label("live"),
+                func.sum(case((live, 0), else_=UserHolidayBonus.amount)).label("pending"),
+                func.count().label("rows"),
+            )
+            .where(
+                UserHolidayBonus.user_id.in_(select(users.c.id)),
+                UserHolidayBonus.is_active == True,
+            )
+            .group_by(UserHolidayBonus.user_id)
+            .subquery()
+        )
+        return (
+            select(
+                users.c.id,
+                func.coalesce(users.c.holiday_balance, 0),
+                func.coalesce(bonuses.c.live, 0),
+                func.coalesce(bonuses.c.pending, 0),
+                func.coalesce(bonuses.c.rows, 0),
+            )
+            .select_from(users)
+            .outerjoin(bonuses, bonuses.c.user_id == users.c.id)
+            .order_by(users.c.id)
+        )
+
+    async def _check_chunk(
+        self, session: AsyncSession, last_id: int, now: datetime, repair: bool
+    ) -> tuple[list, list[Drift], int]:
+        """(строки чанка, расхождения, сколько исправлено)."""
+        rows = (await session.execute(self._chunk_query(last_id, now))).all()
+        drifts = [
+            Drift(user_id, stored, live)
+            for user_id, stored, live, pending, _ in rows
+            if not pending and stored != live
+        ]
+        repaired = await self._repair(session, drifts, now) if repair and drifts else 0
+        return rows, drifts, repaired
+
+    async def _repair(self, session: AsyncSession, drifts: list[Drift], now: datetime) -> int:
+        # расхождения редки — по UPDATE на пользователя; NULL читался как 0
+        repaired = []
+        for drift in drifts:
+            updated = await session.execute(
+                update(User)
+                .where(User.id == drift.user_id, func.coalesce(User.holiday_balance, 0) == drift.stored)
+                .values(holiday_balance=drift.expected)
+                .execution_options(synchronize_session=False)
+            )
+            if updated.rowcount:
+                repaired.append(drift)
+
+        if repaired:
+            await session.execute(
+                insert(Transaction),
+                [
+                    {
+                        "user_id": d.user_id,
+                        "amount": -d.delta,
+                        "operation_type": "subtract" if d.delta > 0 else "add",
+                        "description": REPAIR_DESCRIPTION,
+                        "created_at": now,
+                    }
+                    for d in repaired
+                ],
+            )
+        return len(repaired)
+
+
+# ----------------------------------------------------------
+# CLI
+# ----------------------------------------------------------
+async def _main(repair: bool, chunk_size: int, rows_per_second: int):
+    try:
+        report = await BalanceReconciler(chunk_size=chunk_size, rows_per_second=rows_per_second).run(repair=repair)
+    finally:
+        await engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сверка holiday_balance с суммой действующих бонусов")
+    parser.add_argument("--repair", action="store_true", help="исправить расхождения (со строкой в истории)")
+    parser.add_argument("--chunk-size", type=int, default=settings.RECONCILE_CHUNK_SIZE)
+    parser.add_argument(
+        "--rows-per-second", type=int, default=settings.RECONCILE_ROWS_PER_SECOND,
+        help="бюджет чтения, строк в секунду; 0 — без ограничения",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    report = asyncio.run(_main(args.repair, args.chunk_size, args.rows_per_second))
+    # код возврата 1 — есть неисправленные расхождения (для cron/мониторинга)
+    raise SystemExit(1 if report.drifted > report.repaired else 0)
+
+
+if __name__ == "__main__":
+    main()
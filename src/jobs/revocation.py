@@ -0,0 +1,295 @@
+# src/jobs/revocation.py
+"""
+Списание бонусов удалённого праздника — фоновой задачей.
+
+Раньше всё делалось прямо в callback'е «🗑 Удалить»: выборка всех
+действующих бонусов праздника, session.get(User) на каждый (N+1) и по
+одной строке Transaction на бонус — админ ждал, пока пройдёт весь список.
+
+Теперь callback только выключает праздник (is_active=False — больше не
+начисляется) и запускает HolidayRevocation; на время списания праздник
+захвачен (src.jobs.claims). Та проходит действующие
+бонусы праздника пачками (индекс ix_uhb_holiday_active), каждая пачка —
+одна транзакция:
+
+1) SELECT id … WHERE holiday_id = :id AND is_active LIMIT n
+   (на PostgreSQL — FOR UPDATE SKIP LOCKED);
+2) UPDATE user_holiday_bonuses SET is_active = false … RETURNING id;
+3) балансы пользователей — под блокировкой (src.jobs.balances), суммы
+   по пользователям — одним GROUP BY;
+4) новые балансы (меньше на сумму, но не ниже нуля) — одним executemany;
+5) одна пачечная вставка строк «Отмена праздничного бонуса» — по строке
+   на пользователя (ровно то, на что уменьшился баланс).
+
+Когда действующих бонусов не осталось, строки бонусов праздника
+удаляются пачками по id (keyset), и только потом — сама строка holidays
+(DELETE с условием NOT EXISTS). Оставлять их нельзя: holiday_id у бонусов
+ON DELETE SET NULL, а holiday_id IS NULL — это бонус ко дню рождения, и
+пользователь не получил бы его до конца года. Если часть бонусов была
+заблокирована (SKIP LOCKED), проход повторяется до DELETE_ATTEMPTS раз;
+не вышло — deleted=False, и прерванное списание продолжается повторным
+удалением.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import and_, delete, exists, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config.settings import settings
+from src.database import AsyncSessionLocal, use_primary
+from src.database.retry import run_in_transaction
+from src.jobs.balances import lock_balances, write_balances
+from src.jobs.claims import HolidayClaim, holiday_claim
+from src.models.holiday_bonus import HolidayBonus, UserHolidayBonus
+from src.models.transaction import Transaction
+from src.monitoring.metrics import REGISTRY
+from src.services.holiday_bonus_service import revoke_description
+
+logger = logging.getLogger(__name__)
+
+# попыток дописать заблокированные бонусы перед удалением праздника
+DELETE_ATTEMPTS = 5
+RETRY_DELAY = 1.0
+
+REVOKED_BONUSES = REGISTRY.counter(
+    "bonus_bot_revoked_bonuses_total",
+    "Праздничные бонусы, списанные при удалении праздника",
+)
+
+
+@dataclass
+class RevocationReport:
+    holiday_id: int
+    name: Optional[str] = None
+    bonuses_total: int = 0
+    batches: int = 0
+    bonuses: int = 0
+    users: int = 0  # разных пользователей с бонусами праздника (на старте)
+    amount: int = 0
+    purged: int = 0  # удалено строк бонусов праздника перед удалением его самого
+    deleted: bool = False
+    duration: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"списание праздника {self.name or self.holiday_id}: бонусов {self.bonuses} "
+            f"({self.batches} пачек), пользователей {self.users}, списано {self.amount}, "
+            f"строк бонусов удалено {self.purged}, "
+            f"праздник {'удалён' if self.deleted else 'не удалён'}, за {self.duration:.2f} с"
+        )
+
+
+ProgressCallback = Callable[[RevocationReport], Awaitable[None]]
+
+
+class HolidayRevocation:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        batch_size: int = settings.REVOCATION_BATCH_SIZE,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+
+    async def run(
+        self,
+        holiday_id: int,
+        on_progress: Optional[ProgressCallback] = None,
+        now: Optional[datetime] = None,
+    ) -> RevocationReport:
+        """Списать бонусы и удалить праздник; HolidayBusy — по нему уже идёт другая операция."""
+        async with holiday_claim(self.session_factory, holiday_id) as claim:
+            async def progress(report: RevocationReport):
+                await claim.renew()
+                if on_progress is not None:
+                    await on_progress(report)
+
+            return await self._run(holiday_id, progress, now or datetime.now(), claim)
+
+    async def _run(
+        self, holiday_id: int, on_progress: ProgressCallback, now: datetime, claim: HolidayClaim
+    ) -> RevocationReport:
+        started = time.perf_counter()
+        report = RevocationReport(holiday_id=holiday_id)
+
+        async with self.session_factory() as session:
+            with use_primary(session):
+                report.name = await session.scalar(select(HolidayBonus.name).where(HolidayBonus.id == holiday_id))
+                report.bonuses_total, report.users = (
+                    await session.execute(
+                        select(func.count(UserHolidayBonus.id), func.count(UserHolidayBonus.user_id.distinct()))
+                        .where(self._revocable(holiday_id))
+                    )
+                ).one()
+
+        for attempt in range(DELETE_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(RETRY_DELAY)
+                await claim.renew()
+            await self._revoke_all(holiday_id, now, report, on_progress)
+            await self._purge_all(holiday_id, report)
+
+            async with self.session_factory() as session:
+                with use_primary(session):
+                    report.deleted, remaining = await run_in_transaction(
+                        session, lambda: self._delete_holiday(session, holiday_id), operation="holiday_delete"
+                    )
+            # пустая пачка при SKIP LOCKED ещё не значит «всё списано»:
+            # остальные бонусы могли быть заблокированы тратой или сжиганием,
+            # а сжигание — выключить бонус уже после прохода удаления
+            if report.deleted or not remaining:
+                break
+            logger.info("🗑 праздник %s: осталось бонусов %s, повтор", holiday_id, remaining)
+
+        report.duration = time.perf_counter() - started
+        logger.info("🗑 %s", report.summary())
+        return report
+
+    async def _revoke_all(
+        self,
+        holiday_id: int,
+        now: datetime,
+        report: RevocationReport,
+        on_progress: ProgressCallback,
+    ):
+        while True:
+            async with self.session_factory() as session:
+                with use_primary(session):
+                    bonuses, amount = await run_in_transaction(
+                        session,
+                        lambda: self._revoke_batch(session, holiday_id, report.name, now),
+                        operation="holiday_revocation",
+                    )
+            if not bonuses:
+                return
+            report.batches += 1
+            report.bonuses += bonuses
+            report.amount += amount
+            REVOKED_BONUSES.inc(bonuses)
+            await on_progress(report)
+
+    async def _purge_all(self, holiday_id: int, report: RevocationReport):
+        last_id = 0
+        while True:
+            async with self.session_factory() as session:
+                with use_primary(session):
+                    purged, last_id = await run_in_transaction(
+                        session,
+                        lambda: self._purge_batch(session, holiday_id, last_id),
+                        operation="holiday_purge",
+                    )
+            if not purged:
+                return
+            report.purged += purged
+
+    @staticmethod
+    def _revocable(holiday_id: int):
+        # и ещё не сожжённые просроченные: после удаления праздника их holiday_id
+        # станет NULL, и сборщик списал бы их как бонус ко дню рождения
+        return and_(UserHolidayBonus.holiday_id == holiday_id, UserHolidayBonus.is_active == True)
+
+    async def _revoke_batch(
+        self, session: AsyncSession, holiday_id: int, name: Optional[str], now: datetime
+    ) -> tuple[int, int]:
+        """(списано бонусов, списано с балансов)."""
+        due_ids = (
+            await session.execute(
+                select(UserHolidayBonus.id)
+                .where(self._revocable(holiday_id))
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+        ).scalars().all()
+        if not due_ids:
+            return 0, 0
+
+        revoked_ids = (
+            await session.execute(
+                update(UserHolidayBonus)
+                .where(UserHolidayBonus.id.in_(due_ids), UserHolidayBonus.is_active == True)
+                .values(is_active=False)
+                .returning(UserHolidayBonus.id)
+                .execution_options(synchronize_session=False)
+            )
+        ).scalars().all()
+        if not revoked_ids:
+            return 0, 0
+
+        balances = await lock_balances(
+            session, select(UserHolidayBonus.user_id).where(UserHolidayBonus.id.in_(revoked_ids))
+        )
+        per_user = (
+            await session.execute(
+                select(UserHolidayBonus.user_id, func.sum(UserHolidayBonus.amount))
+                .where(UserHolidayBonus.id.in_(revoked_ids))
+                .group_by(UserHolidayBonus.user_id)
+            )
+        ).all()
+
+        # баланс прочитан под блокировкой: строка истории = реальное списание
+        new_balances = {}
+        ledger = []
+        for user_id, revoked in per_user:
+            balance = balances.get(user_id, 0)
+            to_sub = min(balance, revoked)
+            if to_sub > 0:
+                new_balances[user_id] = balance - to_sub
+                ledger.append({
+                    "user_id": user_id,
+                    "amount": -to_sub,
+                    "operation_type": "subtract",
+                    "description": revoke_description(name),
+                    "created_at": now,
+                })
+
+        await write_balances(session, new_balances)
+        if ledger:
+            await session.execute(insert(Transaction), ledger)
+
+        return len(revoked_ids), -sum(row["amount"] for row in ledger)
+
+    async def _purge_batch(self, session: AsyncSession, holiday_id: int, after_id: int) -> tuple[int, int]:
+        """Удалить пачку списанных бонусов праздника с id > after_id: (удалено, id последней строки)."""
+        ids = (
+            await session.execute(
+                select(UserHolidayBonus.id)
+                .where(
+                    UserHolidayBonus.holiday_id == holiday_id,
+                    UserHolidayBonus.is_active == False,
+                    UserHolidayBonus.id > after_id,
+                )
+                .order_by(UserHolidayBonus.id)
+                .limit(self.batch_size)
+            )
+        ).scalars().all()
+        if not ids:
+            return 0, after_id
+        await session.execute(
+            delete(UserHolidayBonus)
+            .where(UserHolidayBonus.id.in_(ids), UserHolidayBonus.is_active == False)
+            .execution_options(synchronize_session=False)
+        )
+        return len(ids), ids[-1]
+
+    async def _delete_holiday(self, session: AsyncSession, holiday_id: int) -> tuple[bool, int]:
+        """(удалён ли праздник, сколько строк его бонусов осталось)."""
+        own_bonus = UserHolidayBonus.holiday_id == holiday_id
+        result = await session.execute(
+            delete(HolidayBonus)
+            .where(
+                HolidayBonus.id == holiday_id,
+                HolidayBonus.is_active == False,
+                # иначе ON DELETE SET NULL превратит их в «бонусы ко дню рождения»
+                ~exists().where(own_bonus),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            return True, 0
+        remaining = await session.scalar(select(func.count(UserHolidayBonus.id)).where(own_bonus))
+        return False, remaining
@@ -0,0 +1,97 @@
+# src/jobs/scheduler.py
+"""
+Фоновые задачи внутри процесса бота.
+
+Без внешнего планировщика: задача — корутина без аргументов, run_daily
+запускает её раз в сутки в заданное локальное время (и, по желанию,
+сразу при старте, чтобы догнать пропущенный прогон), run_every — с
+фиксированной паузой между прогонами, spawn — разово (длинные операции
+из админки, чтобы callback не ждал их окончания). Ошибка прогона
+логируется и не останавливает расписание.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from datetime import time as time_of_day
+from typing import Any, Awaitable, Callable, Optional
+
+from src.monitoring.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+JOB_RUNS = REGISTRY.counter(
+    "bonus_bot_job_runs_total",
+    "Прогоны фоновых задач",
+    labelnames=("job", "status"),
+)
+JOB_DURATION = REGISTRY.histogram(
+    "bonus_bot_job_duration_seconds",
+    "Длительность прогона фоновой задачи",
+    labelnames=("job",),
+    buckets=(0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600),
+)
+
+# разовые задачи: event loop держит на задачи только слабые ссылки
+_spawned: set[asyncio.Task] = set()
+
+
+def parse_time_of_day(value: str) -> time_of_day:
+    """'00:05' -> time(0, 5)."""
+    hours, minutes = value.strip().split(":")
+    return time_of_day(int(hours), int(minutes))
+
+
+def seconds_until(at: time_of_day, now: Optional[datetime] = None) -> float:
+    """Сколько секунд до ближайшего наступления времени at (строго в будущем)."""
+    now = now or datetime.now()
+    target = datetime.combine(now.date(), at)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+async def run_job(name: str, job: Callable[[], Awaitable[Any]]) -> Any:
+    started = time.perf_counter()
+    try:
+        result = await job()
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        JOB_RUNS.inc(job=name, status="error")
+        logger.exception("❌ Задача %s завершилась с ошибкой", name)
+        return None
+    finally:
+        JOB_DURATION.observe(time.perf_counter() - started, job=name)
+    JOB_RUNS.inc(job=name, status="ok")
+    return result
+
+
+async def run_daily(
+    name: str,
+    at: time_of_day,
+    job: Callable[[], Awaitable[Any]],
+    run_on_start: bool = True,
+):
+    if run_on_start:
+        await run_job(name, job)
+    while True:
+        await asyncio.sleep(seconds_until(at))
+        await run_job(name, job)
+
+
+async def run_every(name: str, interval: float, job: Callable[[], Awaitable[Any]]):
+    while True:
+        await run_job(name, job)
+        await asyncio.sleep(interval)
+
+
+def spawn(name: str, job: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+    task = asyncio.create_task(run_job(name, job), name=name)
+    _spawned.add(task)
+    task.add_done_callback(_spawned.discard)
+    return task
+
+
+def spawned_tasks() -> list[asyncio.Task]:
+    return list(_spawned)
@@ -19,11 +19,11 @@ def admin_main_menu_kb():
 # Список пользователей + пагинация
 # -------------------------------------------------------------------
 def admin_user_list_kb(users, page: int, total_pages: int):
+    """users — строки UserListRow (см. UserService.get_user_list_page)."""
     keyboard = []
 
     for u in users:
-        full_name = f"{u.first_name or ''} {u.last_name or ''}".strip()
-        label = full_name or "Без имени"
+        label = u.full_name or "Без имени"
         label += f" (ID {u.telegram_id})"
 
         keyboard.append(
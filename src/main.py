@@ -2,21 +2,23 @@
 import asyncio
 import logging
 import os
-from typing import Dict, Any
 
-from aiogram import Bot, Dispatcher, BaseMiddleware
+from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram.types import Message
-from aiogram.filters import Command
 from dotenv import load_dotenv
 
-from sqlalchemy import select
-
 # --- DATABASE ---
-from src.database import AsyncSessionLocal, create_tables
-
-# --- MODELS ---
-from src.models.user import User
+from src.config.settings import settings
+from src.database import create_tables, check_connection, engine, replica_engine
+from src.database.slow_queries import configure_slow_query_log, install_slow_query_log
+
+# --- MIDDLEWARES ---
+from src.middlewares.db import DBSessionMiddleware, ReadOnlyRoutingMiddleware
+from src.middlewares.admin import AdminMiddleware
+from src.middlewares.dispatch_index import DispatchIndexMiddleware
+from src.middlewares.instrumentation import BotApiMetricsMiddleware, InstrumentationMiddleware
+from src.middlewares.single_flight import SingleFlightMiddleware
+from src.middlewares.throttling import ThrottlingMiddleware
 
 # --- USER ROUTERS ---
 from src.handlers.user.start import router as user_start_router
@@ -33,6 +35,18 @@ from src.handlers.admin.qr_scan import router as admin_qr_router
 from src.handlers.admin.stats import router as admin_stats_router
 from src.handlers.admin.posts import router as admin_posts_router
 
+# --- DISPATCH ---
+from src.utils.dispatch_index import DispatchIndex
+
+# --- MONITORING ---
+from src.monitoring.logs import configure_logging, stop_logging
+from src.monitoring.server import dump_metrics, dump_metrics_periodically, start_metrics_server
+
+# --- JOBS ---
+from src.jobs.accrual import AccrualJob
+from src.jobs.expiry import ExpirySweeper
+from src.jobs.scheduler import parse_time_of_day, run_daily, run_every, spawned_tasks
+
 # --- SERVICES ---
 from src.services.holiday_bonus_service import HolidayBonusService
 
@@ -40,61 +54,62 @@ from src.services.holiday_bonus_service import HolidayBonusService
 load_dotenv()
 TOKEN = os.getenv("BOT_TOKEN")
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("bonus_bot")
 
 
 # ----------------------------------------------------------
-# DB SESSION MIDDLEWARE
+# LOGGING
 # ----------------------------------------------------------
-class DBSessionMiddleware(BaseMiddleware):
-    """Передаёт session каждому хендлеру через data['session']"""
-
-    async def __call__(self, handler, event, data):
-        async with AsyncSessionLocal() as session:
-            data["session"] = session
-            return await handler(event, data)
+def init_logging():
+    # форматирование, запись, ротация и gzip — в фоновом потоке
+    configure_logging(
+        level=settings.LOG_LEVEL,
+        path=settings.LOG_PATH,
+        max_bytes=settings.LOG_MAX_BYTES,
+        backup_count=settings.LOG_BACKUPS,
+        json_format=settings.LOG_FORMAT.lower() == "json",
+        queue_size=settings.LOG_QUEUE_SIZE,
+    )
 
 
 # ----------------------------------------------------------
-# ADMIN MIDDLEWARE
+# DATABASE INIT
 # ----------------------------------------------------------
-class AdminMiddleware(BaseMiddleware):
-    """Проверка прав администратора"""
-
-    async def __call__(self, handler, event, data: Dict[str, Any]):
-        if not hasattr(event, "from_user"):
-            return await handler(event, data)
-
-        user_id = event.from_user.id
-
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(User).where(User.telegram_id == user_id)
-            )
-            db_user = result.scalar_one_or_none()
-
-            is_admin = bool(db_user and db_user.role == "admin")
-
-            data["is_admin"] = is_admin
-            data["admin_user"] = db_user if is_admin else None
-
-        # запрет на доступ к админ-командам
-        if isinstance(event, Message):
-            if event.text and event.text.startswith("/admin") and not is_admin:
-                await event.answer("⛔ У вас нет доступа!")
-                return
+async def init_database():
+    if not await check_connection():
+        logger.error("❌ База данных недоступна")
+        exit(1)
 
-        return await handler(event, data)
+    # миграции — до старта polling'а, пока апдейты ещё не обрабатываются
+    logger.info("🔄 Проверка миграций схемы...")
+    await create_tables()
+    logger.info("✅ Схема БД готова!")
 
 
 # ----------------------------------------------------------
-# DATABASE INIT
+# SLOW QUERY LOG
 # ----------------------------------------------------------
-async def init_database():
-    logger.info("🔄 Создание таблиц...")
-    await create_tables()
-    logger.info("✅ Таблицы готовы!")
+def init_slow_query_log():
+    if not settings.SLOW_QUERY_LOG_PATH:
+        return
+    configure_slow_query_log(
+        settings.SLOW_QUERY_LOG_PATH,
+        settings.SLOW_QUERY_LOG_MAX_BYTES,
+        settings.SLOW_QUERY_LOG_BACKUPS,
+    )
+    for name, target in (("primary", engine), ("replica", replica_engine)):
+        if target is not None:
+            install_slow_query_log(
+                target,
+                settings.SLOW_QUERY_THRESHOLD_MS,
+                settings.SLOW_QUERY_SAMPLE_RATE,
+                engine_name=name,
+            )
+    logger.info(
+        "🐢 Медленные запросы (> %s мс) пишутся в %s",
+        settings.SLOW_QUERY_THRESHOLD_MS,
+        settings.SLOW_QUERY_LOG_PATH,
+    )
 
 
 # ----------------------------------------------------------
@@ -119,11 +134,13 @@ async def main():
 
     # init DB tables
     await init_database()
+    init_slow_query_log()
 
     # init holidays
     await init_holidays()
 
     bot = Bot(TOKEN)
+    bot.session.middleware(BotApiMetricsMiddleware())
     dp = Dispatcher(storage=MemoryStorage())
 
     bot_info = await bot.get_me()
@@ -131,12 +148,28 @@ async def main():
 
     # Middleware
     db_mw = DBSessionMiddleware()
+    instrumentation_mw = InstrumentationMiddleware()
+    single_flight_mw = SingleFlightMiddleware()
+    throttling_mw = ThrottlingMiddleware()
+    read_only_mw = ReadOnlyRoutingMiddleware()
     admin_mw = AdminMiddleware()
 
-    # Подключение Middleware строго в таком порядке
-    dp.update.middleware(db_mw)
-    dp.message.middleware(db_mw)
-    dp.callback_query.middleware(db_mw)
+    # Подключение Middleware строго в таком порядке:
+    # одна сессия на апдейт (outer на update), замеры по хендлерам,
+    # склейка повторов, ограничение частоты, маршрутизация чтения, проверка роли
+    dp.update.outer_middleware(db_mw)
+
+    dp.message.middleware(instrumentation_mw)
+    dp.callback_query.middleware(instrumentation_mw)
+
+    dp.message.middleware(single_flight_mw)
+    dp.callback_query.middleware(single_flight_mw)
+
+    dp.message.middleware(throttling_mw)
+    dp.callback_query.middleware(throttling_mw)
+
+    dp.message.middleware(read_only_mw)
+    dp.callback_query.middleware(read_only_mw)
 
     dp.message.middleware(admin_mw)
     dp.callback_query.middleware(admin_mw)
@@ -156,6 +189,35 @@ async def main():
     dp.include_router(admin_stats_router)
     dp.include_router(admin_posts_router)
 
+    # Индекс кнопок/колбэков — после подключения всех роутеров
+    dispatch_index = DispatchIndex().install(dp)
+    dispatch_index_mw = DispatchIndexMiddleware(dispatch_index)
+    dp.message.outer_middleware(dispatch_index_mw)
+    dp.callback_query.outer_middleware(dispatch_index_mw)
+    logger.info("🧭 Индекс диспетчеризации: роутеров с быстрым отсевом — %s", dispatch_index.gated_routers)
+
+    # Метрики
+    metrics_runner = None
+    if settings.METRICS_PORT:
+        metrics_runner = await start_metrics_server(settings.METRICS_HOST, settings.METRICS_PORT)
+    dump_task = None
+    if settings.METRICS_DUMP_PATH:
+        dump_task = asyncio.create_task(
+            dump_metrics_periodically(settings.METRICS_DUMP_PATH, settings.METRICS_DUMP_INTERVAL)
+        )
+
+    # Ночное начисление праздничных бонусов (ACCRUAL_MODE=scheduled)
+    # и сжигание просроченных
+    background_tasks = []
+    if settings.ACCRUAL_MODE == "scheduled":
+        background_tasks.append(asyncio.create_task(
+            run_daily("accrual", parse_time_of_day(settings.ACCRUAL_TIME), AccrualJob().run)
+        ))
+    if settings.EXPIRY_SWEEP_INTERVAL > 0:
+        background_tasks.append(asyncio.create_task(
+            run_every("expiry_sweep", settings.EXPIRY_SWEEP_INTERVAL, ExpirySweeper().run)
+        ))
+
     # Start polling
     await bot.delete_webhook(drop_pending_updates=True)
     logger.info("🚀 Polling zapushchen.")
@@ -163,9 +225,22 @@ async def main():
     try:
         await dp.start_polling(bot)
     finally:
+        if dump_task is not None:
+            dump_task.cancel()
+        # прерванные начисления/списания откатываются, их можно запустить заново
+        for task in background_tasks + spawned_tasks():
+            task.cancel()
+        dump_metrics(settings.METRICS_DUMP_PATH)
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
         await bot.session.close()
+        await engine.dispose()
+        if replica_engine is not None:
+            await replica_engine.dispose()
         logger.info("🧹 Сессия закрыта.")
+        stop_logging()
 
 
 if __name__ == "__main__":
+    init_logging()
     asyncio.run(main())
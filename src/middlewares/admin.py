@@ -1,14 +1,47 @@
-# middleware/admin_middleware.py
+# src/middlewares/admin.py
 from aiogram import BaseMiddleware
 from aiogram.types import Message, CallbackQuery
-from typing import Callable, Dict, Any, Awaitable
-from src.database import AsyncSessionLocal
-from sqlalchemy import select
-from src.models.user import User
+from typing import Callable, Dict, Any
+from src.database.identity import identity_cache
+
+# Список всех админских колбэков
+ADMIN_CALLBACK_PREFIXES = (
+    'admin_', 'add_bonus_', 'subtract_', 'search_',
+    'phone_', 'change_', 'history_'
+)
+
+# Аргументы хендлера, которым нужна проверка роли
+ADMIN_DATA_KEYS = {"is_admin", "admin_user"}
+
+
+def _is_admin_entry(event) -> bool:
+    """Админская команда/колбэк: без прав админа апдейт отклоняется."""
+    if isinstance(event, Message):
+        return bool(event.text and event.text.startswith('/admin'))
+    if isinstance(event, CallbackQuery):
+        return (event.data or "").startswith(ADMIN_CALLBACK_PREFIXES)
+    return False
+
+
+def _needs_admin_check(event, data: Dict[str, Any]) -> bool:
+    if _is_admin_entry(event):
+        return True
+
+    handler = data.get("handler")
+    if handler is None or handler.varkw:
+        return True
+    return bool(ADMIN_DATA_KEYS & handler.params)
 
 
 class AdminMiddleware(BaseMiddleware):
-    """Middleware для проверки прав администратора"""
+    """
+    Middleware для проверки прав администратора.
+
+    Роль берётся из identity_cache (при промахе — запрос через сессию
+    апдейта data['session']) и только тогда, когда она действительно
+    нужна: хендлер принимает is_admin/admin_user или это админская
+    команда/колбэк. admin_user — Identity администратора.
+    """
 
     async def __call__(
             self,
@@ -16,43 +49,32 @@ class AdminMiddleware(BaseMiddleware):
             event: Message | CallbackQuery,
             data: Dict[str, Any]
     ) -> Any:
-        # ВСЕГДА проверяем права для любого сообщения/колбэка
-        user_id = event.from_user.id
-
-        # Проверяем права администратора
-        async with AsyncSessionLocal() as session:
-            stmt = select(User).where(User.telegram_id == user_id)
-            result = await session.execute(stmt)
-            user = result.scalar_one_or_none()
-
-            if user and user.role == "admin":
-                # Ключевой момент: добавляем is_admin в data
-                data["is_admin"] = True
-                data["admin_user"] = user
-            else:
-                data["is_admin"] = False
-                data["admin_user"] = None
+        if getattr(event, "from_user", None) is None:
+            return await handler(event, data)
 
-        # Если команда /admin и не админ - блокируем
-        if isinstance(event, Message) and event.text and event.text.startswith('/admin'):
-            if not data.get("is_admin"):
-                await event.answer("⛔ У вас нет доступа к админ-панели!")
-                return None
+        if not _needs_admin_check(event, data):
+            return await handler(event, data)
 
-        # Для админских колбэков проверяем права
-        if isinstance(event, CallbackQuery):
-            callback_data = event.data or ""
-            # Список всех админских колбэков
-            admin_callbacks = [
-                'admin_', 'add_bonus_', 'subtract_', 'search_',
-                'phone_', 'change_', 'history_'
-            ]
+        admin_entry = _is_admin_entry(event)
+        # на входе в админку «не админ» из кэша перепроверяется — повышение
+        # роли (make-admin.py, другой процесс) действует сразу, без ожидания TTL
+        identity = await identity_cache.resolve(
+            data["session"], event.from_user.id, require_admin=admin_entry
+        )
 
-            is_admin_callback = any(callback_data.startswith(prefix) for prefix in admin_callbacks)
+        is_admin = identity.is_admin
+        data["is_admin"] = is_admin
+        data["admin_user"] = identity if is_admin else None
 
-            if is_admin_callback and not data.get("is_admin"):
-                await event.answer("⛔ Нет доступа!", show_alert=True)
-                return None
+        # Если команда /admin и не админ - блокируем
+        if admin_entry and isinstance(event, Message) and not is_admin:
+            await event.answer("⛔ У вас нет доступа!")
+            return None
+
+        # Для админских колбэков проверяем права
+        if admin_entry and isinstance(event, CallbackQuery) and not is_admin:
+            await event.answer("⛔ Нет доступа!", show_alert=True)
+            return None
 
         # Продолжаем обработку
-        return await handler(event, data)
\ No newline at end of file
+        return await handler(event, data)
@@ -0,0 +1,72 @@
+# src/middlewares/db.py
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import TelegramObject
+
+from src.database import AsyncSessionLocal, recent_writers
+from src.database.unit_of_work import track_unit_of_work
+
+logger = logging.getLogger(__name__)
+
+
+class DBSessionMiddleware(BaseMiddleware):
+    """
+    Одна сессия на апдейт, общая для всех middleware, хендлеров и сервисов
+    (data['session']).
+
+    Регистрируется только на dp.update. AsyncSession ленивая: соединение
+    берётся из пула при первом запросе, поэтому апдейты без обращения
+    к БД (например, «⬅️ Назад в меню») пул не трогают.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        with track_unit_of_work() as stats:
+            async with self.session_factory() as session:
+                from_user = data.get("event_from_user")
+                if from_user is not None:
+                    session.info["actor_id"] = from_user.id
+                data["session"] = session
+                try:
+                    return await handler(event, data)
+                finally:
+                    logger.debug(
+                        "update %s: sessions=%d connections=%d",
+                        getattr(event, "update_id", "?"),
+                        stats.sessions,
+                        stats.connections,
+                    )
+
+
+class ReadOnlyRoutingMiddleware(BaseMiddleware):
+    """
+    Помечает сессию апдейта как read-only для хендлеров с flags={"read_only": True}:
+    такие запросы уходят на реплику (если она настроена).
+
+    Пользователь, который только что что-то записал (или чей баланс
+    только что изменил кассир), читает с основной БД — см. recent_writers.
+    Регистрируется на message/callback_query раньше AdminMiddleware.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        session = data.get("session")
+        if session is not None and get_flag(data, "read_only"):
+            actor_id = session.info.get("actor_id")
+            if actor_id is None or not recent_writers.is_pinned(actor_id):
+                session.info["read_only"] = True
+        return await handler(event, data)
@@ -0,0 +1,27 @@
+# src/middlewares/dispatch_index.py
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from src.utils.dispatch_index import DispatchIndex
+
+
+class DispatchIndexMiddleware(BaseMiddleware):
+    """
+    Вычисляет ключи апдейта (data['route_keys']) один раз до обхода
+    роутеров — см. src.utils.dispatch_index. Регистрируется как outer
+    на dp.message и dp.callback_query.
+    """
+
+    def __init__(self, index: DispatchIndex):
+        self.index = index
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        self.index.inject(event, data)
+        return await handler(event, data)
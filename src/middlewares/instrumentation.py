@@ -0,0 +1,87 @@
+# src/middlewares/instrumentation.py
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import TelegramObject
+
+from src.database.unit_of_work import current_stats
+from src.middlewares.throttling import handler_name
+from src.monitoring.metrics import REGISTRY
+
+HANDLER_DURATION = REGISTRY.histogram(
+    "bonus_bot_handler_duration_seconds",
+    "Время обработки апдейта хендлером (вместе с нижележащими middleware)",
+    labelnames=("handler",),
+)
+HANDLER_QUERIES = REGISTRY.histogram(
+    "bonus_bot_handler_queries",
+    "SQL-запросов за один вызов хендлера",
+    labelnames=("handler",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34),
+)
+HANDLER_ROWS = REGISTRY.histogram(
+    "bonus_bot_handler_rows",
+    "Строк прочитано/изменено за один вызов хендлера",
+    labelnames=("handler",),
+    buckets=(0, 1, 10, 50, 100, 500, 1000, 5000),
+)
+BOT_API_DURATION = REGISTRY.histogram(
+    "bonus_bot_api_request_duration_seconds",
+    "Время запроса к Telegram Bot API",
+    labelnames=("method", "status"),
+)
+
+# long polling висит до таймаута — в латентность API его не считаем
+UNTIMED_API_METHODS = {"getUpdates"}
+
+
+class InstrumentationMiddleware(BaseMiddleware):
+    """
+    Латентность и число SQL-запросов/строк по хендлерам.
+
+    Регистрируется на message/callback_query первым из inner-middleware:
+    в data уже есть data['handler'], а замер охватывает склейку,
+    throttling, проверку роли и сам хендлер. Запросы и строки берутся из
+    статистики unit of work (см. src.database.unit_of_work).
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = handler_name(data)
+        stats = current_stats()
+        if stats is not None:
+            stats.handler = name
+        queries_before = stats.queries if stats else 0
+        rows_before = stats.rows if stats else 0
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            HANDLER_DURATION.observe(time.perf_counter() - started, handler=name)
+            if stats is not None:
+                HANDLER_QUERIES.observe(stats.queries - queries_before, handler=name)
+                HANDLER_ROWS.observe(stats.rows - rows_before, handler=name)
+
+
+class BotApiMetricsMiddleware(BaseRequestMiddleware):
+    """Латентность запросов к Bot API: bot.session.middleware(...)."""
+
+    async def __call__(self, make_request, bot, method):
+        api_method = getattr(method, "__api_method__", type(method).__name__)
+        if api_method in UNTIMED_API_METHODS:
+            return await make_request(bot, method)
+
+        started = time.perf_counter()
+        status = "error"
+        try:
+            result = await make_request(bot, method)
+            status = "ok"
+            return result
+        finally:
+            BOT_API_DURATION.observe(time.perf_counter() - started, method=api_method, status=status)
@@ -0,0 +1,102 @@
+# src/middlewares/single_flight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from src.middlewares.throttling import handler_name
+from src.monitoring.metrics import REGISTRY
+
+COALESCED = REGISTRY.counter(
+    "bonus_bot_coalesced_total",
+    "Апдейты, присоединившиеся к уже идущей обработке того же запроса",
+    labelnames=("handler",),
+)
+
+
+class SingleFlight:
+    """
+    Не больше одного выполнения на ключ: пока оно идёт, остальные
+    вызовы с тем же ключом ждут его и получают тот же результат
+    (или то же исключение).
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self):
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """Результат fn() и признак, что он получен от чужого выполнения."""
+        future = self._inflight.get(key)
+        if future is not None:
+            # shield: отмена ожидающего не должна отменять общий future
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fn()
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # ожидающих может не быть — не пишем «never retrieved»
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._inflight[key]
+            if not future.done():
+                future.cancel()
+
+
+class SingleFlightMiddleware(BaseMiddleware):
+    """
+    Склеивает одинаковые апдейты, пришедшие, пока первый ещё
+    обрабатывается (двойной тап по кнопке меню или inline-кнопке).
+
+    Ключ — (telegram_id, хендлер, текст/callback_data); включается флагом
+    flags={"single_flight": True}. Хендлер выполняется один раз — его
+    ответ пользователь и увидит; повторный апдейт ждёт завершения и
+    ничего не отправляет (колбэк только закрывает «часики»). Так
+    начисление и запись в holiday_balance не идут параллельно сами с собой.
+
+    Регистрируется на message/callback_query раньше ThrottlingMiddleware:
+    склеенный повтор не тратит токены.
+    """
+
+    def __init__(self):
+        self.flights = SingleFlight()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        from_user = data.get("event_from_user")
+        if from_user is None or not get_flag(data, "single_flight"):
+            return await handler(event, data)
+
+        name = handler_name(data)
+        result, shared = await self.flights.do(
+            (from_user.id, name, self._payload(event)),
+            lambda: handler(event, data),
+        )
+        if shared:
+            COALESCED.inc(handler=name)
+            if isinstance(event, CallbackQuery):
+                await event.answer()
+        return result
+
+    @staticmethod
+    def _payload(event: TelegramObject):
+        # разные страницы списка — разные запросы
+        if isinstance(event, CallbackQuery):
+            return event.data
+        if isinstance(event, Message):
+            return event.text
+        return None
@@ -0,0 +1,107 @@
+# src/middlewares/throttling.py
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from src.config.settings import settings
+from src.monitoring.metrics import REGISTRY
+
+THROTTLED = REGISTRY.counter(
+    "bonus_bot_throttled_total",
+    "Апдейты, отброшенные ограничением частоты",
+    labelnames=("handler",),
+)
+
+THROTTLED_TEXT = "⏳ Подождите немного — данные обновятся через пару секунд."
+
+
+def handler_name(data: Dict[str, Any]) -> Optional[str]:
+    """Имя функции-хендлера апдейта (метка для метрик)."""
+    handler = data.get("handler")
+    return getattr(handler.callback, "__name__", None) if handler else None
+
+
+class TokenBuckets:
+    """
+    Token bucket на каждого telegram_id: до burst токенов,
+    пополнение rate токенов в секунду.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: dict[int, tuple[float, float]] = {}
+
+    def consume(self, key: int, cost: float) -> bool:
+        now = time.monotonic()
+        if len(self._buckets) > 10_000:
+            # полные корзины ничем не отличаются от отсутствующих
+            full_after = self.burst / self.rate
+            self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < full_after}
+
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < cost:
+            self._buckets[key] = (tokens, now)
+            return False
+        self._buckets[key] = (tokens - cost, now)
+        return True
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Ограничение частоты для дорогих экранов.
+
+    Хендлер объявляет стоимость флагом: flags={"throttle": 3}. Без флага
+    апдейт бесплатный. Когда у пользователя кончились токены, хендлер не
+    вызывается: на сообщение отвечаем «подождите» (не чаще раза в
+    THROTTLE_NOTICE_SECONDS, дальше молча), на колбэк — всплывающим
+    текстом. Регистрируется на message/callback_query раньше маршрутизации
+    чтения и AdminMiddleware, чтобы отброшенный апдейт не трогал БД.
+    """
+
+    def __init__(
+        self,
+        rate: float = settings.THROTTLE_RATE,
+        burst: float = settings.THROTTLE_BURST,
+        notice_seconds: float = settings.THROTTLE_NOTICE_SECONDS,
+    ):
+        self.buckets = TokenBuckets(rate, burst)
+        self.notice_seconds = notice_seconds
+        self._noticed: dict[int, float] = {}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        cost = get_flag(data, "throttle")
+        from_user = data.get("event_from_user")
+        if not cost or from_user is None:
+            return await handler(event, data)
+
+        if self.buckets.consume(from_user.id, cost):
+            return await handler(event, data)
+
+        THROTTLED.inc(handler=handler_name(data))
+        if isinstance(event, CallbackQuery):
+            await event.answer(THROTTLED_TEXT)
+        elif isinstance(event, Message) and self._should_notice(from_user.id):
+            await event.answer(THROTTLED_TEXT)
+        return None
+
+    def _should_notice(self, telegram_id: int) -> bool:
+        now = time.monotonic()
+        if len(self._noticed) > 10_000:
+            self._noticed = {k: v for k, v in self._noticed.items() if v >= now}
+        if self._noticed.get(telegram_id, 0) > now:
+            return False
+        self._noticed[telegram_id] = now + self.notice_seconds
+        return True
@@ -9,6 +9,7 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
 )
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -43,6 +44,9 @@ class HolidayBonus(Base):
 
     is_active = Column(Boolean, nullable=False, default=True)
 
+    # занят начислением всем / списанием до этого момента (src.jobs.claims)
+    claimed_until = Column(DateTime, nullable=True)
+
     user_bonuses = relationship(
         "UserHolidayBonus",
         back_populates="holiday",
@@ -71,6 +75,16 @@ class UserHolidayBonus(Base):
     """
 
     __tablename__ = "user_holiday_bonuses"
+    __table_args__ = (
+        # действующие / просроченные бонусы пользователя (баланс, сжигание, списание)
+        Index("ix_uhb_user_active_expires", "user_id", "is_active", "expires_at"),
+        # «уже начисляли за этот праздник в этом году?»
+        Index("ix_uhb_user_holiday_created", "user_id", "holiday_id", "created_at"),
+        # фоновое сжигание: все просроченные активные бонусы (src.jobs.expiry)
+        Index("ix_uhb_active_expires", "is_active", "expires_at"),
+        # списание при удалении праздника: его действующие бонусы (src.jobs.revocation)
+        Index("ix_uhb_holiday_active", "holiday_id", "is_active"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
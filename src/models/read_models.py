@@ -0,0 +1,39 @@
+# src/models/read_models.py
+"""
+Лёгкие read-модели для экранов, которые только показывают данные.
+
+Это обычные NamedTuple (без __dict__, без identity map и ORM-состояния):
+строятся прямо из строк Core-запроса и ничего не знают о сессии.
+Для изменения данных по-прежнему используется ORM-модель User.
+"""
+from typing import NamedTuple, Optional
+
+
+class UserCard(NamedTuple):
+    """Карточка пользователя в админке (open_user, QR-скан, возврат из бонусов)."""
+
+    id: int
+    telegram_id: int
+    first_name: Optional[str]
+    last_name: Optional[str]
+    phone: Optional[str]
+    balance: Optional[int]
+    holiday_balance: Optional[int]
+    role: Optional[str]
+
+    @property
+    def total_balance(self) -> int:
+        return (self.balance or 0) + (self.holiday_balance or 0)
+
+
+class UserListRow(NamedTuple):
+    """Строка списка пользователей (кнопка в admin_user_list_kb)."""
+
+    id: int
+    telegram_id: int
+    first_name: Optional[str]
+    last_name: Optional[str]
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.first_name or ''} {self.last_name or ''}".strip()
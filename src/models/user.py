@@ -1,8 +1,8 @@
 # src/models/user.py
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Date
+from sqlalchemy import Column, Integer, SmallInteger, String, DateTime, Boolean, Date
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from src.database import Base
 
 
@@ -21,6 +21,8 @@ class User(Base):
 
     # Дата рождения
     birth_date = Column(Date, nullable=True)
+    # месяц * 100 + день — для поиска дней рождения по индексу (src.services.birthdays)
+    birth_mmdd = Column(SmallInteger, nullable=True, index=True)
 
     # Система ролей
     role = Column(String(20), default="user")
@@ -48,6 +50,11 @@ class User(Base):
         cascade="all, delete-orphan"
     )
 
+    @validates("birth_date")
+    def _sync_birth_mmdd(self, key, value):
+        self.birth_mmdd = value.month * 100 + value.day if value else None
+        return value
+
     def __repr__(self):
         return f"<User {self.telegram_id} ({self.first_name})>"
 
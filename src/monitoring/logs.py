@@ -0,0 +1,174 @@
+# src/monitoring/logs.py
+"""
+Логирование без записи на диск из event loop'а.
+
+Логгер получает единственный QueueHandler: в потоке бота запись только
+склеивает сообщение с аргументами и кладёт в очередь. Форматирование
+(включая трейсбеки), запись в файл/консоль, ротация по размеру и gzip
+старых файлов — в фоновом потоке QueueListener'а.
+
+Очередь ограничена LOG_QUEUE_SIZE: если поток записи не успевает
+(шторм ошибок, диск подвис), лишние записи отбрасываются и считаются в
+bonus_bot_log_records_dropped_total, а не копятся в памяти и не
+блокируют обработку апдейтов.
+
+    configure_logging(level="INFO", path="logs/bot.log", json_format=True)
+    ...
+    stop_logging()  # дописать очередь при остановке (есть и в atexit)
+"""
+import atexit
+import copy
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+from src.monitoring.metrics import REGISTRY
+
+DROPPED = REGISTRY.counter(
+    "bonus_bot_log_records_dropped_total",
+    "Записи лога, не поместившиеся в очередь",
+    labelnames=("logger",),
+)
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# атрибуты LogRecord, которые не считаются полями из extra=
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listeners: list[QueueListener] = []
+
+
+# ------------------------------------------------------------------
+# Форматирование и файлы
+# ------------------------------------------------------------------
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись: ts, level, logger, message, exc + поля из extra=."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        if record.stack_info:
+            payload["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class GzipRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler, который сжимает ротированные файлы: bot.log.1.gz, …"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.namer = self._gz_name
+        self.rotator = self._compress
+
+    @staticmethod
+    def _gz_name(name: str) -> str:
+        return f"{name}.gz"
+
+    @staticmethod
+    def _compress(source: str, dest: str):
+        with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+
+# ------------------------------------------------------------------
+# Очередь
+# ------------------------------------------------------------------
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler, который не форматирует запись и не ждёт места в очереди.
+
+    В потоке бота только склеиваем msg % args (аргументы могут измениться
+    после вызова logger.info), трейсбек форматирует уже поток записи.
+    Склеиваем в копии записи, как и QueueHandler.prepare: остальные
+    обработчики логгера видят исходную.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED.inc(logger=record.name)
+
+
+def start_queue_logging(
+    logger: logging.Logger,
+    handlers: list[logging.Handler],
+    queue_size: int = 10000,
+) -> QueueListener:
+    """Заменить обработчики логгера очередью, которую разбирает фоновый поток."""
+    records: queue.Queue = queue.Queue(maxsize=queue_size)
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    logger.handlers[:] = [DroppingQueueHandler(records)]
+    listener.start()
+    _listeners.append(listener)
+    return listener
+
+
+def stop_logging():
+    """Дописать всё, что осталось в очередях, и закрыть файлы."""
+    while _listeners:
+        listener = _listeners.pop()
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def rotating_file_handler(path: str, max_bytes: int, backup_count: int) -> GzipRotatingFileHandler:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return GzipRotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+    )
+
+
+def configure_logging(
+    level: str = "INFO",
+    path: Optional[str] = None,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    json_format: bool = False,
+    queue_size: int = 10000,
+    console: bool = True,
+) -> QueueListener:
+    """Корневой логгер: консоль и/или файл с ротацией, всё через очередь."""
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    handlers: list[logging.Handler] = []
+    if console:
+        handlers.append(logging.StreamHandler(sys.stderr))
+    if path:
+        handlers.append(rotating_file_handler(path, max_bytes, backup_count))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    root.setLevel(level.upper())
+    return start_queue_logging(root, handlers, queue_size)
+
+
+atexit.register(stop_logging)
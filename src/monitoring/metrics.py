@@ -0,0 +1,195 @@
+# src/monitoring/metrics.py
+"""
+Простейший реестр метрик процесса.
+
+Метрики живут в памяти и читаются через REGISTRY.collect()
+(для логов и тестов) или REGISTRY.render() — в текстовом формате
+Prometheus (HTTP-эндпоинт и файл для textfile collector'а, см.
+src.monitoring.server).
+"""
+import math
+import os
+from bisect import bisect_left
+from collections import defaultdict
+
+
+class Counter:
+    """Монотонный счётчик с необязательными метками."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, float] = defaultdict(float)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount: float = 1, **labels):
+        self._values[self._key(labels)] += amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list[tuple[dict, float]]:
+        return [
+            (dict(zip(self.labelnames, key)), value)
+            for key, value in self._values.items()
+        ]
+
+    def reset(self):
+        self._values.clear()
+
+
+# Границы по умолчанию: секунды, от 5 мс до 10 с
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами (le) и необязательными метками."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # по ключу меток: [счётчики по корзинам..., +Inf], сумма
+        self._values: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = entry
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def sum(self, **labels) -> float:
+        entry = self._values.get(self._key(labels))
+        return entry[1][0] if entry else 0.0
+
+    def samples(self) -> list[tuple[dict, dict]]:
+        """[(метки, {"buckets": {le: накопленное}, "sum": ..., "count": ...})]"""
+        result = []
+        for key, (counts, total) in self._values.items():
+            cumulative, running = {}, 0
+            for le, count in zip((*self.buckets, math.inf), counts):
+                running += count
+                cumulative[le] = running
+            result.append(
+                (dict(zip(self.labelnames, key)), {"buckets": cumulative, "sum": total[0], "count": running})
+            )
+        return result
+
+    def reset(self):
+        self._values.clear()
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+
+    def _get_or_create(self, cls, name: str, documentation: str, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = cls(name, documentation, **kwargs)
+            self._metrics[name] = metric
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Метрика {name} уже зарегистрирована как {metric.kind}")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames=labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames=labelnames, buckets=buckets)
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def collect(self):
+        return list(self._metrics.values())
+
+    def reset(self):
+        for metric in self._metrics.values():
+            metric.reset()
+
+    # ------------------------------------------------------------------
+    # Экспорт в текстовом формате Prometheus
+    # ------------------------------------------------------------------
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if isinstance(metric, Histogram):
+                for labels, sample in metric.samples():
+                    for le, count in sample["buckets"].items():
+                        lines.append(
+                            f"{metric.name}_bucket{_labels({**labels, 'le': _format_le(le)})} {count}"
+                        )
+                    lines.append(f"{metric.name}_sum{_labels(labels)} {_format_value(sample['sum'])}")
+                    lines.append(f"{metric.name}_count{_labels(labels)} {sample['count']}")
+            else:
+                for labels, value in metric.samples():
+                    lines.append(f"{metric.name}{_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str):
+        """
+        Записать render() в файл атомарно (tmp + rename) — так его можно
+        отдавать node_exporter'у через textfile collector.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            fh.write(self.render())
+        os.replace(tmp_path, path)
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _format_le(le: float) -> str:
+    return "+Inf" if le == math.inf else repr(float(le))
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
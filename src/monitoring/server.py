@@ -0,0 +1,53 @@
+# src/monitoring/server.py
+"""
+Отдача метрик наружу.
+
+- HTTP: GET /metrics на METRICS_HOST:METRICS_PORT (по умолчанию только
+  localhost) — в текстовом формате Prometheus.
+- Файл: каждые METRICS_DUMP_INTERVAL секунд и при остановке бота
+  REGISTRY пишется в METRICS_DUMP_PATH (подходит для textfile collector'а
+  node_exporter'а).
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from aiohttp import web
+
+from src.monitoring.metrics import REGISTRY, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def create_metrics_app(registry: MetricsRegistry = REGISTRY) -> web.Application:
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(body=registry.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    return app
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    runner = web.AppRunner(create_metrics_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("📈 Метрики: http://%s:%s/metrics", host, port)
+    return runner
+
+
+def dump_metrics(path: Optional[str]):
+    if not path:
+        return
+    try:
+        REGISTRY.dump(path)
+    except OSError as e:
+        logger.warning("⚠ Не удалось записать метрики в %s: %s", path, e)
+
+
+async def dump_metrics_periodically(path: str, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        dump_metrics(path)
@@ -0,0 +1,76 @@
+# src/services/birthdays.py
+"""
+Поиск дней рождения по индексу users.birth_mmdd.
+
+birth_mmdd = месяц * 100 + день даты рождения (23 февраля -> 223,
+29 февраля -> 229). Колонка заполняется моделью при присваивании
+birth_date (User._sync_birth_mmdd), для старых строк — ревизией 0007.
+
+«У кого день рождения сегодня / в ближайшие N дней» — это один или два
+диапазона BETWEEN по birth_mmdd (два — если период переходит через Новый
+год), т. е. range scan по индексу ix_users_birth_mmdd, а не проход по
+всем пользователям с вычислением даты в Python или extract() в SQL.
+
+Родившиеся 29 февраля в невисокосный год празднуют 28-го: диапазон,
+который заканчивается 28 февраля невисокосного года, захватывает и 229.
+"""
+import calendar
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import func, or_, select
+
+from src.models.user import User
+from src.services.holiday_calendar import occurrence
+
+
+def birth_mmdd(birth_date: Optional[date]) -> Optional[int]:
+    if birth_date is None:
+        return None
+    return birth_date.month * 100 + birth_date.day
+
+
+def next_birthday(birth_date: date, today: date) -> date:
+    """Ближайший день рождения начиная с today (29.02 -> 28.02 в невисокосный год)."""
+    day = occurrence(birth_date.month, birth_date.day, today.year)
+    if day < today:
+        day = occurrence(birth_date.month, birth_date.day, today.year + 1)
+    return day
+
+
+def mmdd_ranges(today: date, days: int = 0) -> list[tuple[int, int]]:
+    """Диапазоны birth_mmdd (включительно) для дней рождения с today по today + days."""
+    end = today + timedelta(days=days)
+    if days >= 365:
+        return [(101, 1231)]
+
+    if end.year == today.year:
+        segments = [(today, end)]
+    else:
+        segments = [(today, date(today.year, 12, 31)), (date(end.year, 1, 1), end)]
+
+    ranges = []
+    for first, last in segments:
+        low, high = birth_mmdd(first), birth_mmdd(last)
+        if high == 228 and not calendar.isleap(last.year):
+            high = 229
+        ranges.append((low, high))
+    return ranges
+
+
+def birthday_condition(today: date, days: int = 0):
+    """WHERE для пользователей, чей день рождения попадает в [today; today + days]."""
+    return or_(*(User.birth_mmdd.between(low, high) for low, high in mmdd_ranges(today, days)))
+
+
+def birthdays_count(today: date, days: int = 0):
+    return select(func.count(User.id)).where(birthday_condition(today, days))
+
+
+def upcoming_birthdays(today: date, days: int = 7, limit: int = 50):
+    """Пользователи с днём рождения в ближайшие days дней, по порядку дат."""
+    # после перехода через Новый год январские даты идут после декабрьских
+    stmt = select(User).where(birthday_condition(today, days))
+    if (today + timedelta(days=days)).year != today.year:
+        stmt = stmt.order_by(User.birth_mmdd < birth_mmdd(today))
+    return stmt.order_by(User.birth_mmdd, User.id).limit(limit)
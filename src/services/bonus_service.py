@@ -1,81 +1,102 @@
 # src/services/bonus_service.py
 
+from contextlib import asynccontextmanager
+from typing import Optional
+
 from sqlalchemy import select
-from src.database import AsyncSessionLocal
-from src.models.user import User
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import AsyncSessionLocal, queries
+from src.database.retry import run_in_transaction
 from src.models.transaction import Transaction
 
 
 class BonusService:
+    """
+    Операции с обычным балансом.
+
+    В хендлерах создаётся с сессией апдейта: BonusService(session).
+    Без сессии (скрипты, фоновые задачи) открывает собственную.
+    """
+
+    def __init__(self, session: Optional[AsyncSession] = None):
+        self.session = session
+
+    @asynccontextmanager
+    async def _session_scope(self):
+        if self.session is not None:
+            yield self.session
+            return
+        async with AsyncSessionLocal() as session:
+            yield session
 
     # =========================
     #   Начислить бонусы
     # =========================
-    @staticmethod
-    async def add_bonus(user_id: int, amount: int, description: str = "Admin add"):
+    async def add_bonus(self, user_id: int, amount: int, description: str = "Admin add"):
         if amount <= 0:
             raise ValueError("Amount must be positive")
 
-        async with AsyncSessionLocal() as session:
-            user = (await session.execute(
-                select(User).where(User.id == user_id)
-            )).scalar_one_or_none()
-
-            if not user:
-                raise ValueError("User not found")
+        async with self._session_scope() as session:
+            async def _add():
+                user = (await session.execute(
+                    queries.user_by_id(user_id)
+                )).scalar_one_or_none()
 
-            user.balance += amount
+                if not user:
+                    raise ValueError("User not found")
 
-            tr = Transaction(
-                user_id=user.id,
-                amount=amount,
-                operation_type="add",
-                description=description
-            )
-            session.add(tr)
+                user.balance += amount
 
-            await session.commit()
+                tr = Transaction(
+                    user_id=user.id,
+                    amount=amount,
+                    operation_type="add",
+                    description=description
+                )
+                session.add(tr)
+                return user
 
+            user = await run_in_transaction(session, _add, operation="bonus_add")
             return user.balance
 
     # =========================
     #   Списать бонусы
     # =========================
-    @staticmethod
-    async def subtract_bonus(user_id: int, amount: int, description: str = "Admin subtract"):
+    async def subtract_bonus(self, user_id: int, amount: int, description: str = "Admin subtract"):
         if amount <= 0:
             raise ValueError("Amount must be positive")
 
-        async with AsyncSessionLocal() as session:
-            user = (await session.execute(
-                select(User).where(User.id == user_id)
-            )).scalar_one_or_none()
-
-            if not user:
-                raise ValueError("User not found")
-
-            user.balance -= amount
-            if user.balance < 0:
-                user.balance = 0
-
-            tr = Transaction(
-                user_id=user.id,
-                amount=-amount,
-                operation_type="subtract",
-                description=description
-            )
-            session.add(tr)
-
-            await session.commit()
-
+        async with self._session_scope() as session:
+            async def _subtract():
+                user = (await session.execute(
+                    queries.user_by_id(user_id)
+                )).scalar_one_or_none()
+
+                if not user:
+                    raise ValueError("User not found")
+
+                user.balance -= amount
+                if user.balance < 0:
+                    user.balance = 0
+
+                tr = Transaction(
+                    user_id=user.id,
+                    amount=-amount,
+                    operation_type="subtract",
+                    description=description
+                )
+                session.add(tr)
+                return user
+
+            user = await run_in_transaction(session, _subtract, operation="bonus_subtract")
             return user.balance
 
     # =========================
     #   Получить историю
     # =========================
-    @staticmethod
-    async def get_user_transactions(user_id: int, limit=20):
-        async with AsyncSessionLocal() as session:
+    async def get_user_transactions(self, user_id: int, limit=20):
+        async with self._session_scope() as session:
             result = await session.execute(
                 select(Transaction)
                 .where(Transaction.user_id == user_id)
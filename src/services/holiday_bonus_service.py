@@ -3,16 +3,55 @@
 from __future__ import annotations
 
 from datetime import datetime, date, timedelta
-from typing import Optional, List, Dict
+from collections import defaultdict
+from typing import Optional, List, Dict, Iterable, NamedTuple
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import insert, select
 
-from src.database import AsyncSessionLocal
+from src.database import AsyncSessionLocal, queries
+from src.database.locks import award_locks
+from src.database.retry import run_in_transaction
 from src.models.user import User
 from src.models.holiday_bonus import HolidayBonus, UserHolidayBonus
 from src.models.transaction import Transaction
+from src.services.birthdays import next_birthday
+from src.services.holiday_calendar import AwardWindow, holiday_calendar
+
+# Бонус ко дню рождения
+BIRTHDAY_BONUS_AMOUNT = 500
+BIRTHDAY_BONUS_DAYS_VALID = 7
+BIRTHDAY_BONUS_DESCRIPTION = "Праздничный бонус ко дню рождения"
+HOLIDAY_BONUS_DESCRIPTION_PREFIX = "Праздничный бонус: "
+
+
+def burn_description(holiday_name: Optional[str]) -> str:
+    return f"Сгорание праздничного бонуса ({holiday_name or 'День рождения'})"
+
+
+def revoke_description(holiday_name: Optional[str]) -> str:
+    return f"Отмена праздничного бонуса ({holiday_name or 'Праздник'})"
+
+
+class NewAward(NamedTuple):
+    """Бонус, который решено начислить: holiday_id=None — день рождения."""
+    holiday_id: Optional[int]
+    amount: int
+    expires_at: datetime
+    description: str
+
+
+class AwardHistory:
+    """Уже выданные праздничные бонусы пользователя: holiday_id (None — ДР) -> даты выдачи."""
+
+    def __init__(self, rows: Iterable[tuple[Optional[int], datetime]]):
+        self._created: dict[Optional[int], list[datetime]] = defaultdict(list)
+        for holiday_id, created_at in rows:
+            if created_at is not None:
+                self._created[holiday_id].append(created_at)
+
+    def has(self, holiday_id: Optional[int], since: datetime, until: datetime) -> bool:
+        return any(since <= created_at <= until for created_at in self._created.get(holiday_id, ()))
 
 
 class HolidayBonusService:
@@ -80,13 +119,14 @@ class HolidayBonusService:
                 )
                 session.add(holiday)
 
-            await session.commit()
-
         if self.session is None:
             async with AsyncSessionLocal() as s:
-                await _impl(s)
+                await run_in_transaction(s, lambda: _impl(s), operation="default_holidays")
         else:
-            await _impl(self.session)
+            await run_in_transaction(
+                self.session, lambda: _impl(self.session), operation="default_holidays"
+            )
+        holiday_calendar.invalidate()
 
     # ------------------------------------------------------------------
     # Основной метод — вызывать для конкретного пользователя
@@ -101,7 +141,8 @@ class HolidayBonusService:
            и в этом году ещё не начисляли.
         3) Начисляет бонусы по праздникам (holidays), если
            сегодня попадаем в окно:
-           [date - days_before; date + days_valid].
+           [date - days_before; date + days_valid]
+           (см. src.services.holiday_calendar).
 
         Возвращает список активных праздничных бонусов (для отображения).
         """
@@ -113,39 +154,42 @@ class HolidayBonusService:
 
         now = datetime.now()
 
-        user = await self.session.get(User, user_id)
-        if not user:
-            return []
+        async def _accrue() -> bool:
+            user = await self.session.get(User, user_id)
+            if not user:
+                return False
 
-        # 1. Сжигаем просроченные
-        await self._expire_old_bonuses(user, now)
+            # 1. Сжигаем просроченные
+            await self._expire_old_bonuses(user, now)
 
-        # На дату регистрации выдаём только приветственные 200 бонусов.
-        # Праздничные начисления (ДР/календарь) начинаем проверять со следующего дня.
-        if user.created_at and user.created_at.date() == now.date():
-            await self.session.commit()
-            return []
+            # На дату регистрации выдаём только приветственные 200 бонусов.
+            # Праздничные начисления (ДР/календарь) начинаем проверять со следующего дня.
+            if user.created_at and user.created_at.date() == now.date():
+                return False
+
+            # Что уже выдано за этот год и за действующие окна праздников —
+            # одним запросом, дальше решаем в памяти
+            windows = await holiday_calendar.awardable(self.session, now.date())
+            awarded = await self._award_history(user.id, now, windows)
 
-        # 2. Бонус ко дню рождения
-        await self._check_birthday_bonus(user, now)
+            # 2. Бонус ко дню рождения, 3. календарные праздники из таблицы holidays
+            new_awards = await self._new_awards(user, now, windows, awarded)
 
-        # 3. Календарные праздники из таблицы holidays
-        await self._check_calendar_holidays(user, now)
+            # то же могли начислять ночной прогон или ручная выдача — под
+            # блокировкой праздников (src.database.locks) перепроверяем
+            if new_awards and await award_locks(self.session, [a.holiday_id for a in new_awards]):
+                awarded = await self._award_history(user.id, now, windows)
+                new_awards = await self._new_awards(user, now, windows, awarded)
 
-        await self.session.commit()
+            # бонусы и операции — двумя пачечными INSERT, сколько бы праздников ни было
+            await self._write_awards(user, new_awards)
+            return True
+
+        if not await run_in_transaction(self.session, _accrue, operation="holiday_accrual"):
+            return []
 
         # Собираем активные праздничные бонусы
-        stmt = (
-            select(UserHolidayBonus)
-            .options(selectinload(UserHolidayBonus.holiday))
-            .where(
-                UserHolidayBonus.user_id == user.id,
-                UserHolidayBonus.is_active == True,
-                UserHolidayBonus.expires_at != None,
-                UserHolidayBonus.expires_at > now,
-            )
-        )
-        res = await self.session.execute(stmt)
+        res = await self.session.execute(queries.active_user_holiday_bonuses(user_id, now))
         bonuses = res.scalars().all()
 
         return [
@@ -175,17 +219,7 @@ class HolidayBonusService:
 
         now = datetime.now()
 
-        stmt = (
-            select(UserHolidayBonus)
-            .where(
-                UserHolidayBonus.user_id == user_id,
-                UserHolidayBonus.is_active == True,
-                UserHolidayBonus.expires_at != None,
-                UserHolidayBonus.expires_at > now,
-            )
-            .order_by(UserHolidayBonus.expires_at)
-        )
-        res = await self.session.execute(stmt)
+        res = await self.session.execute(queries.spendable_user_holiday_bonuses(user_id, now))
         bonuses = res.scalars().all()
 
         remaining = amount
@@ -211,77 +245,12 @@ class HolidayBonusService:
 
         return used
 
-    async def expire_holiday_bonuses_for_holiday(self, holiday_id: int) -> int:
-        """
-        Списывает активные бонусы, выданные за конкретный праздник.
-        Возвращает количество обработанных бонусов.
-        """
-        if self.session is None:
-            raise RuntimeError(
-                "HolidayBonusService(expire_holiday_bonuses_for_holiday) требует AsyncSession. "
-                "Создавай через HolidayBonusService(session)."
-            )
-
-        now = datetime.now()
-
-        stmt = (
-            select(UserHolidayBonus)
-            .options(selectinload(UserHolidayBonus.holiday))
-            .where(
-                UserHolidayBonus.holiday_id == holiday_id,
-                UserHolidayBonus.is_active == True,
-                UserHolidayBonus.expires_at != None,
-                UserHolidayBonus.expires_at > now,
-            )
-        )
-        res = await self.session.execute(stmt)
-        bonuses = res.scalars().all()
-
-        processed = 0
-
-        for bonus in bonuses:
-            user = await self.session.get(User, bonus.user_id)
-            if not user:
-                bonus.is_active = False
-                processed += 1
-                continue
-
-            to_sub = min(user.holiday_balance, bonus.amount)
-            if to_sub > 0:
-                user.holiday_balance -= to_sub
-                self.session.add(
-                    Transaction(
-                        user_id=user.id,
-                        amount=-to_sub,
-                        operation_type="subtract",
-                        description=(
-                            f"Отмена праздничного бонуса "
-                            f"({bonus.holiday.name if bonus.holiday else 'Праздник'})"
-                        ),
-                    )
-                )
-
-            bonus.is_active = False
-            processed += 1
-
-        return processed
-
     # ------------------------------------------------------------------
     # Внутренние методы
     # ------------------------------------------------------------------
     async def _expire_old_bonuses(self, user: User, now: datetime):
         """Сжигаем просроченные праздничные бонусы и уменьшаем баланс."""
-        stmt = (
-            select(UserHolidayBonus)
-            .options(selectinload(UserHolidayBonus.holiday))
-            .where(
-                UserHolidayBonus.user_id == user.id,
-                UserHolidayBonus.is_active == True,
-                UserHolidayBonus.expires_at != None,
-                UserHolidayBonus.expires_at <= now,
-            )
-        )
-        res = await self.session.execute(stmt)
+        res = await self.session.execute(queries.expired_user_holiday_bonuses(user.id, now))
         expired = res.scalars().all()
 
         for b in expired:
@@ -294,126 +263,108 @@ class HolidayBonusService:
                         user_id=user.id,
                         amount=-to_sub,
                         operation_type="subtract",
-                        description=(
-                            f"Сгорание праздничного бонуса "
-                            f"({b.holiday.name if b.holiday else 'День рождения'})"
-                        ),
+                        description=burn_description(b.holiday.name if b.holiday else None),
                     )
                 )
 
             b.is_active = False
 
-    async def _check_birthday_bonus(self, user: User, now: datetime):
+    async def _award_history(
+        self, user_id: int, now: datetime, windows: list[AwardWindow]
+    ) -> AwardHistory:
+        since = min([datetime(now.year, 1, 1)] + [w.awarded_since for w in windows])
+        until = max([datetime(now.year, 12, 31, 23, 59, 59)] + [w.awarded_until for w in windows])
+        res = await self.session.execute(queries.user_awards_between(user_id, since, until))
+        return AwardHistory(res.all())
+
+    async def _new_awards(
+        self, user: User, now: datetime, windows: list[AwardWindow], awarded: AwardHistory
+    ) -> list[NewAward]:
+        new_awards: list[NewAward] = []
+        await self._check_birthday_bonus(user, now, awarded, new_awards)
+        await self._check_calendar_holidays(user, now, windows, awarded, new_awards)
+        return new_awards
+
+    async def _check_birthday_bonus(
+        self, user: User, now: datetime, awarded: AwardHistory, new_awards: list[NewAward]
+    ):
         """Бонус ко дню рождения: +500, действует 7 дней."""
         if not user.birth_date:
             return
 
         today = now.date()
-        bd_this_year = date(today.year, user.birth_date.month, user.birth_date.day)
 
-        # Бонус даём в сам день рождения
-        if today != bd_this_year:
+        # Бонус даём в сам день рождения (29 февраля в невисокосный год — 28-го)
+        if next_birthday(user.birth_date, today) != today:
             return
 
         year_start = datetime(today.year, 1, 1)
         year_end = datetime(today.year, 12, 31, 23, 59, 59)
 
         # Проверяем, не выдавали ли уже в этом году
-        stmt = select(UserHolidayBonus).where(
-            UserHolidayBonus.user_id == user.id,
-            UserHolidayBonus.holiday_id == None,  # для ДР holiday_id = NULL
-            UserHolidayBonus.created_at >= year_start,
-            UserHolidayBonus.created_at <= year_end,
-        )
-        res = await self.session.execute(stmt)
-        if res.scalar_one_or_none():
+        if awarded.has(None, year_start, year_end):
             return  # уже начисляли
 
-        amount = 500
-        expires_at = now + timedelta(days=7)
-
-        user.holiday_balance += amount
-
-        bonus = UserHolidayBonus(
-            user_id=user.id,
-            holiday_id=None,
-            amount=amount,
-            expires_at=expires_at,
-            is_active=True,
-        )
-        self.session.add(bonus)
-
-        self.session.add(
-            Transaction(
-                user_id=user.id,
-                amount=amount,
-                operation_type="add",
-                description="Праздничный бонус ко дню рождения",
+        new_awards.append(
+            NewAward(
+                holiday_id=None,
+                amount=BIRTHDAY_BONUS_AMOUNT,
+                expires_at=now + timedelta(days=BIRTHDAY_BONUS_DAYS_VALID),
+                description=BIRTHDAY_BONUS_DESCRIPTION,
             )
         )
 
-    async def _check_calendar_holidays(self, user: User, now: datetime):
-        """Проверка и начисление по праздникам из holidays."""
-        today = now.date()
-
-        stmt = select(HolidayBonus).where(HolidayBonus.is_active == True)
-        res = await self.session.execute(stmt)
-        holidays = res.scalars().all()
-
-        for holiday in holidays:
-            if holiday.date is None:
-                # этот праздник не участвует в автоначислении
-                continue
-
-            hdate = holiday.get_date_for_year(today.year)
-            if hdate is None:
-                continue
-
-            days_before = holiday.days_before or 0
-            days_valid = holiday.days_valid or 0
-
-            start_give = hdate - timedelta(days=days_before)
-            expire_date = hdate + timedelta(days=days_valid)
-
-            # если сегодня не в окне начисления — пропускаем
-            if not (start_give <= today <= expire_date):
-                continue
-
-            # уже начисляли в этом году этот конкретный праздник?
-            year_start = datetime(today.year, 1, 1)
-            year_end = datetime(today.year, 12, 31, 23, 59, 59)
+    async def _check_calendar_holidays(
+        self,
+        user: User,
+        now: datetime,
+        windows: list[AwardWindow],
+        awarded: AwardHistory,
+        new_awards: list[NewAward],
+    ):
+        """Начисление по праздникам из holidays (окна — HolidayCalendar)."""
+        for window in windows:
+            # уже начисляли за это окно (праздник этого года)?
+            if awarded.has(window.holiday_id, window.awarded_since, window.awarded_until):
+                continue  # уже есть
 
-            stmt = (
-                select(UserHolidayBonus.id)
-                .where(
-                UserHolidayBonus.user_id == user.id,
-                UserHolidayBonus.holiday_id == holiday.id,
-                UserHolidayBonus.created_at >= year_start,
-                UserHolidayBonus.created_at <= year_end,
+            new_awards.append(
+                NewAward(
+                    holiday_id=window.holiday_id,
+                    amount=window.amount,
+                    expires_at=window.expires_at,
+                    description=f"{HOLIDAY_BONUS_DESCRIPTION_PREFIX}{window.name}",
                 )
-                .limit(1)
             )
-            res = await self.session.execute(stmt)
-            if res.scalar_one_or_none():
-                continue  # уже есть
 
-            amount = holiday.amount
-            user.holiday_balance += amount
+    async def _write_awards(self, user: User, new_awards: list[NewAward]):
+        if not new_awards:
+            return
 
-            bonus = UserHolidayBonus(
-                user_id=user.id,
-                holiday_id=holiday.id,
-                amount=amount,
-                expires_at=datetime.combine(expire_date, datetime.min.time()),
-                is_active=True,
-            )
-            self.session.add(bonus)
-
-            self.session.add(
-                Transaction(
-                    user_id=user.id,
-                    amount=amount,
-                    operation_type="add",
-                    description=f"Праздничный бонус: {holiday.name}",
-                )
-            )
+        user.holiday_balance += sum(award.amount for award in new_awards)
+        # render_nulls: строки ДР (holiday_id=None) идут в тот же executemany
+        await self.session.execute(
+            insert(UserHolidayBonus).execution_options(render_nulls=True),
+            [
+                {
+                    "user_id": user.id,
+                    "holiday_id": award.holiday_id,
+                    "amount": award.amount,
+                    "expires_at": award.expires_at,
+                    "is_active": True,
+                }
+                for award in new_awards
+            ],
+        )
+        await self.session.execute(
+            insert(Transaction),
+            [
+                {
+                    "user_id": user.id,
+                    "amount": award.amount,
+                    "operation_type": "add",
+                    "description": award.description,
+                }
+                for award in new_awards
+            ],
+        )
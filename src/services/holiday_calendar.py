@@ -0,0 +1,173 @@
+# src/services/holiday_calendar.py
+"""
+Календарь праздников в памяти процесса: «за какие праздники сегодня
+положен бонус».
+
+Раньше на каждый просмотр профиля выбирались все активные праздники и
+для каждого заново считалось окно [date - days_before; date + days_valid]
+— только для текущего года, поэтому окно через Новый год (праздник
+1 января, days_before=3) 29–31 декабря не находилось.
+
+Здесь праздники загружаются один раз (HOLIDAY_CALENDAR_TTL) в виде
+лёгких снимков, а окна начисления строятся на год вперёд и назад:
+праздник года Y даёт окно, даже если оно начинается в декабре Y-1.
+На каждый год — список окон, отсортированный по началу; поиск на дату —
+bisect по началу и короткий проход назад, не дальше самого длинного окна.
+
+Праздник 29 февраля в невисокосный год отмечается 28-го.
+
+Инвалидация — holiday_calendar.invalidate() после создания/удаления
+праздника (src/handlers/admin/holidays.py); правки в обход бота
+подхватываются по TTL.
+"""
+import calendar
+import time
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.settings import settings
+from src.database import queries
+
+# created_at бонуса пишется по часам БД (на SQLite — UTC), поэтому
+# «уже начисляли за этот праздник» ищем в окне с запасом по краям
+AWARD_LOOKUP_SLACK = timedelta(days=1)
+
+
+class HolidaySpec(NamedTuple):
+    """Снимок строки holidays — без ORM-состояния, можно держать в памяти."""
+    id: int
+    name: str
+    month: int
+    day: int
+    amount: int
+    days_before: int
+    days_valid: int
+
+
+class AwardWindow(NamedTuple):
+    start: date  # первый день начисления
+    end: date  # последний день; бонус сгорает в начале этого дня
+    holiday_id: int
+    name: str
+    amount: int
+
+    @property
+    def expires_at(self) -> datetime:
+        return datetime.combine(self.end, datetime.min.time())
+
+    @property
+    def awarded_since(self) -> datetime:
+        """Начало периода, в котором ищем уже выданный бонус за это окно."""
+        return datetime.combine(self.start, datetime.min.time()) - AWARD_LOOKUP_SLACK
+
+    @property
+    def awarded_until(self) -> datetime:
+        return datetime.combine(self.end + timedelta(days=1), datetime.min.time()) + AWARD_LOOKUP_SLACK
+
+
+def occurrence(month: int, day: int, year: int) -> date:
+    if month == 2 and day == 29 and not calendar.isleap(year):
+        return date(year, 2, 28)
+    return date(year, month, day)
+
+
+class _YearIndex(NamedTuple):
+    starts: list[date]
+    windows: list[AwardWindow]
+    max_length: timedelta
+
+
+class HolidayCalendar:
+    def __init__(self, ttl: float = 3600.0):
+        self.ttl = ttl
+        self._specs: Optional[list[HolidaySpec]] = None
+        self._loaded_at = 0.0
+        self._years: dict[int, _YearIndex] = {}
+        # растёт на каждой инвалидации: снимок, загруженный до неё, не сохраняем
+        self._generation = 0
+
+    # --- загрузка -----------------------------------------------------
+    def invalidate(self):
+        self._generation += 1
+        self._specs = None
+        self._years.clear()
+
+    @property
+    def loaded(self) -> bool:
+        return self._specs is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def load(self, holidays) -> "HolidayCalendar":
+        """Построить календарь по строкам HolidayBonus (только активные, с датой)."""
+        self._specs = [
+            HolidaySpec(
+                id=h.id,
+                name=h.name,
+                month=h.date.month,
+                day=h.date.day,
+                amount=h.amount,
+                days_before=h.days_before or 0,
+                days_valid=h.days_valid or 0,
+            )
+            for h in holidays
+            if h.is_active and h.date is not None
+        ]
+        self._loaded_at = time.monotonic()
+        self._years.clear()
+        return self
+
+    async def ensure_loaded(self, session: AsyncSession) -> "HolidayCalendar":
+        if not self.loaded:
+            generation = self._generation
+            holidays = (await session.execute(queries.active_holidays())).scalars().all()
+            if generation == self._generation:
+                self.load(holidays)
+            else:
+                # пока читали, праздники поменялись — ответим по свежему снимку,
+                # но в процессе его не оставим
+                return HolidayCalendar(self.ttl).load(holidays)
+        return self
+
+    # --- поиск --------------------------------------------------------
+    def _year_index(self, year: int) -> _YearIndex:
+        index = self._years.get(year)
+        if index is None:
+            windows = []
+            for spec in self._specs or ():
+                # окно праздника следующего года может начаться в этом
+                for occurrence_year in (year - 1, year, year + 1):
+                    day = occurrence(spec.month, spec.day, occurrence_year)
+                    start = day - timedelta(days=spec.days_before)
+                    end = day + timedelta(days=spec.days_valid)
+                    if start.year <= year <= end.year:
+                        windows.append(AwardWindow(start, end, spec.id, spec.name, spec.amount))
+            windows.sort()
+            index = _YearIndex(
+                starts=[w.start for w in windows],
+                windows=windows,
+                max_length=max((w.end - w.start for w in windows), default=timedelta(0)),
+            )
+            self._years[year] = index
+        return index
+
+    def windows_on(self, today: date) -> list[AwardWindow]:
+        """Окна начисления, в которые попадает today, в порядке начала."""
+        index = self._year_index(today.year)
+        earliest = today - index.max_length
+        found = []
+        position = bisect_right(index.starts, today) - 1
+        while position >= 0 and index.starts[position] >= earliest:
+            window = index.windows[position]
+            if window.end >= today:
+                found.append(window)
+            position -= 1
+        found.reverse()
+        return found
+
+    async def awardable(self, session: AsyncSession, today: date) -> list[AwardWindow]:
+        return (await self.ensure_loaded(session)).windows_on(today)
+
+
+holiday_calendar = HolidayCalendar(ttl=settings.HOLIDAY_CALENDAR_TTL)
@@ -1,15 +1,25 @@
 # src/services/user_service.py
 
 from datetime import datetime
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
+from src.config.settings import settings
+from src.database import queries
+from src.database.identity import identity_cache
 from src.models.user import User
+from src.models.read_models import UserCard, UserListRow
 from src.models.holiday_bonus import UserHolidayBonus
 from src.services.holiday_bonus_service import HolidayBonusService
 
 
+def lazy_accrual() -> bool:
+    """Начислять праздничные бонусы при открытии экрана (ACCRUAL_MODE=lazy)."""
+    return settings.ACCRUAL_MODE == "lazy"
+
+
 class UserService:
     """
     Универсальный сервис для работы с пользователями.
@@ -23,17 +33,17 @@ class UserService:
     # ============================================================
 
     async def get_user_by_id(self, user_id: int):
-        stmt = select(User).where(User.id == user_id)
+        stmt = queries.user_by_id(user_id)
         res = await self.session.execute(stmt)
         return res.scalar_one_or_none()
 
     async def get_user_by_tg_id(self, telegram_id: int):
-        stmt = select(User).where(User.telegram_id == telegram_id)
+        stmt = queries.user_by_telegram_id(telegram_id)
         res = await self.session.execute(stmt)
         return res.scalar_one_or_none()
 
     async def get_user_by_phone(self, phone: str):
-        stmt = select(User).where(User.phone == phone)
+        stmt = queries.user_by_phone(phone)
         res = await self.session.execute(stmt)
         return res.scalar_one_or_none()
 
@@ -45,6 +55,22 @@ class UserService:
     async def get_user_by_telegram_id(self, tg_id: int):
         return await self.get_user_by_tg_id(tg_id)
 
+    # ============================================================
+    #                 READ-МОДЕЛИ (только для показа)
+    # ============================================================
+
+    async def get_user_card(self, user_id: int) -> Optional[UserCard]:
+        row = (await self.session.execute(queries.user_card_by_id(user_id))).first()
+        return UserCard._make(row) if row else None
+
+    async def get_user_card_by_tg_id(self, telegram_id: int) -> Optional[UserCard]:
+        row = (await self.session.execute(queries.user_card_by_telegram_id(telegram_id))).first()
+        return UserCard._make(row) if row else None
+
+    async def get_user_list_page(self, offset: int, limit: int) -> list[UserListRow]:
+        res = await self.session.execute(queries.user_list_page(offset, limit))
+        return [UserListRow._make(row) for row in res]
+
     # ============================================================
     #                         РЕГИСТРАЦИЯ / СОЗДАНИЕ
     # ============================================================
@@ -62,7 +88,7 @@ class UserService:
         Возвращает пользователя или создаёт нового.
         """
 
-        stmt = select(User).where(User.telegram_id == tg_id)
+        stmt = queries.user_by_telegram_id(tg_id)
         res = await self.session.execute(stmt)
         user = res.scalar_one_or_none()
 
@@ -157,6 +183,8 @@ class UserService:
 
         await self.session.delete(user)
         await self.session.commit()
+        # after_commit уже сбросил запись; явно — на случай сессии не из AsyncSessionLocal
+        identity_cache.invalidate(user.telegram_id)
         return True
 
     # ============================================================
@@ -165,6 +193,10 @@ class UserService:
 
     async def check_and_award_holiday_bonuses(self, user_id: int):
         """Проверка начисления ДР и праздничных бонусов"""
+        if not lazy_accrual():
+            # начисляет ночная задача (src.jobs.accrual), сжигает src.jobs.expiry —
+            # экран только читает
+            return None
         holiday_service = HolidayBonusService(self.session)
         return await holiday_service.check_and_award_user_bonuses(user_id)
 
@@ -0,0 +1,245 @@
+# src/utils/dispatch_index.py
+"""
+Индекс диспетчеризации: кнопки по точному тексту, колбэки по
+callback_data / префиксу, команды — без перебора magic-фильтров.
+
+aiogram проверяет хендлеры по очереди: роутер за роутером, фильтр за
+фильтром. Здесь ключ апдейта вычисляется один раз (dict для текста и
+точного callback_data, префиксное дерево для «open_user:…»), а дальше:
+
+- TextIs / DataIs / DataStartsWith — фильтры хендлеров, которые вместо
+  вычисления F.text == … просто смотрят, есть ли их ключ среди ключей
+  апдейта (data["route_keys"]);
+- DispatchIndex.install(dp) вешает на каждый роутер фильтр уровня
+  роутера: если ни один его хендлер не может подойти ни по ключу, ни по
+  FSM-состоянию, роутер пропускается целиком, не трогая его хендлеры.
+
+Роутер, у которого есть хендлер без «индексируемого» фильтра (например,
+F.photo | F.document), проверяется как обычно. Порядок хендлеров и
+семантика aiogram не меняются: индекс только отсекает то, что заведомо
+не подойдёт.
+"""
+from abc import abstractmethod
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+
+from aiogram import Router
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.filters import BaseFilter, Command
+from aiogram.fsm.state import State
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+ROUTE_KEYS = "route_keys"
+
+NO_KEYS: FrozenSet[str] = frozenset()
+
+
+# ------------------------------------------------------------------
+# Ключи
+# ------------------------------------------------------------------
+def text_key(text: str) -> str:
+    return f"text:{text}"
+
+
+def command_key(command: str) -> str:
+    return f"cmd:{command.lower()}"
+
+
+def data_key(data: str) -> str:
+    return f"data:{data}"
+
+
+def prefix_key(prefix: str) -> str:
+    return f"prefix:{prefix}"
+
+
+class PrefixTrie:
+    """Префиксное дерево: какие из зарегистрированных префиксов есть у строки."""
+
+    _END = object()
+
+    def __init__(self):
+        self._root: dict = {}
+
+    def add(self, prefix: str):
+        node = self._root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[self._END] = prefix
+
+    def matches(self, value: str) -> list[str]:
+        found = []
+        node = self._root
+        for char in value:
+            node = node.get(char)
+            if node is None:
+                break
+            if self._END in node:
+                found.append(node[self._END])
+        return found
+
+
+# ------------------------------------------------------------------
+# Фильтры хендлеров
+# ------------------------------------------------------------------
+class IndexedFilter(BaseFilter):
+    """
+    Фильтр по ключам апдейта. BaseFilter — уже abc.ABC, так что
+    подкласс без fallback не создастся.
+    """
+
+    keys: FrozenSet[str] = NO_KEYS
+
+    async def __call__(self, event: TelegramObject, **data: Any) -> bool:
+        route_keys = data.get(ROUTE_KEYS)
+        if route_keys is None:
+            # индекс не установлен (тесты, отдельный Dispatcher) — честная проверка
+            return self.fallback(event)
+        return not self.keys.isdisjoint(route_keys)
+
+    @abstractmethod
+    def fallback(self, event: TelegramObject) -> bool:
+        """Проверка без индекса — та же семантика, что у ключей."""
+
+
+class TextIs(IndexedFilter):
+    """Точный текст сообщения (кнопка reply-клавиатуры): аналог F.text == …"""
+
+    def __init__(self, *texts: str):
+        self.texts = texts
+        self.keys = frozenset(text_key(text) for text in texts)
+
+    def fallback(self, event: Message) -> bool:
+        return getattr(event, "text", None) in self.texts
+
+
+class DataIs(IndexedFilter):
+    """Точный callback_data: аналог F.data == …"""
+
+    def __init__(self, *values: str):
+        self.values = values
+        self.keys = frozenset(data_key(value) for value in values)
+
+    def fallback(self, event: CallbackQuery) -> bool:
+        return getattr(event, "data", None) in self.values
+
+
+class DataStartsWith(IndexedFilter):
+    """Префикс callback_data: аналог F.data.startswith(…)"""
+
+    def __init__(self, *prefixes: str):
+        self.prefixes = prefixes
+        self.keys = frozenset(prefix_key(prefix) for prefix in prefixes)
+
+    def fallback(self, event: CallbackQuery) -> bool:
+        return (getattr(event, "data", None) or "").startswith(self.prefixes)
+
+
+# ------------------------------------------------------------------
+# Индекс
+# ------------------------------------------------------------------
+def _selectors(handler: HandlerObject) -> Optional[tuple[FrozenSet[str], FrozenSet[str]]]:
+    """
+    (ключи, FSM-состояния), без которых хендлер точно не сработает,
+    или None, если по фильтрам этого не понять.
+    """
+    for filter_object in handler.filters or ():
+        callback = filter_object.callback
+        if isinstance(callback, IndexedFilter):
+            return callback.keys, NO_KEYS
+        if isinstance(callback, Command) and callback.prefix == "/" and all(
+            isinstance(command, str) for command in callback.commands
+        ):
+            return frozenset(command_key(f"/{command}") for command in callback.commands), NO_KEYS
+        if isinstance(callback, State) and callback.state not in (None, "*"):
+            return NO_KEYS, frozenset({callback.state})
+    return None
+
+
+class RouterGate(BaseFilter):
+    """Фильтр уровня роутера: пропустить роутер, если его хендлерам нечего ловить."""
+
+    def __init__(self, keys: FrozenSet[str], states: FrozenSet[str]):
+        self.keys = keys
+        self.states = states
+
+    async def __call__(self, event: TelegramObject, **data: Any) -> bool:
+        route_keys = data.get(ROUTE_KEYS)
+        if route_keys is None:
+            return True
+        return not self.keys.isdisjoint(route_keys) or data.get("raw_state") in self.states
+
+
+class DispatchIndex:
+    def __init__(self):
+        self.texts: set[str] = set()
+        self.data: set[str] = set()
+        self.prefixes = PrefixTrie()
+        self.gated_routers = 0
+
+    # --- сборка -------------------------------------------------------
+    def install(self, root: Router, event_types: Iterable[str] = ("message", "callback_query")):
+        """Собрать индекс по уже подключённым роутерам и повесить RouterGate."""
+        for router in root.chain_tail:
+            for event_type in event_types:
+                observer = router.observers[event_type]
+                if not observer.handlers:
+                    continue
+                self._register(observer.handlers)
+
+                gate = self._gate_for(observer.handlers)
+                already = any(isinstance(f.callback, RouterGate) for f in observer._handler.filters or ())
+                if gate is not None and not already:
+                    observer.filter(gate)
+                    self.gated_routers += 1
+        return self
+
+    def _register(self, handlers: list[HandlerObject]):
+        for handler in handlers:
+            for filter_object in handler.filters or ():
+                callback = filter_object.callback
+                if isinstance(callback, TextIs):
+                    self.texts.update(callback.texts)
+                elif isinstance(callback, DataIs):
+                    self.data.update(callback.values)
+                elif isinstance(callback, DataStartsWith):
+                    for prefix in callback.prefixes:
+                        self.prefixes.add(prefix)
+
+    @staticmethod
+    def _gate_for(handlers: list[HandlerObject]) -> Optional[RouterGate]:
+        keys, states = set(), set()
+        for handler in handlers:
+            selectors = _selectors(handler)
+            if selectors is None:
+                return None
+            keys.update(selectors[0])
+            states.update(selectors[1])
+        return RouterGate(frozenset(keys), frozenset(states))
+
+    # --- поиск --------------------------------------------------------
+    def route_keys(self, event: TelegramObject) -> FrozenSet[str]:
+        if isinstance(event, Message):
+            keys = []
+            text = event.text
+            if text and text in self.texts:
+                keys.append(text_key(text))
+            # Command смотрит и в подпись к медиа
+            command_source = text or event.caption
+            if command_source and command_source.startswith("/"):
+                command = command_source.split(maxsplit=1)[0].split("@", 1)[0]
+                keys.append(command_key(command))
+            return frozenset(keys) if keys else NO_KEYS
+
+        if isinstance(event, CallbackQuery):
+            value = event.data
+            if not value:
+                return NO_KEYS
+            keys = [prefix_key(prefix) for prefix in self.prefixes.matches(value)]
+            if value in self.data:
+                keys.append(data_key(value))
+            return frozenset(keys)
+
+        return NO_KEYS
+
+    def inject(self, event: TelegramObject, data: Dict[str, Any]):
+        data[ROUTE_KEYS] = self.route_keys(event)
@@ -0,0 +1,19 @@
+# src/utils/user_cards.py
+"""Тексты карточки пользователя для админки (по read-модели UserCard)."""
+from src.models.read_models import UserCard
+
+
+def format_user_card(card: UserCard, title: str = "👤 *Пользователь*", show_role: bool = False) -> str:
+    text = (
+        f"{title}\n\n"
+        f"ID: {card.id}\n"
+        f"Telegram ID: {card.telegram_id}\n"
+        f"Имя: {card.first_name or ''} {card.last_name or ''}\n"
+        f"Телефон: {card.phone or '-'}\n"
+        f"Обычные бонусы: {card.balance}\n"
+        f"Праздничные бонусы: {card.holiday_balance}\n"
+        f"Всего бонусов: {card.total_balance}\n"
+    )
+    if show_role:
+        text += f"Роль: {card.role}\n"
+    return text
@@ -3,7 +3,13 @@ import sys
 import types
 
 
-if "aiosqlite" not in sys.modules:
+try:
+    import aiosqlite  # noqa: F401
+except ImportError:
+    aiosqlite = None
+
+
+if aiosqlite is None and "aiosqlite" not in sys.modules:
     fake = types.ModuleType("aiosqlite")
 
     class _FakeConnection:
@@ -0,0 +1,429 @@
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+from types import SimpleNamespace
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy import column, create_engine, select, table, text
+from sqlalchemy.dialects.postgresql.asyncpg import AsyncAdapt_asyncpg_cursor
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.config.settings import settings
+from src.database import Base
+from src.database.migrations import alembic_config, head_revision, run_migrations
+from src.database.identity import ANONYMOUS, LOOKUPS, Identity, IdentityCache, identity_cache
+from src.database.retry import RETRIES, RETRIES_EXHAUSTED, RetryPolicy, run_in_transaction
+from src.database.routing import RoutingSession, recent_writers, use_primary
+from src.database.session import create_engine_from_settings, describe_pool
+from src.database.slow_queries import configure_slow_query_log, install_slow_query_log, slow_query_logger
+from src.database.unit_of_work import cursor_rows, install_unit_of_work_hooks, track_unit_of_work
+from src.models.admin_action import AdminAction  # noqa: F401
+from src.models.holiday_bonus import HolidayBonus  # noqa: F401
+from src.models.user import User
+from src.monitoring.logs import stop_logging
+from src.services.user_service import UserService
+
+
+class TestRoutingSession(TestCase):
+    def setUp(self):
+        self.primary = create_engine("sqlite://")
+        self.replica = create_engine("sqlite://")
+        for eng, name in ((self.primary, "primary"), (self.replica, "replica")):
+            with eng.begin() as conn:
+                conn.execute(text("CREATE TABLE node (name TEXT)"))
+                conn.execute(text("INSERT INTO node VALUES (:name)"), {"name": name})
+
+        RoutingSession.replica_bind = self.replica
+        recent_writers.clear()
+
+    def tearDown(self):
+        RoutingSession.replica_bind = None
+        recent_writers.clear()
+        self.primary.dispose()
+        self.replica.dispose()
+
+    def _node(self, session) -> str:
+        return session.execute(select(column("name")).select_from(table("node"))).scalar()
+
+    def test_reads_primary_by_default(self):
+        with RoutingSession(bind=self.primary) as session:
+            self.assertEqual(self._node(session), "primary")
+
+    def test_read_only_reads_replica(self):
+        with RoutingSession(bind=self.primary) as session:
+            session.info["read_only"] = True
+            self.assertEqual(self._node(session), "replica")
+
+            with use_primary(session):
+                self.assertEqual(self._node(session), "primary")
+            self.assertEqual(self._node(session), "replica")
+
+    def test_sticks_to_primary_after_write(self):
+        with RoutingSession(bind=self.primary) as session:
+            session.info["read_only"] = True
+            session.info["actor_id"] = 42
+            session.execute(table("node", column("name")).update().values(name="written"))
+            self.assertEqual(self._node(session), "written")
+            session.commit()
+
+        self.assertTrue(recent_writers.is_pinned(42))
+
+
+class _SerializationFailure(Exception):
+    sqlstate = "40001"
+
+
+class TestRunInTransaction(IsolatedAsyncioTestCase):
+    policy = RetryPolicy(attempts=3, base_delay=0, max_delay=0)
+
+    def setUp(self):
+        RETRIES.reset()
+        RETRIES_EXHAUSTED.reset()
+
+    async def test_retries_locked_database(self):
+        session = AsyncMock()
+        locked = OperationalError("COMMIT", {}, sqlite3.OperationalError("database is locked"))
+        session.commit.side_effect = [locked, None]
+        work = AsyncMock(return_value=42)
+
+        result = await run_in_transaction(session, work, operation="test", policy=self.policy)
+
+        self.assertEqual(result, 42)
+        self.assertEqual(work.await_count, 2)
+        session.rollback.assert_awaited_once()
+        self.assertEqual(RETRIES.value(operation="test", reason="database is locked"), 1)
+
+    async def test_gives_up_after_policy_attempts(self):
+        session = AsyncMock()
+        failure = OperationalError("UPDATE", {}, _SerializationFailure())
+        work = AsyncMock(side_effect=failure)
+
+        with self.assertRaises(OperationalError):
+            await run_in_transaction(session, work, operation="test", policy=self.policy)
+
+        self.assertEqual(work.await_count, 3)
+        self.assertEqual(RETRIES_EXHAUSTED.value(operation="test"), 1)
+
+    async def test_does_not_retry_other_errors(self):
+        session = AsyncMock()
+        work = AsyncMock(side_effect=IntegrityError("INSERT", {}, sqlite3.IntegrityError("UNIQUE")))
+
+        with self.assertRaises(IntegrityError):
+            await run_in_transaction(session, work, operation="test", policy=self.policy)
+
+        self.assertEqual(work.await_count, 1)
+        session.commit.assert_not_awaited()
+
+
+class TestIdentityCache(IsolatedAsyncioTestCase):
+    def setUp(self):
+        LOOKUPS.reset()
+
+    async def test_second_lookup_is_a_hit(self):
+        cache = IdentityCache()
+        session = AsyncMock()
+        session.execute.return_value = MagicMock(first=MagicMock(return_value=MagicMock(id=7, role="admin")))
+
+        self.assertEqual(await cache.resolve(session, 42), Identity(7, "admin"))
+        self.assertTrue((await cache.resolve(session, 42)).is_admin)
+        self.assertEqual(session.execute.await_count, 1)
+        self.assertEqual(LOOKUPS.value(result="miss"), 1)
+        self.assertEqual(LOOKUPS.value(result="hit"), 1)
+
+    async def test_admin_entry_rechecks_cached_non_admin(self):
+        cache = IdentityCache()
+        cache.put(42, Identity(7, "user"))
+        session = AsyncMock()
+        # роль повышена в другом процессе (make-admin.py)
+        session.execute.return_value = MagicMock(first=MagicMock(return_value=MagicMock(id=7, role="admin")))
+
+        self.assertFalse((await cache.resolve(session, 42)).is_admin)
+        session.execute.assert_not_awaited()
+        self.assertTrue((await cache.resolve(session, 42, require_admin=True)).is_admin)
+        self.assertTrue((await cache.resolve(session, 42)).is_admin)
+        self.assertEqual(session.execute.await_count, 1)
+        self.assertEqual(LOOKUPS.value(result="recheck"), 1)
+
+    def test_lru_and_ttl(self):
+        cache = IdentityCache(maxsize=2, ttl=60)
+        cache.put(1, ANONYMOUS)
+        cache.put(2, ANONYMOUS)
+        cache.get(1)
+        cache.put(3, ANONYMOUS)
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(len(cache), 2)
+
+        cache.ttl = -1
+        cache.put(4, ANONYMOUS)
+        self.assertIsNone(cache.get(4))
+
+    def test_orm_changes_invalidate_after_commit(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        identity_cache.clear()
+        try:
+            with RoutingSession(bind=engine) as session:
+                session.add(User(telegram_id=42, first_name="A"))
+                identity_cache.put(42, ANONYMOUS)
+                session.commit()
+                self.assertIsNone(identity_cache.get(42))
+
+                user = session.scalars(select(User)).one()
+                identity_cache.put(42, Identity(user.id, "user"))
+                user.role = "admin"
+                session.flush()
+                self.assertIsNotNone(identity_cache.get(42))
+                session.commit()
+                self.assertIsNone(identity_cache.get(42))
+
+                identity_cache.put(42, Identity(user.id, "admin"))
+                session.delete(user)
+                session.commit()
+                self.assertIsNone(identity_cache.get(42))
+        finally:
+            identity_cache.clear()
+            engine.dispose()
+
+
+class TestSlowQueryLog(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.workdir.name, "slow.jsonl")
+        configure_slow_query_log(self.path, max_bytes=1_000_000, backup_count=1)
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def asyncTearDown(self):
+        stop_logging()
+        slow_query_logger.handlers.clear()
+        await self.engine.dispose()
+        self.workdir.cleanup()
+
+    async def test_records_handler_caller_and_param_types(self):
+        install_slow_query_log(self.engine, threshold_ms=0, sample_rate=1.0)
+
+        with track_unit_of_work() as stats:
+            stats.handler = "user_balance"
+            async with AsyncSession(self.engine) as session:
+                await UserService(session).get_user_by_phone("+79990000000")
+        stop_logging()  # дописать очередь
+
+        with open(self.path, encoding="utf-8") as fh:
+            records = [json.loads(line) for line in fh]
+
+        record = records[-1]
+        self.assertIn("FROM users", record["statement"])
+        self.assertEqual(record["handler"], "user_balance")
+        self.assertEqual(record["caller"], "src/services/user_service.py:get_user_by_phone")
+        self.assertEqual(list(record["params"]), ["str"])
+        self.assertNotIn("79990000000", json.dumps(record))
+        # sqlite3 не сообщает rowcount для SELECT: «неизвестно», а не 0
+        self.assertIsNone(record["rows"])
+
+    async def test_sampling_zero_writes_nothing(self):
+        install_slow_query_log(self.engine, threshold_ms=0, sample_rate=0.0)
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        stop_logging()
+        self.assertFalse(os.path.exists(self.path))
+
+
+class _FakeAsyncpgStatement:
+    def __init__(self, rows, status):
+        self.rows = rows
+        self.status = status
+
+    async def fetch(self, *args):
+        return self.rows
+
+    def get_statusmsg(self):
+        return self.status
+
+
+class TestUnitOfWorkRows(IsolatedAsyncioTestCase):
+    async def test_sqlite_counts_dml_rows_by_rowcount(self):
+        engine = create_async_engine("sqlite+aiosqlite://")
+        install_unit_of_work_hooks(engine)
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE t (id INTEGER)"))
+            await conn.execute(text("INSERT INTO t VALUES (1), (2), (3)"))
+
+        with track_unit_of_work() as stats:
+            async with engine.begin() as conn:
+                await conn.execute(text("UPDATE t SET id = id + 10 WHERE id > 1"))
+                # sqlite3 не сообщает rowcount для SELECT
+                rows = (await conn.execute(text("SELECT id FROM t"))).all()
+        await engine.dispose()
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(stats.queries, 2)
+        self.assertEqual(stats.rows, 2)
+
+    async def test_session_counts_rows_it_reads(self):
+        engine = create_async_engine("sqlite+aiosqlite://")
+        install_unit_of_work_hooks(engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSession(engine) as session:
+            session.add_all([User(telegram_id=1), User(telegram_id=2), User(telegram_id=3)])
+            await session.commit()
+
+        with track_unit_of_work() as stats:
+            async with AsyncSession(engine) as session:
+                users = (await session.execute(select(User).order_by(User.id))).scalars().all()
+                updated = await session.execute(text("UPDATE users SET balance = 1 WHERE telegram_id > 1"))
+        await engine.dispose()
+
+        self.assertEqual([user.telegram_id for user in users], [1, 2, 3])
+        self.assertEqual(updated.rowcount, 2)
+        # SELECT — по прочитанному результату (rowcount у sqlite3 нет), UPDATE — по rowcount
+        self.assertEqual((stats.queries, stats.rows), (2, 5))
+
+    async def test_asyncpg_counts_select_rows_from_status(self):
+        # настоящий курсор адаптера SQLAlchemy поверх подменённого asyncpg
+        async def execute(operation, status, rows):
+            statement = _FakeAsyncpgStatement(rows, status)
+            attributes = [SimpleNamespace(name="id", type=SimpleNamespace(oid=23))] if rows else []
+            connection = SimpleNamespace(
+                _connection=None,
+                _started=True,
+                _execute_mutex=asyncio.Lock(),
+                _prepare=AsyncMock(return_value=(statement, attributes)),
+            )
+            cursor = AsyncAdapt_asyncpg_cursor(connection)
+            await cursor._prepare_and_execute(operation, ())
+            return cursor
+
+        select_cursor = await execute("SELECT id FROM t", "SELECT 3", [(1,), (2,), (3,)])
+        update_cursor = await execute("UPDATE t SET id = 1", "UPDATE 2", [])
+
+        self.assertEqual(cursor_rows(select_cursor), 3)
+        self.assertEqual(cursor_rows(update_cursor), 2)
+        self.assertIsNone(cursor_rows(SimpleNamespace(rowcount=-1)))
+
+
+class TestMigrations(IsolatedAsyncioTestCase):
+    HOT_INDEXES = {
+        "transactions": {"ix_transactions_user_id_id"},
+        "users": {"ix_users_birth_mmdd"},
+        "user_holiday_bonuses": {
+            "ix_uhb_user_active_expires",
+            "ix_uhb_user_holiday_created",
+            "ix_uhb_active_expires",
+            "ix_uhb_holiday_active",
+        },
+    }
+
+    async def asyncSetUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.workdir.name, "bot.db")
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{self.path}")
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.workdir.cleanup()
+
+    def _inspect(self):
+        with sqlite3.connect(self.path) as conn:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            indexes = {
+                name: {row[1] for row in conn.execute(f"PRAGMA index_list({name})")}
+                for name in self.HOT_INDEXES
+            }
+            version = conn.execute("SELECT version_num FROM alembic_version").fetchone()
+        return tables, indexes, version[0]
+
+    def _assert_hot_indexes(self, indexes):
+        for name, expected in self.HOT_INDEXES.items():
+            self.assertLessEqual(expected, indexes[name], name)
+
+    async def test_empty_database_is_migrated_to_head(self):
+        head = head_revision(alembic_config())
+
+        self.assertEqual(await run_migrations(self.engine), head)
+        tables, indexes, version = self._inspect()
+
+        self.assertEqual(version, head)
+        self.assertLessEqual({"users", "holidays", "transactions", "user_holiday_bonuses", "admin_actions"}, tables)
+        self._assert_hot_indexes(indexes)
+        # повторный старт: схема на head, upgrade не запускается
+        self.assertIsNone(await run_migrations(self.engine))
+
+    async def test_legacy_database_is_upgraded_and_backfilled(self):
+        # БД, созданная до Alembic: старые колонки, NULL в holiday_balance,
+        # собственная таблица версий
+        with sqlite3.connect(self.path) as conn:
+            conn.executescript(
+                """
+                CREATE TABLE users (
+                    id INTEGER PRIMARY KEY, telegram_id INTEGER NOT NULL, username VARCHAR(100),
+                    first_name VARCHAR(100), last_name VARCHAR(100), phone VARCHAR(20),
+                    birth_date DATE, role VARCHAR(20), is_active BOOLEAN, balance INTEGER,
+                    holiday_balance INTEGER, created_at DATETIME, updated_at DATETIME,
+                    last_activity DATETIME
+                );
+                CREATE TABLE holidays (
+                    id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, date DATE,
+                    amount INTEGER NOT NULL
+                );
+                CREATE TABLE transactions (
+                    id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users(id),
+                    amount INTEGER NOT NULL, operation_type VARCHAR(30) NOT NULL,
+                    description TEXT, category VARCHAR(50), created_at DATETIME
+                );
+                CREATE TABLE admin_actions (
+                    id INTEGER PRIMARY KEY, admin_id INTEGER NOT NULL, target_user_id INTEGER NOT NULL,
+                    action_type VARCHAR(50) NOT NULL, details TEXT, created_at DATETIME
+                );
+                CREATE TABLE user_holiday_bonuses (
+                    id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users(id),
+                    holiday_id INTEGER REFERENCES holidays(id), amount INTEGER NOT NULL
+                );
+                CREATE TABLE schema_version (version INTEGER NOT NULL);
+                INSERT INTO schema_version VALUES (3);
+                INSERT INTO users (id, telegram_id, birth_date, balance, holiday_balance) VALUES
+                    (1, 101, '1990-03-08', 10, NULL),
+                    (2, 102, NULL, 0, 25),
+                    (7001, 103, '1985-12-31', 5, NULL);
+                INSERT INTO holidays (id, name, date, amount) VALUES (1, '8 марта', '2026-03-08', 100);
+                INSERT INTO user_holiday_bonuses (id, user_id, holiday_id, amount) VALUES (1, 1, 1, 100);
+                """
+            )
+
+        self.assertEqual(await run_migrations(self.engine), head_revision(alembic_config()))
+        tables, indexes, _ = self._inspect()
+
+        self.assertNotIn("schema_version", tables)
+        self._assert_hot_indexes(indexes)
+        with sqlite3.connect(self.path) as conn:
+            users = conn.execute("SELECT id, holiday_balance, birth_mmdd FROM users ORDER BY id").fetchall()
+            holiday = conn.execute("SELECT days_before, days_valid, is_active FROM holidays").fetchone()
+            bonus = conn.execute("SELECT is_active, created_at IS NOT NULL FROM user_holiday_bonuses").fetchone()
+
+        # id 7001 — за пределами первой пачки backfill'а
+        self.assertEqual(users, [(1, 0, 308), (2, 25, None), (7001, 0, 1231)])
+        self.assertEqual(holiday, (0, 14, 1))
+        self.assertEqual(bonus, (1, 1))
+
+
+class TestDescribePool(IsolatedAsyncioTestCase):
+    async def test_reports_configured_pool(self):
+        cfg = settings.model_copy(update={"DB_POOL_SIZE": 3, "DB_MAX_OVERFLOW": 4, "DB_POOL_RECYCLE": 60})
+        with tempfile.TemporaryDirectory() as workdir:
+            engine = create_engine_from_settings(cfg, f"sqlite+aiosqlite:///{workdir}/pool.db")
+            try:
+                info = describe_pool(engine, cfg)
+            finally:
+                await engine.dispose()
+
+        self.assertEqual(info["pool"], "AsyncAdaptedQueuePool")
+        self.assertEqual(
+            (info["size"], info["max_overflow"], info["recycle"], info["pre_ping"]),
+            (3, 4, 60, False),
+        )
+        self.assertIn("Pool size: 3", info["status"])
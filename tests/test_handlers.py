@@ -0,0 +1,325 @@
+import asyncio
+from types import SimpleNamespace
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.types import CallbackQuery, Message, Update
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.database import Base
+from src.database.identity import identity_cache
+from src.database.unit_of_work import current_stats, install_unit_of_work_hooks
+from src.middlewares.admin import AdminMiddleware
+from src.middlewares.db import DBSessionMiddleware
+from src.middlewares.single_flight import COALESCED, SingleFlight, SingleFlightMiddleware
+from src.middlewares.throttling import THROTTLED, ThrottlingMiddleware, TokenBuckets
+from src.models.transaction import Transaction
+from src.models.user import User
+from src.services.user_service import UserService
+from src.utils.dispatch_index import DataIs, DataStartsWith, DispatchIndex, IndexedFilter, PrefixTrie, TextIs
+
+
+class TestTokenBuckets(TestCase):
+    @patch("src.middlewares.throttling.time.monotonic")
+    def test_refills_at_rate_up_to_burst(self, monotonic):
+        monotonic.return_value = 100.0
+        buckets = TokenBuckets(rate=1.0, burst=6)
+
+        self.assertTrue(buckets.consume(42, 3))
+        self.assertTrue(buckets.consume(42, 3))
+        self.assertFalse(buckets.consume(42, 3))
+        self.assertTrue(buckets.consume(7, 3))  # у каждого своя корзина
+
+        monotonic.return_value = 102.0
+        self.assertFalse(buckets.consume(42, 3))
+        monotonic.return_value = 103.0
+        self.assertTrue(buckets.consume(42, 3))
+
+
+class TestThrottlingMiddleware(IsolatedAsyncioTestCase):
+    def setUp(self):
+        THROTTLED.reset()
+
+    def _data(self, cost):
+        handler = SimpleNamespace(flags={"throttle": cost} if cost else {}, callback=MagicMock(__name__="user_balance"))
+        return {"handler": handler, "event_from_user": SimpleNamespace(id=42)}
+
+    async def test_sheds_over_budget_and_notices_once(self):
+        mw = ThrottlingMiddleware(rate=0.001, burst=3, notice_seconds=60)
+        handler = AsyncMock(return_value="ok")
+        with patch.object(Message, "answer", new_callable=AsyncMock) as answer:
+            results = [await mw(handler, Message.model_construct(), self._data(3)) for _ in range(3)]
+
+        self.assertEqual(results, ["ok", None, None])
+        self.assertEqual(handler.await_count, 1)
+        answer.assert_awaited_once()
+        self.assertEqual(THROTTLED.value(handler="user_balance"), 2)
+
+    async def test_unflagged_handlers_are_free(self):
+        mw = ThrottlingMiddleware(rate=0.001, burst=1, notice_seconds=60)
+        handler = AsyncMock(return_value="ok")
+
+        for _ in range(5):
+            self.assertEqual(await mw(handler, Message.model_construct(), self._data(None)), "ok")
+
+
+class TestSingleFlight(IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_one_execution(self):
+        flights = SingleFlight()
+        release = asyncio.Event()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return calls
+
+        tasks = [asyncio.create_task(flights.do("k", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        self.assertEqual(calls, 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True])
+        self.assertEqual({value for value, _ in results}, {1})
+        self.assertEqual(len(flights), 0)
+
+    async def test_followers_get_leader_error(self):
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            raise RuntimeError("boom")
+
+        tasks = [asyncio.create_task(flights.do("k", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+        self.assertEqual(len(flights), 0)
+
+    async def test_middleware_coalesces_identical_updates(self):
+        COALESCED.reset()
+        mw = SingleFlightMiddleware()
+        release = asyncio.Event()
+
+        async def wait_for_release(event, data):
+            await release.wait()
+
+        handler = AsyncMock(side_effect=wait_for_release)
+        data = {
+            "handler": SimpleNamespace(flags={"single_flight": True}, callback=MagicMock(__name__="user_balance")),
+            "event_from_user": SimpleNamespace(id=42),
+        }
+        message = Message.model_construct(text="💰 Мой баланс")
+
+        tasks = [asyncio.create_task(mw(handler, message, data)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(handler.await_count, 1)
+        self.assertEqual(COALESCED.value(handler="user_balance"), 2)
+
+
+class TestDispatchIndex(IsolatedAsyncioTestCase):
+    def test_prefix_trie_returns_every_matching_prefix(self):
+        trie = PrefixTrie()
+        for prefix in ("open_user:", "open_user_", "bonus_"):
+            trie.add(prefix)
+
+        self.assertEqual(trie.matches("open_user:15"), ["open_user:"])
+        self.assertEqual(trie.matches("bonus_percent_user:3"), ["bonus_"])
+        self.assertEqual(trie.matches("admin_menu"), [])
+
+    async def test_router_gate_skips_routers_without_matching_keys(self):
+        async def noop(event):
+            pass
+
+        root, buttons, menu = Router(), Router(), Router()
+        buttons.message.register(noop, TextIs("💰 Мой баланс"))
+        menu.callback_query.register(noop, DataIs("admin_menu"))
+        menu.callback_query.register(noop, DataStartsWith("open_user:"))
+        root.include_routers(buttons, menu)
+
+        index = DispatchIndex().install(root)
+        index.install(root)  # повторная установка не дублирует фильтры
+
+        self.assertEqual(index.gated_routers, 2)
+        self.assertEqual(len(menu.callback_query._handler.filters), 1)
+
+        callback = CallbackQuery.model_construct(data="open_user:15")
+        keys = index.route_keys(callback)
+        self.assertEqual(keys, {"prefix:open_user:"})
+        gate = menu.callback_query._handler.filters[0].callback
+        self.assertTrue(await gate(callback, route_keys=keys))
+        self.assertFalse(await gate(callback, route_keys=index.route_keys(CallbackQuery.model_construct(data="x"))))
+
+        message = Message.model_construct(text="/Admin@bonus_bot", caption=None)
+        self.assertEqual(index.route_keys(message), {"cmd:/admin"})
+
+    def test_indexed_filter_requires_fallback(self):
+        class NoFallback(IndexedFilter):
+            pass
+
+        with self.assertRaises(TypeError):
+            NoFallback()
+
+    async def test_filters_fall_back_without_index(self):
+        message = Message.model_construct(text="💰 Мой баланс")
+        self.assertTrue(await TextIs("💰 Мой баланс")(message))
+        self.assertFalse(await TextIs("👤 Профиль")(message))
+        self.assertTrue(await DataStartsWith("open_user:")(CallbackQuery.model_construct(data="open_user:1")))
+
+
+class TestUserScreensReadOnly(IsolatedAsyncioTestCase):
+    async def test_balance_stays_on_replica_without_lazy_accrual(self):
+        from src.database.identity import Identity
+        from src.handlers.user import balance
+
+        session = MagicMock(info={})
+        session.get = AsyncMock(return_value=SimpleNamespace(id=7, balance=10, holiday_balance=0))
+        message = SimpleNamespace(from_user=SimpleNamespace(id=42), answer=AsyncMock())
+        used_primary = []
+
+        async def resolve(session, telegram_id):
+            used_primary.append(session.info.get("primary_depth", 0))
+            return Identity(7, "user")
+
+        with patch.object(balance, "lazy_accrual", return_value=False), \
+                patch.object(balance.identity_cache, "resolve", side_effect=resolve), \
+                patch.object(balance.UserService, "check_and_award_holiday_bonuses", new=AsyncMock()) as accrue, \
+                patch.object(balance.UserService, "get_user_holiday_bonuses_info",
+                             new=AsyncMock(return_value={"total": 0, "bonuses": []})):
+            await balance.user_balance(message, session)
+
+        self.assertEqual(used_primary, [0])
+        accrue.assert_not_awaited()
+        message.answer.assert_awaited_once()
+
+
+class TestDBSessionAndAdminMiddleware(IsolatedAsyncioTestCase):
+    ADMIN_ID, USER_ID = 1001, 1002
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        install_unit_of_work_hooks(self.engine)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(self.engine, expire_on_commit=False, autoflush=False)
+        async with sessions() as session:
+            session.add_all([
+                User(telegram_id=self.ADMIN_ID, role="admin"),
+                User(telegram_id=self.USER_ID, role="user"),
+            ])
+            await session.commit()
+        identity_cache.clear()
+
+        self.calls = []
+        router = Router()
+
+        @router.callback_query(F.data == "admin_panel")
+        async def admin_panel(callback: CallbackQuery, session, admin_user):
+            user = await UserService(session).get_user_by_tg_id(callback.from_user.id)
+            self.calls.append(("admin_panel", user.id, current_stats()))
+
+        @router.callback_query(F.data == "my_profile")
+        async def my_profile(callback: CallbackQuery, session):
+            user = await UserService(session).get_user_by_tg_id(callback.from_user.id)
+            self.calls.append(("my_profile", user.id, current_stats()))
+
+        self.dp = Dispatcher()
+        self.dp.update.outer_middleware(DBSessionMiddleware(sessions))
+        self.dp.callback_query.middleware(AdminMiddleware())
+        self.dp.include_router(router)
+        self.bot = Bot("42:TEST")
+
+    async def asyncTearDown(self):
+        identity_cache.clear()
+        await self.bot.session.close()
+        await self.engine.dispose()
+
+    async def _press(self, user_id: int, data: str):
+        update = Update.model_validate({
+            "update_id": len(self.calls) + 1,
+            "callback_query": {
+                "id": "1",
+                "from": {"id": user_id, "is_bot": False, "first_name": "test"},
+                "chat_instance": "1",
+                "data": data,
+            },
+        })
+        with patch.object(CallbackQuery, "answer", new=AsyncMock()) as answer:
+            await self.dp.feed_update(self.bot, update)
+        return answer
+
+    async def test_admin_update_uses_one_session_and_connection(self):
+        await self._press(self.ADMIN_ID, "admin_panel")
+
+        [(name, _, stats)] = self.calls
+        self.assertEqual(name, "admin_panel")
+        # проверка роли и запрос хендлера — в одной сессии и одном соединении
+        self.assertEqual(stats.queries, 2)
+        self.assertEqual(stats.rows, 2)
+        self.assertEqual(stats.sessions, 1)
+        self.assertEqual(stats.connections, 1)
+
+    async def test_admin_callback_is_denied_to_non_admin(self):
+        answer = await self._press(self.USER_ID, "admin_panel")
+
+        self.assertEqual(self.calls, [])
+        answer.assert_awaited_once()
+
+    async def test_user_callback_skips_admin_check(self):
+        with patch.object(identity_cache, "resolve", new=AsyncMock()) as resolve:
+            await self._press(self.USER_ID, "my_profile")
+
+        resolve.assert_not_awaited()
+        [(name, _, stats)] = self.calls
+        self.assertEqual(name, "my_profile")
+        self.assertEqual((stats.queries, stats.sessions, stats.connections), (1, 1, 1))
+
+
+class TestAddBonusCommand(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False, autoflush=False)
+        async with self.sessions() as session:
+            session.add(User(id=7, telegram_id=5, first_name="Ivan", balance=50))
+            await session.commit()
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def _command(self, text: str) -> AsyncMock:
+        from src.handlers.admin import commands
+
+        message = SimpleNamespace(text=text, from_user=SimpleNamespace(id=1), answer=AsyncMock())
+        async with self.sessions() as session:
+            with patch.object(commands, "is_admin", AsyncMock(return_value=True)):
+                await commands.add_bonus_cmd(message, session)
+        return message.answer
+
+    async def test_addbonus_writes_balance_and_ledger(self):
+        answer = await self._command("/addbonus 5 100")
+
+        self.assertIn("Стало (обычные): 150", answer.await_args.args[0])
+        async with self.sessions() as session:
+            self.assertEqual((await session.get(User, 7)).balance, 150)
+            ledger = (await session.execute(select(Transaction.user_id, Transaction.amount, Transaction.operation_type))).all()
+        self.assertEqual(ledger, [(7, 100, "add")])
+
+    async def test_addbonus_rejects_non_positive_amount(self):
+        answer = await self._command("/addbonus 5 -10")
+
+        answer.assert_awaited_once_with("Сумма должна быть положительной")
+        async with self.sessions() as session:
+            self.assertEqual((await session.get(User, 7)).balance, 50)
@@ -1,9 +1,25 @@
-from datetime import datetime, timedelta
-from unittest import IsolatedAsyncioTestCase
-from unittest.mock import AsyncMock, Mock
+from datetime import date, datetime, timedelta
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, Mock, patch
 
+from sqlalchemy import event, func, select, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.database import Base
+from src.database.locks import AWARD_LOCK_NAMESPACE, award_locks
+from src.jobs.accrual import AccrualJob, manual_award
+from src.jobs.claims import HolidayBusy, HolidayClaim, holiday_claim
+from src.jobs.expiry import ExpirySweeper
+from src.jobs.reconcile import BalanceReconciler
+from src.jobs.revocation import DELETE_ATTEMPTS, HolidayRevocation
+from src.models.admin_action import AdminAction  # noqa: F401
+from src.models.holiday_bonus import HolidayBonus, UserHolidayBonus
+from src.models.transaction import Transaction
 from src.models.user import User
+from src.services.birthdays import mmdd_ranges, next_birthday
 from src.services.holiday_bonus_service import HolidayBonusService
+from src.services.holiday_calendar import HolidayCalendar, holiday_calendar
 
 
 class TestHolidayBonusService(IsolatedAsyncioTestCase):
@@ -41,13 +57,486 @@ class TestHolidayBonusService(IsolatedAsyncioTestCase):
         service._check_birthday_bonus = AsyncMock()
         service._check_calendar_holidays = AsyncMock()
 
+        service._award_history = AsyncMock()
         execute_result = Mock()
         execute_result.scalars.return_value.all.return_value = []
         session.execute.return_value = execute_result
 
-        await service.check_and_award_user_bonuses(user.id)
+        with patch.object(holiday_calendar, "awardable", AsyncMock(return_value=[])):
+            await service.check_and_award_user_bonuses(user.id)
 
         service._expire_old_bonuses.assert_awaited_once()
         service._check_birthday_bonus.assert_awaited_once()
         service._check_calendar_holidays.assert_awaited_once()
         session.commit.assert_awaited_once()
+
+
+class TestHolidayCalendar(TestCase):
+    def _calendar(self, *holidays) -> HolidayCalendar:
+        return HolidayCalendar().load(holidays)
+
+    def test_window_crossing_new_year(self):
+        calendar = self._calendar(
+            HolidayBonus(id=1, name="Новый год", date=date(2000, 1, 1), amount=500, days_before=3, days_valid=14, is_active=True),
+        )
+
+        (window,) = calendar.windows_on(date(2026, 12, 29))
+        self.assertEqual((window.start, window.end), (date(2026, 12, 29), date(2027, 1, 15)))
+        (same,) = calendar.windows_on(date(2027, 1, 2))
+        self.assertEqual(same, window)
+        self.assertEqual(calendar.windows_on(date(2026, 12, 28)), [])
+        self.assertEqual(calendar.windows_on(date(2027, 1, 16)), [])
+
+    def test_overlapping_windows_and_leap_day(self):
+        calendar = self._calendar(
+            HolidayBonus(id=1, name="23 февраля", date=date(2000, 2, 23), amount=300, days_before=3, days_valid=14, is_active=True),
+            HolidayBonus(id=2, name="Високосный", date=date(2000, 2, 29), amount=100, days_before=0, days_valid=0, is_active=True),
+            HolidayBonus(id=3, name="Без даты", date=None, amount=100, is_active=True),
+            HolidayBonus(id=4, name="Выключен", date=date(2000, 2, 28), amount=100, is_active=False),
+        )
+
+        self.assertEqual([w.holiday_id for w in calendar.windows_on(date(2027, 2, 28))], [1, 2])
+        self.assertEqual([w.holiday_id for w in calendar.windows_on(date(2027, 3, 1))], [1])
+        self.assertEqual([w.holiday_id for w in calendar.windows_on(date(2028, 2, 29))], [1, 2])
+
+    def test_invalidate_drops_snapshot(self):
+        calendar = self._calendar()
+        self.assertTrue(calendar.loaded)
+        calendar.invalidate()
+        self.assertFalse(calendar.loaded)
+
+
+class TestBirthdays(TestCase):
+    def test_model_keeps_birth_mmdd_in_sync(self):
+        user = User(telegram_id=1, birth_date=date(1992, 2, 29))
+        self.assertEqual(user.birth_mmdd, 229)
+        user.birth_date = None
+        self.assertIsNone(user.birth_mmdd)
+
+    def test_ranges_wrap_new_year_and_cover_leap_day(self):
+        self.assertEqual(mmdd_ranges(date(2026, 6, 15)), [(615, 615)])
+        self.assertEqual(mmdd_ranges(date(2026, 12, 28), 6), [(1228, 1231), (101, 103)])
+        # 29 февраля празднуют 28-го в невисокосный год, и только тогда
+        self.assertEqual(mmdd_ranges(date(2027, 2, 28)), [(228, 229)])
+        self.assertEqual(mmdd_ranges(date(2028, 2, 28)), [(228, 228)])
+        self.assertEqual(mmdd_ranges(date(2027, 3, 1)), [(301, 301)])
+
+    def test_next_birthday_for_leap_day(self):
+        born = date(1992, 2, 29)
+        self.assertEqual(next_birthday(born, date(2027, 2, 28)), date(2027, 2, 28))
+        self.assertEqual(next_birthday(born, date(2027, 3, 1)), date(2028, 2, 29))
+
+
+class _JobTestCase(IsolatedAsyncioTestCase):
+    # ON DELETE SET NULL / CASCADE, как на PostgreSQL
+    FOREIGN_KEYS = False
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        if self.FOREIGN_KEYS:
+            @event.listens_for(self.engine.sync_engine, "connect")
+            def _foreign_keys(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                cursor.execute("PRAGMA foreign_keys=ON")
+                cursor.close()
+
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def _balances(self) -> dict[int, int]:
+        async with self.sessions() as session:
+            return dict((await session.execute(select(User.id, User.holiday_balance))).all())
+
+    async def _count(self, model) -> int:
+        async with self.sessions() as session:
+            return (await session.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+class TestAccrualJob(_JobTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+
+        long_ago = datetime(2025, 1, 1)
+        async with self.sessions() as session:
+            holiday = HolidayBonus(name="23 февраля", date=date(2000, 2, 23), amount=300, days_before=3, days_valid=14)
+            session.add(holiday)
+            session.add_all([
+                User(id=1, telegram_id=1, birth_date=date(1990, 2, 23), created_at=long_ago, holiday_balance=0),
+                User(id=2, telegram_id=2, birth_date=date(1990, 5, 1), created_at=long_ago, holiday_balance=0),
+                User(id=3, telegram_id=3, birth_date=date(1990, 2, 23), created_at=datetime(2026, 2, 23, 9), holiday_balance=0),
+                User(id=4, telegram_id=4, created_at=long_ago, holiday_balance=100),
+                User(id=5, telegram_id=5, birth_date=date(1992, 2, 29), created_at=long_ago, holiday_balance=0),
+            ])
+            await session.flush()
+            # пользователь 4 уже получил бонус за праздник в этом году
+            session.add(UserHolidayBonus(
+                user_id=4, holiday_id=holiday.id, amount=100,
+                created_at=datetime(2026, 2, 21), expires_at=datetime(2026, 3, 9),
+            ))
+            await session.commit()
+
+    async def test_awards_in_chunks_and_is_idempotent(self):
+        job = AccrualJob(self.sessions, chunk_size=2)
+
+        dry = await job.run(day=date(2026, 2, 23), dry_run=True)
+        self.assertEqual((dry.birthday_awards, dry.holiday_awards), (1, {"23 февраля": 3}))
+        self.assertEqual(await self._count(Transaction), 0)
+
+        balance_updates = []
+
+        @event.listens_for(self.engine.sync_engine, "before_cursor_execute")
+        def _collect(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("UPDATE users"):
+                balance_updates.append(executemany)
+
+        report = await job.run(day=date(2026, 2, 23))
+        event.remove(self.engine.sync_engine, "before_cursor_execute", _collect)
+
+        # по одному UPDATE (не executemany) на чанк с начислениями
+        self.assertEqual(balance_updates, [False, False])
+        self.assertEqual(report.chunks, 3)
+        self.assertEqual(report.users_scanned, 5)
+        self.assertEqual(report.birthday_awards, 1)
+        self.assertEqual(report.holiday_awards, {"23 февраля": 3})
+        self.assertEqual(report.amount, 500 + 3 * 300)
+        self.assertEqual(report.balances_updated, 3)
+        self.assertEqual(report.transactions_inserted, 4)
+        self.assertEqual(await self._balances(), {1: 800, 2: 300, 3: 0, 4: 100, 5: 300})
+
+        async with self.sessions() as session:
+            descriptions = (await session.execute(
+                select(Transaction.description).where(Transaction.user_id == 1).order_by(Transaction.id)
+            )).scalars().all()
+        self.assertEqual(descriptions, ["Праздничный бонус ко дню рождения", "Праздничный бонус: 23 февраля"])
+
+        again = await job.run(day=date(2026, 2, 23))
+        self.assertEqual(again.awards, 0)
+        self.assertEqual(await self._count(Transaction), 4)
+
+    async def test_leap_day_birthday_on_feb_28(self):
+        report = await AccrualJob(self.sessions).run(day=date(2027, 2, 28))
+
+        self.assertEqual(report.birthday_awards, 1)
+        async with self.sessions() as session:
+            birthday_users = (await session.execute(
+                select(UserHolidayBonus.user_id).where(UserHolidayBonus.holiday_id.is_(None))
+            )).scalars().all()
+        self.assertEqual(birthday_users, [5])
+
+
+    async def test_concurrent_run_with_same_timestamp_is_not_credited(self):
+        now = datetime(2026, 2, 23, 0, 5)
+        async with self.sessions() as session:
+            # бонус, вставленный другим прогоном в тот же момент
+            session.add(UserHolidayBonus(user_id=2, holiday_id=None, amount=999, created_at=now, expires_at=now))
+            await session.commit()
+            holiday = await session.get(HolidayBonus, 1)
+
+        report = await AccrualJob(self.sessions)._award_all([manual_award(holiday, now)], now, dry_run=False)
+
+        self.assertEqual(report.holiday_awards, {"23 февраля": 4})
+        self.assertEqual((await self._balances())[2], 300)
+
+    async def test_give_awards_everyone_once_with_progress(self):
+        progress = []
+
+        async def on_progress(report):
+            progress.append((report.users_scanned, report.users_total))
+
+        job = AccrualJob(self.sessions, chunk_size=2)
+        report = await job.give(1, on_progress=on_progress)
+
+        self.assertEqual(report.holiday_awards, {"23 февраля": 5})
+        self.assertEqual(report.transactions_inserted, 5)
+        self.assertEqual(progress, [(2, 5), (4, 5), (5, 5)])
+        self.assertEqual(await self._balances(), {1: 300, 2: 300, 3: 300, 4: 400, 5: 300})
+
+        again = await job.give(1)
+        self.assertEqual(again.awards, 0)
+        self.assertEqual(await self._count(Transaction), 5)
+        self.assertIsNone(await job.give(999))
+
+    async def test_disabled_holiday_is_not_given(self):
+        async with self.sessions() as session:
+            holiday = await session.get(HolidayBonus, 1)
+            award = manual_award(holiday, datetime.now())
+            holiday.is_active = False
+            await session.commit()
+
+        job = AccrualJob(self.sessions)
+        self.assertIsNone(await job.give(1))
+        # выключили уже во время прогона: INSERT … SELECT проверяет is_active сам
+        report = await job._award_all([award], datetime.now(), dry_run=False)
+        self.assertEqual(report.awards, 0)
+        self.assertEqual(await self._count(Transaction), 0)
+
+
+class TestAwardLocks(_JobTestCase):
+    async def test_postgres_takes_sorted_advisory_locks(self):
+        session = Mock()
+        session.get_bind.return_value = Mock(dialect=postgresql.dialect())
+        session.execute = AsyncMock()
+
+        self.assertTrue(await award_locks(session, [3, None, 3]))
+
+        sql = [
+            str(call.args[0].compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+            for call in session.execute.await_args_list
+        ]
+        self.assertEqual(len(sql), 2)
+        self.assertIn(f"pg_advisory_xact_lock({AWARD_LOCK_NAMESPACE}, 0)", sql[0])
+        self.assertIn(f"pg_advisory_xact_lock({AWARD_LOCK_NAMESPACE}, 3)", sql[1])
+
+    async def test_lazy_accrual_rechecks_under_lock(self):
+        today = datetime.now()
+        async with self.sessions() as session:
+            session.add(User(id=1, telegram_id=1, birth_date=today.date(), created_at=datetime(2020, 1, 1), holiday_balance=0))
+            await session.commit()
+
+        async def concurrent_award(session, holiday_ids):
+            # ночной прогон успел начислить ДР, пока ждали блокировку
+            session.add(UserHolidayBonus(user_id=1, holiday_id=None, amount=500, created_at=today))
+            await session.flush()
+            return True
+
+        async with self.sessions() as session:
+            with patch("src.services.holiday_bonus_service.award_locks", side_effect=concurrent_award), \
+                    patch.object(holiday_calendar, "awardable", AsyncMock(return_value=[])):
+                await HolidayBonusService(session).check_and_award_user_bonuses(1)
+
+        self.assertEqual(await self._balances(), {1: 0})
+        self.assertEqual(await self._count(UserHolidayBonus), 1)
+
+
+class TestHolidayClaim(_JobTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        async with self.sessions() as session:
+            session.add_all([HolidayBonus(id=1, name="23 февраля", amount=300), User(id=1, telegram_id=1)])
+            await session.commit()
+
+    async def _claimed_until(self):
+        async with self.sessions() as session:
+            return await session.scalar(select(HolidayBonus.claimed_until))
+
+    async def test_claimed_holiday_is_busy_for_give_and_revocation(self):
+        async with holiday_claim(self.sessions, 1):
+            # другой процесс (или другой админ) во время начисления
+            with self.assertRaises(HolidayBusy):
+                await AccrualJob(self.sessions).give(1)
+            with self.assertRaises(HolidayBusy):
+                await HolidayRevocation(self.sessions).run(1)
+
+        self.assertIsNone(await self._claimed_until())
+        report = await AccrualJob(self.sessions).give(1)
+        self.assertEqual(report.awards, 1)
+        self.assertIsNone(await self._claimed_until())
+
+    async def test_expired_claim_is_taken_over_and_renewed(self):
+        stale = HolidayClaim(self.sessions, 1, lease=timedelta(seconds=-1))
+        self.assertTrue(await stale.acquire())
+
+        claim = HolidayClaim(self.sessions, 1, lease=timedelta(minutes=10))
+        self.assertTrue(await claim.acquire())
+        first = claim.until
+
+        claim.until -= timedelta(minutes=6)
+        async with self.sessions() as session:
+            await session.execute(update(HolidayBonus).values(claimed_until=claim.until))
+            await session.commit()
+        await claim.renew()
+        self.assertGreater(claim.until, first)
+        self.assertEqual(await self._claimed_until(), claim.until)
+
+        # упавший владелец не снимает чужой захват
+        await stale.release()
+        self.assertEqual(await self._claimed_until(), claim.until)
+        await claim.release()
+        self.assertIsNone(await self._claimed_until())
+
+
+class TestExpirySweeper(_JobTestCase):
+    async def test_burns_due_bonuses_in_batches_once(self):
+        now = datetime(2026, 3, 10, 12)
+        async with self.sessions() as session:
+            holiday = HolidayBonus(name="23 февраля", date=date(2000, 2, 23), amount=300)
+            session.add(holiday)
+            session.add_all([
+                User(id=1, telegram_id=1, holiday_balance=800),
+                User(id=2, telegram_id=2, holiday_balance=100),
+                User(id=3, telegram_id=3, holiday_balance=300),
+            ])
+            await session.flush()
+            past, future = now - timedelta(days=1), now + timedelta(days=1)
+            session.add_all([
+                UserHolidayBonus(user_id=1, holiday_id=holiday.id, amount=300, expires_at=past),
+                UserHolidayBonus(user_id=1, holiday_id=None, amount=500, expires_at=past),
+                # потратил часть: сгорает не больше остатка
+                UserHolidayBonus(user_id=2, holiday_id=holiday.id, amount=300, expires_at=past),
+                UserHolidayBonus(user_id=3, holiday_id=holiday.id, amount=300, expires_at=future),
+                UserHolidayBonus(user_id=3, holiday_id=None, amount=500, expires_at=past, is_active=False),
+            ])
+            await session.commit()
+
+        report = await ExpirySweeper(self.sessions, batch_size=2).run(now=now)
+
+        self.assertEqual((report.batches, report.bonuses, report.users), (2, 3, 2))
+        self.assertEqual(report.amount, 900)
+        self.assertEqual(await self._balances(), {1: 0, 2: 0, 3: 300})
+        async with self.sessions() as session:
+            ledger = (await session.execute(
+                select(Transaction.user_id, Transaction.amount, Transaction.description).order_by(Transaction.id)
+            )).all()
+        self.assertEqual(sorted(ledger), [
+            (1, -500, "Сгорание праздничного бонуса (День рождения)"),
+            (1, -300, "Сгорание праздничного бонуса (23 февраля)"),
+            (2, -100, "Сгорание праздничного бонуса (23 февраля)"),
+        ])
+
+        again = await ExpirySweeper(self.sessions, batch_size=2).run(now=now)
+        self.assertEqual(again.bonuses, 0)
+        self.assertEqual(await self._count(Transaction), 3)
+
+
+class TestHolidayRevocation(_JobTestCase):
+    FOREIGN_KEYS = True
+
+    async def test_revokes_per_user_in_batches_then_deletes_holiday(self):
+        now = datetime(2026, 3, 1, 12)
+        async with self.sessions() as session:
+            holiday = HolidayBonus(name="23 февраля", date=date(2000, 2, 23), amount=300, is_active=False)
+            session.add(holiday)
+            session.add_all([
+                User(id=1, telegram_id=1, holiday_balance=800),
+                User(id=2, telegram_id=2, holiday_balance=100),
+                User(id=3, telegram_id=3, holiday_balance=500),
+            ])
+            await session.flush()
+            future = now + timedelta(days=7)
+            session.add_all([
+                UserHolidayBonus(user_id=1, holiday_id=holiday.id, amount=100, expires_at=future),
+                UserHolidayBonus(user_id=1, holiday_id=holiday.id, amount=200, expires_at=future),
+                # потратил часть: списывается не больше остатка
+                UserHolidayBonus(user_id=2, holiday_id=holiday.id, amount=300, expires_at=future),
+                UserHolidayBonus(user_id=3, holiday_id=None, amount=500, expires_at=future),
+            ])
+            await session.commit()
+
+        progress = []
+
+        async def on_progress(report):
+            progress.append((report.bonuses, report.bonuses_total))
+
+        report = await HolidayRevocation(self.sessions, batch_size=1).run(holiday.id, on_progress, now=now)
+
+        self.assertEqual(progress, [(1, 3), (2, 3), (3, 3)])
+        self.assertEqual((report.users, report.amount, report.deleted), (2, 400, True))
+        self.assertEqual(await self._balances(), {1: 500, 2: 0, 3: 500})
+        async with self.sessions() as session:
+            ledger = (await session.execute(select(Transaction.user_id, Transaction.amount))).all()
+        self.assertEqual(sorted(ledger), [(1, -200), (1, -100), (2, -100)])
+        self.assertEqual(await self._count(HolidayBonus), 0)
+        # списанные бонусы удалены вместе с праздником, бонус ко дню рождения — на месте
+        self.assertEqual(report.purged, 3)
+        async with self.sessions() as session:
+            left = (await session.execute(select(UserHolidayBonus.user_id, UserHolidayBonus.holiday_id))).all()
+        self.assertEqual(left, [(3, None)])
+
+    async def test_deleted_holiday_does_not_block_birthday_bonus(self):
+        async with self.sessions() as session:
+            holiday = HolidayBonus(name="8 марта", date=date(2000, 3, 8), amount=300, is_active=False)
+            session.add_all([
+                holiday,
+                User(id=1, telegram_id=1, birth_date=date(1990, 3, 20), created_at=datetime(2025, 1, 1), holiday_balance=300),
+            ])
+            await session.flush()
+            session.add_all([
+                UserHolidayBonus(user_id=1, holiday_id=holiday.id, amount=300, created_at=datetime(2026, 3, 5)),
+                # уже сгоревший бонус того же праздника
+                UserHolidayBonus(user_id=1, holiday_id=holiday.id, amount=300, created_at=datetime(2025, 3, 5), is_active=False),
+            ])
+            await session.commit()
+
+        report = await HolidayRevocation(self.sessions).run(holiday.id, now=datetime(2026, 3, 10))
+        self.assertTrue(report.deleted)
+        self.assertEqual(await self._count(UserHolidayBonus), 0)
+
+        accrual = await AccrualJob(self.sessions).run(day=date(2026, 3, 20))
+
+        self.assertEqual(accrual.birthday_awards, 1)
+        self.assertEqual(await self._balances(), {1: 500})
+
+    async def test_keeps_holiday_while_locked_bonuses_remain(self):
+        async with self.sessions() as session:
+            holiday = HolidayBonus(name="23 февраля", amount=300, is_active=False)
+            session.add_all([holiday, User(id=1, telegram_id=1, holiday_balance=300)])
+            await session.flush()
+            session.add(UserHolidayBonus(user_id=1, holiday_id=holiday.id, amount=300))
+            await session.commit()
+
+        revocation = HolidayRevocation(self.sessions)
+        # все оставшиеся бонусы заблокированы: SKIP LOCKED отдаёт пустые пачки
+        with patch.object(revocation, "_revoke_batch", new=AsyncMock(return_value=(0, 0))) as revoke_batch, \
+                patch("src.jobs.revocation.RETRY_DELAY", 0):
+            report = await revocation.run(holiday.id)
+
+        self.assertFalse(report.deleted)
+        self.assertEqual(revoke_batch.await_count, DELETE_ATTEMPTS)
+        self.assertEqual(await self._count(HolidayBonus), 1)
+
+
+class TestBalanceReconciler(_JobTestCase):
+    async def test_reports_and_repairs_drift(self):
+        now = datetime(2026, 3, 1, 12)
+        past, future = now - timedelta(days=1), now + timedelta(days=7)
+        async with self.sessions() as session:
+            session.add_all([
+                User(id=1, telegram_id=1, holiday_balance=300),  # сходится
+                User(id=2, telegram_id=2, holiday_balance=900),  # больше суммы бонусов
+                User(id=3, telegram_id=3, holiday_balance=None),  # меньше
+                User(id=4, telegram_id=4, holiday_balance=800),  # ждёт сжигания
+                User(id=5, telegram_id=5, holiday_balance=0),
+            ])
+            await session.flush()
+            session.add_all([
+                UserHolidayBonus(user_id=1, amount=300, expires_at=future),
+                UserHolidayBonus(user_id=1, amount=500, expires_at=past, is_active=False),
+                UserHolidayBonus(user_id=2, amount=300, expires_at=future),
+                UserHolidayBonus(user_id=3, amount=200, expires_at=None),
+                UserHolidayBonus(user_id=4, amount=300, expires_at=future),
+                UserHolidayBonus(user_id=4, amount=500, expires_at=past),
+            ])
+            await session.commit()
+
+        reconciler = BalanceReconciler(self.sessions, chunk_size=2, rows_per_second=0)
+        check = await reconciler.run(now=now)
+        self.assertEqual((check.users_checked, check.chunks, check.pending_expiry), (5, 3, 1))
+        self.assertEqual((check.drifted, check.over, check.under, check.drift_abs), (2, 1, 1, 800))
+        self.assertEqual(check.sample, [(2, 900, 300), (3, 0, 200)])
+        self.assertEqual(await self._count(Transaction), 0)
+
+        fixed = await reconciler.run(repair=True, now=now)
+        self.assertEqual(fixed.repaired, 2)
+        self.assertEqual(await self._balances(), {1: 300, 2: 300, 3: 200, 4: 800, 5: 0})
+        async with self.sessions() as session:
+            ledger = (await session.execute(select(Transaction.user_id, Transaction.amount))).all()
+        self.assertEqual(sorted(ledger), [(2, -600), (3, 200)])
+
+        self.assertEqual((await reconciler.run(now=now)).drifted, 0)
+
+    async def test_stays_within_read_budget(self):
+        async with self.sessions() as session:
+            session.add_all([User(id=i, telegram_id=i, holiday_balance=0) for i in range(1, 5)])
+            await session.commit()
+
+        with patch("src.jobs.reconcile.asyncio.sleep", new=AsyncMock()) as sleep:
+            report = await BalanceReconciler(self.sessions, chunk_size=2, rows_per_second=10).run()
+
+        # по 2 строки на чанк при 10 строк/с — пауза до 0.2 с после каждого
+        self.assertEqual(sleep.await_count, 2)
+        self.assertTrue(all(0 < call.args[0] <= 0.2 for call in sleep.await_args_list))
+        self.assertGreater(report.throttled, 0)
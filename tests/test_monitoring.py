@@ -0,0 +1,124 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import tempfile
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.monitoring.logs import (
+    DROPPED,
+    DroppingQueueHandler,
+    JsonFormatter,
+    rotating_file_handler,
+    start_queue_logging,
+    stop_logging,
+)
+from src.monitoring.metrics import MetricsRegistry
+from src.monitoring.server import create_metrics_app
+
+
+def _registry() -> MetricsRegistry:
+    registry = MetricsRegistry()
+    registry.counter("app_events_total", "События", labelnames=("kind",)).inc(kind='a"b')
+    latency = registry.histogram("app_latency_seconds", "Латентность", labelnames=("handler",), buckets=(0.1, 1.0))
+    latency.observe(0.05, handler="balance")
+    latency.observe(0.1, handler="balance")
+    latency.observe(3, handler="balance")
+    return registry
+
+
+class TestPrometheusExport(TestCase):
+    def test_render_text_format(self):
+        text = _registry().render()
+
+        self.assertIn("# TYPE app_events_total counter\n", text)
+        self.assertIn('app_events_total{kind="a\\"b"} 1\n', text)
+        self.assertIn("# TYPE app_latency_seconds histogram\n", text)
+        self.assertIn('app_latency_seconds_bucket{handler="balance",le="0.1"} 2\n', text)
+        self.assertIn('app_latency_seconds_bucket{handler="balance",le="1.0"} 2\n', text)
+        self.assertIn('app_latency_seconds_bucket{handler="balance",le="+Inf"} 3\n', text)
+        self.assertIn('app_latency_seconds_count{handler="balance"} 3\n', text)
+        self.assertIn('app_latency_seconds_sum{handler="balance"} 3.15\n', text)
+
+    def test_dump_writes_file(self):
+        registry = _registry()
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, "bot.prom")
+            registry.dump(path)
+            with open(path, encoding="utf-8") as fh:
+                self.assertEqual(fh.read(), registry.render())
+            self.assertEqual(os.listdir(workdir), ["bot.prom"])
+
+
+class TestMetricsEndpoint(IsolatedAsyncioTestCase):
+    async def test_serves_registry(self):
+        registry = _registry()
+        async with TestClient(TestServer(create_metrics_app(registry))) as client:
+            response = await client.get("/metrics")
+            self.assertEqual(response.status, 200)
+            self.assertTrue(response.headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+            self.assertEqual(await response.text(), registry.render())
+
+
+class TestLogPipeline(TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger("tests.log_pipeline")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.workdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        stop_logging()
+        self.logger.handlers.clear()
+        self.workdir.cleanup()
+
+    def test_json_lines_written_by_listener_and_rotated_to_gzip(self):
+        path = os.path.join(self.workdir.name, "logs", "bot.log")
+        handler = rotating_file_handler(path, max_bytes=200, backup_count=2)
+        handler.setFormatter(JsonFormatter())
+        start_queue_logging(self.logger, [handler])
+
+        payload = {"items": [1]}
+        self.logger.info("заказ %s", payload, extra={"user_id": 42})
+        payload["items"].append(2)  # запись уже склеена в потоке вызова
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            self.logger.exception("ошибка")
+        stop_logging()
+
+        with gzip.open(path + ".1.gz", "rt", encoding="utf-8") as fh:
+            rotated = [json.loads(line) for line in fh]
+        with open(path, encoding="utf-8") as fh:
+            current = [json.loads(line) for line in fh]
+
+        self.assertEqual(rotated[0]["message"], "заказ {'items': [1]}")
+        self.assertEqual(rotated[0]["user_id"], 42)
+        self.assertEqual(current[0]["level"], "ERROR")
+        self.assertIn("ValueError: boom", current[0]["exc"])
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        DROPPED.reset()
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        self.logger.handlers[:] = [handler]
+
+        self.logger.warning("первая")
+        self.logger.warning("вторая")
+
+        self.assertEqual(handler.queue.qsize(), 1)
+        self.assertEqual(DROPPED.value(logger="tests.log_pipeline"), 1)
+
+    def test_prepare_leaves_original_record_intact(self):
+        handler = DroppingQueueHandler(queue.Queue())
+        args = {"items": [1]}
+        record = self.logger.makeRecord(self.logger.name, logging.INFO, __file__, 1, "заказ %s", (args,), None)
+
+        queued = handler.prepare(record)
+
+        self.assertIsNot(queued, record)
+        self.assertEqual((queued.msg, queued.args), ("заказ {'items': [1]}", None))
+        # LogRecord разворачивает единственный dict-аргумент
+        self.assertEqual((record.msg, record.args), ("заказ %s", args))
@@ -0,0 +1,197 @@
+import os
+import re
+import tempfile
+from datetime import date, datetime, timedelta
+from unittest import IsolatedAsyncioTestCase, skipUnless
+
+import aiosqlite
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.config.settings import settings
+from src.database import Base, queries
+from src.database.session import create_engine_from_settings
+from src.jobs.expiry import ExpirySweeper
+from src.models.admin_action import AdminAction  # noqa: F401
+from src.models.holiday_bonus import HolidayBonus, UserHolidayBonus
+from src.models.transaction import Transaction
+from src.models.user import User
+from src.services.birthdays import birth_mmdd, birthdays_count, upcoming_birthdays
+from src.services.holiday_bonus_service import HolidayBonusService
+from src.services.holiday_calendar import holiday_calendar
+from src.services.user_service import UserService
+
+# Таблицы, которые растут вместе с числом пользователей: полный проход по
+# ним на каждом апдейте недопустим. holidays — справочник на десяток строк.
+LARGE_TABLES = {"users", "transactions", "user_holiday_bonuses"}
+
+USERS = 300
+SCAN_RE = re.compile(r"^SCAN (\w+)")
+
+
+@skipUnless(hasattr(aiosqlite, "Connection"), "нужен настоящий aiosqlite")
+class TestHotPathQueryPlans(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        cfg = settings.model_copy(
+            update={
+                "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(self.workdir.name, 'plans.db')}",
+                "SQLALCHEMY_ECHO": False,
+            }
+        )
+        self.engine = create_engine_from_settings(cfg)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        await self._seed()
+        holiday_calendar.invalidate()
+
+        self.statements = []
+        event.listen(self.engine.sync_engine, "before_cursor_execute", self._capture)
+
+    async def asyncTearDown(self):
+        event.remove(self.engine.sync_engine, "before_cursor_execute", self._capture)
+        await self.engine.dispose()
+        self.workdir.cleanup()
+
+    def _capture(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            self.statements.append((statement, parameters[0] if executemany else parameters))
+
+    async def _seed(self):
+        today = date.today()
+        now = datetime.now()
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(
+                User.__table__.insert(),
+                [
+                    {
+                        "telegram_id": 10_000 + i,
+                        "first_name": f"u{i}",
+                        "balance": 200,
+                        "holiday_balance": 100,
+                        "birth_date": birthday,
+                        "birth_mmdd": birth_mmdd(birthday),
+                        "created_at": now - timedelta(days=30),
+                    }
+                    for i, birthday in enumerate(
+                        date(1990, 1, 1) + timedelta(days=i * 365 // USERS) for i in range(USERS)
+                    )
+                ],
+            )
+            await conn.execute(
+                HolidayBonus.__table__.insert(),
+                [{"name": "Сегодня", "date": today, "amount": 300, "days_before": 1, "days_valid": 7}],
+            )
+            await conn.execute(
+                Transaction.__table__.insert(),
+                [
+                    {"user_id": 1 + i % USERS, "amount": 5, "operation_type": "add", "description": "seed"}
+                    for i in range(USERS * 5)
+                ],
+            )
+            await conn.execute(
+                UserHolidayBonus.__table__.insert(),
+                [
+                    {
+                        "user_id": 1 + i % USERS,
+                        "holiday_id": None,
+                        "amount": 50,
+                        "created_at": now - timedelta(days=400),
+                        "expires_at": now + timedelta(days=(i % 3) - 1),
+                        "is_active": True,
+                    }
+                    for i in range(USERS * 3)
+                ],
+            )
+            await conn.exec_driver_sql("ANALYZE")
+
+    async def _run_hot_paths(self, user_id: int, telegram_id: int):
+        """То, что делают «💰 Мой баланс», «📊 История», админка и касса."""
+        async with self.sessions() as session:
+            users = UserService(session)
+            await session.scalar(queries.identity_by_telegram_id(telegram_id))
+            await users.get_user_by_tg_id(telegram_id)
+            # ленивое начисление (ACCRUAL_MODE=lazy) — тоже горячий путь
+            await HolidayBonusService(session).check_and_award_user_bonuses(user_id)
+            await session.execute(queries.recent_transactions(user_id, 10))
+            await users.get_user_card(user_id)
+            await users.get_user_card_by_tg_id(telegram_id)
+            await HolidayBonusService(session).apply_holiday_bonus_spend(user_id, 30)
+            await session.commit()
+
+    async def _scans(self) -> list[str]:
+        scans = []
+        async with self.engine.connect() as conn:
+            for statement, parameters in self.statements:
+                plan = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                for row in plan:
+                    match = SCAN_RE.match(row[-1])
+                    if match and match.group(1) in LARGE_TABLES:
+                        scans.append(f"{row[-1]}\n    {' '.join(statement.split())}")
+        return scans
+
+    async def test_hot_paths_do_not_scan_large_tables(self):
+        await self._run_hot_paths(user_id=7, telegram_id=10_006)
+        self.assertTrue(self.statements)
+
+        scans = await self._scans()
+        self.assertEqual(scans, [], "Полный проход по большой таблице:\n" + "\n".join(scans))
+
+    async def test_expiry_sweep_uses_expires_at_index(self):
+        report = await ExpirySweeper(self.sessions, batch_size=100).run()
+        self.assertEqual(report.bonuses, USERS * 2)
+
+        scans = await self._scans()
+        self.assertEqual(scans, [], "Полный проход по большой таблице:\n" + "\n".join(scans))
+
+    async def test_birthday_lookup_uses_mmdd_index(self):
+        async with self.sessions() as session:
+            for today, days in ((date(2026, 6, 15), 0), (date(2026, 6, 15), 6), (date(2026, 12, 28), 6)):
+                await session.scalar(birthdays_count(today, days))
+                await session.execute(upcoming_birthdays(today, days))
+            # 28 декабря + 6 дней — два диапазона: до 31.12 и с 01.01
+            count = await session.scalar(birthdays_count(date(2026, 12, 28), 6))
+        self.assertGreater(count, 0)
+
+        scans = await self._scans()
+        self.assertEqual(scans, [], "Полный проход по большой таблице:\n" + "\n".join(scans))
+
+    async def _accrual_statements(self, user_id: int) -> list[str]:
+        self.statements.clear()
+        inserts = []
+
+        def count_inserts(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("INSERT"):
+                inserts.append(statement)
+
+        event.listen(self.engine.sync_engine, "before_cursor_execute", count_inserts)
+        try:
+            async with self.sessions() as session:
+                await HolidayBonusService(session).check_and_award_user_bonuses(user_id)
+        finally:
+            event.remove(self.engine.sync_engine, "before_cursor_execute", count_inserts)
+        self.inserts.append(len(inserts))
+        return [" ".join(statement.split()) for statement, _ in self.statements]
+
+    async def test_accrual_query_count_does_not_grow_with_holidays(self):
+        self.inserts = []
+        await self._accrual_statements(1)  # календарь праздников загружен
+        one_holiday = await self._accrual_statements(2)
+
+        today = date.today()
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                HolidayBonus.__table__.insert(),
+                [
+                    {"name": f"Ещё {i}", "date": today, "amount": 10, "days_before": 1, "days_valid": 7}
+                    for i in range(4)
+                ],
+            )
+        holiday_calendar.invalidate()
+        await self._accrual_statements(4)
+        five_holidays = await self._accrual_statements(5)
+
+        # get(User), сгорание (+ selectinload праздников), уже выданные, UPDATE users
+        self.assertEqual(len(five_holidays), len(one_holiday))
+        # INSERT-ов тоже одинаково: бонусы и операции пишутся пачкой
+        self.assertEqual(len(set(self.inserts)), 1, self.inserts)